@@ -1,10 +1,20 @@
 import streamlit as st
-import seaborn as sns
-import matplotlib.pyplot as plt
-import plotly.graph_objects as go
-import plotly.express as px
 import pandas as pd
 import numpy as np
+from indicators import get_indicators, frame_fingerprint
+from downsample import downsample_lines, downsample_ohlc
+from instrumentation import timed
+from render_cache import get_pyplot, get_seaborn, load_render_cache, render_figure, render_key, show_image
+
+def _go():
+    """plotly.graph_objects, imported on first use"""
+    import plotly.graph_objects as go
+    return go
+
+def _px():
+    """plotly.express, imported on first use"""
+    import plotly.express as px
+    return px
 
 def safe_extract_value(value):
     if isinstance(value, pd.Series):
@@ -15,13 +25,15 @@ def safe_extract_value(value):
         return value[0] if len(value) > 0 else 0
     return value
 
+@timed('chart.candlestick')
 def display_candlestick_chart(df, title="Candlestick Chart"):
     try:
         if len(df) == 0:
             st.warning("No data available for candlestick chart")
             return
         
-        fig = go.Figure(data=go.Candlestick(
+        df = downsample_ohlc(df)
+        fig = _go().Figure(data=_go().Candlestick(
             x=df['Date'],
             open=df['Open'],
             high=df['High'],
@@ -33,18 +45,21 @@ def display_candlestick_chart(df, title="Candlestick Chart"):
     except Exception as e:
         st.error(f"Error displaying candlestick chart: {str(e)}")
 
+@timed('chart.volume')
 def display_volume_chart(df, title="Trading Volume"):
     try:
         if len(df) == 0:
             st.warning("No data available for volume chart")
             return
         
-        fig = px.bar(df, x='Date', y='Volume', title=title)
+        df = downsample_ohlc(df)
+        fig = _px().bar(df, x='Date', y='Volume', title=title)
         fig.update_layout(xaxis_title="Date", yaxis_title="Volume", height=400)
         st.plotly_chart(fig, use_container_width=True)
     except Exception as e:
         st.error(f"Error displaying volume chart: {str(e)}")
 
+@timed('chart.correlation_heatmap')
 def display_correlation_heatmap(df, title="Correlation Heatmap"):
     try:
         numerical_cols = ['Open', 'High', 'Low', 'Close', 'Volume']
@@ -54,48 +69,46 @@ def display_correlation_heatmap(df, title="Correlation Heatmap"):
             st.warning("Not enough data columns for correlation analysis")
             return
         
-        corr_data = df[available_cols].corr()
+        def draw():
+            corr_data = df[available_cols].corr()
+            fig, ax = get_pyplot().subplots(figsize=(10, 8))
+            get_seaborn().heatmap(corr_data, annot=True, cmap='coolwarm', center=0, ax=ax, fmt='.2f')
+            ax.set_title(title)
+            fig.tight_layout()
+            return fig
         
-        fig, ax = plt.subplots(figsize=(10, 8))
-        sns.heatmap(corr_data, annot=True, cmap='coolwarm', center=0, ax=ax, fmt='.2f')
-        ax.set_title(title)
-        plt.tight_layout()
-        st.pyplot(fig)
-        plt.close()
+        key = render_key('correlation_heatmap', frame_fingerprint(df, available_cols), title)
+        show_image(render_figure(load_render_cache(), key, draw))
     except Exception as e:
         st.error(f"Error displaying correlation heatmap: {str(e)}")
 
+@timed('chart.moving_averages')
 def display_moving_averages(df, title="Moving Averages"):
     try:
         if len(df) < 50:
             st.warning("Not enough data points for 50-day moving average. Showing available data.")
         
-        df = df.copy()
-        df['MA_20'] = df['Close'].rolling(window=min(20, len(df))).mean()
+        df = get_indicators(df)
         if len(df) >= 50:
-            df['MA_50'] = df['Close'].rolling(window=50).mean()
             y_cols = ['Close', 'MA_20', 'MA_50']
         else:
             y_cols = ['Close', 'MA_20']
         
-        fig = px.line(df, x='Date', y=y_cols, title=title)
+        df = downsample_lines(df, y_cols)
+        fig = _px().line(df, x='Date', y=y_cols, title=title)
         fig.update_layout(xaxis_title="Date", yaxis_title="Price", height=500)
         st.plotly_chart(fig, use_container_width=True)
     except Exception as e:
         st.error(f"Error displaying moving averages: {str(e)}")
 
+@timed('chart.bollinger_bands')
 def display_bollinger_bands(df, title="Bollinger Bands"):
     try:
         if len(df) < 20:
             st.warning("Not enough data points for Bollinger Bands (minimum 20 required)")
             return
         
-        df = df.copy()
-        window = min(20, len(df))
-        df['MA_20'] = df['Close'].rolling(window=window).mean()
-        df['STD_20'] = df['Close'].rolling(window=window).std()
-        df['Upper_Band'] = df['MA_20'] + (df['STD_20'] * 2)
-        df['Lower_Band'] = df['MA_20'] - (df['STD_20'] * 2)
+        df = get_indicators(df)
         
         df_clean = df.dropna(subset=['MA_20', 'Upper_Band', 'Lower_Band'])
         
@@ -103,27 +116,21 @@ def display_bollinger_bands(df, title="Bollinger Bands"):
             st.warning("Not enough data for Bollinger Bands calculation")
             return
         
-        fig = px.line(df_clean, x='Date', y=['Close', 'MA_20', 'Upper_Band', 'Lower_Band'], title=title)
+        df_clean = downsample_lines(df_clean, ['Close', 'MA_20', 'Upper_Band', 'Lower_Band'])
+        fig = _px().line(df_clean, x='Date', y=['Close', 'MA_20', 'Upper_Band', 'Lower_Band'], title=title)
         fig.update_layout(xaxis_title="Date", yaxis_title="Price", height=500)
         st.plotly_chart(fig, use_container_width=True)
     except Exception as e:
         st.error(f"Error displaying Bollinger Bands: {str(e)}")
 
+@timed('chart.rsi')
 def display_rsi_indicator(df, title="RSI Indicator"):
     try:
         if len(df) < 14:
             st.warning("Not enough data points for RSI (minimum 14 required)")
             return
         
-        df = df.copy()
-        delta = df['Close'].diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
-        
-        loss = loss.replace(0, 0.0001)
-        
-        rs = gain / loss
-        df['RSI'] = 100 - (100 / (1 + rs))
+        df = get_indicators(df)
         
         df_clean = df.dropna(subset=['RSI'])
         
@@ -131,7 +138,8 @@ def display_rsi_indicator(df, title="RSI Indicator"):
             st.warning("Not enough data for RSI calculation")
             return
         
-        fig = px.line(df_clean, x='Date', y='RSI', title=title)
+        df_clean = downsample_lines(df_clean, ['RSI'])
+        fig = _px().line(df_clean, x='Date', y='RSI', title=title)
         fig.add_hline(y=70, line_dash="dash", line_color="red", annotation_text="Overbought")
         fig.add_hline(y=30, line_dash="dash", line_color="green", annotation_text="Oversold")
         fig.update_layout(xaxis_title="Date", yaxis_title="RSI", height=400)
@@ -139,18 +147,20 @@ def display_rsi_indicator(df, title="RSI Indicator"):
     except Exception as e:
         st.error(f"Error displaying RSI: {str(e)}")
 
+@timed('chart.price_distribution')
 def display_price_distribution(df, title="Price Distribution"):
     try:
         if len(df) == 0:
             st.warning("No data available for price distribution")
             return
         
-        fig = px.histogram(df, x='Close', nbins=min(50, len(df)//2 or 10), title=title)
+        fig = _px().histogram(df, x='Close', nbins=min(50, len(df)//2 or 10), title=title)
         fig.update_layout(xaxis_title="Price", yaxis_title="Frequency", height=400)
         st.plotly_chart(fig, use_container_width=True)
     except Exception as e:
         st.error(f"Error displaying price distribution: {str(e)}")
 
+@timed('chart.advanced_all')
 def display_all_charts(df, current_ticker):
     if df is None or len(df) == 0:
         st.error("No data available for analysis")
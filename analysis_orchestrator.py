@@ -0,0 +1,114 @@
+"""
+Concurrent multi-model analysis.
+
+Sends the same question to several LLM backends at once with asyncio, limits
+concurrency per backend group (a local Ollama server serializes requests, a
+cloud API does not), enforces an overall deadline and yields results as they
+complete. Total wall time tracks the slowest backend instead of the sum.
+"""
+
+import asyncio
+import os
+import threading
+import time
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+ANALYSIS_DEADLINE = float(os.getenv('ANALYSIS_DEADLINE', '120'))
+# Default number of in-flight requests allowed per backend group
+GROUP_CONCURRENCY = {
+    'ollama-local': int(os.getenv('OLLAMA_LOCAL_CONCURRENCY', '1')),
+    'ollama-cloud': int(os.getenv('OLLAMA_CLOUD_CONCURRENCY', '4')),
+    'gemini': int(os.getenv('GEMINI_CONCURRENCY', '2')),
+}
+
+class AnalysisBackend:
+    """A named LLM backend: fn(df, query) returns the answer text (blocking).
+
+    Backends in the same group share a concurrency limit.
+    """
+
+    def __init__(self, name, fn, group=None):
+        self.name = name
+        self.fn = fn
+        self.group = group or name
+
+async def _run_backend(backend, df, query, semaphore, ctx):
+    def call():
+        if ctx is not None:
+            add_script_run_ctx(threading.current_thread(), ctx)
+        return backend.fn(df, query)
+
+    async with semaphore:
+        started = time.perf_counter()
+        try:
+            response = await asyncio.to_thread(call)
+            error = None if response else "Empty response"
+        except Exception as e:
+            response, error = None, str(e)
+        return {
+            'backend': backend.name,
+            'response': response,
+            'error': error,
+            'latency': time.perf_counter() - started
+        }
+
+async def stream_analyses(backends, df, query, deadline=ANALYSIS_DEADLINE, concurrency=None):
+    """Async generator yielding one result dict per backend in completion order.
+
+    Each result has 'backend', 'response', 'error' and 'latency' (seconds).
+    Backends still running at the deadline are reported with a timeout error;
+    their threads are abandoned rather than waited for.
+    """
+    limits = dict(GROUP_CONCURRENCY, **(concurrency or {}))
+    semaphores = {}
+    for backend in backends:
+        if backend.group not in semaphores:
+            semaphores[backend.group] = asyncio.Semaphore(max(1, limits.get(backend.group, len(backends))))
+
+    ctx = get_script_run_ctx()
+    started = time.perf_counter()
+    tasks = {
+        asyncio.ensure_future(_run_backend(backend, df, query, semaphores[backend.group], ctx)): backend
+        for backend in backends
+    }
+    pending = set(tasks)
+
+    try:
+        while pending:
+            remaining = deadline - (time.perf_counter() - started)
+            if remaining <= 0:
+                break
+            done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                yield task.result()
+
+        for task in pending:
+            yield {
+                'backend': tasks[task].name,
+                'response': None,
+                'error': f"Timed out after {deadline:.0f}s",
+                'latency': time.perf_counter() - started
+            }
+    finally:
+        for task in pending:
+            task.cancel()
+
+def iter_analyses(backends, df, query, deadline=ANALYSIS_DEADLINE, concurrency=None):
+    """Synchronous wrapper over stream_analyses for use from a Streamlit script"""
+    loop = asyncio.new_event_loop()
+    results = stream_analyses(backends, df, query, deadline, concurrency)
+    try:
+        while True:
+            try:
+                yield loop.run_until_complete(results.__anext__())
+            except StopAsyncIteration:
+                break
+    finally:
+        loop.run_until_complete(results.aclose())
+        # Abandoned backend threads keep running; don't block on them here
+        loop.run_until_complete(loop.shutdown_asyncgens())
+        loop.close()
+
+def run_analyses(backends, df, query, deadline=ANALYSIS_DEADLINE, concurrency=None):
+    """Run all backends concurrently and return {backend name: result dict}"""
+    return {result['backend']: result for result in iter_analyses(backends, df, query, deadline, concurrency)}
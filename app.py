@@ -3,17 +3,28 @@ import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 import os
+import time
 from dotenv import load_dotenv
 
 load_dotenv()
 
 from utils import fetch_market_data, get_financial_metrics, validate_and_clean_data
-from models import initialize_gemini_model, create_analysis_prompt, perform_price_prediction
+from models import initialize_gemini_model, create_analysis_prompt, stream_gemini_analysis, analyze_financial_data_with_gemini, GEMINI_MODEL
+from indicators import frame_fingerprint
+from prompt_context import build_analysis_context
+from backtest import walk_forward_report
+from online_regression import cached_predictor
+from monte_carlo import simulate_quantile_bands
 from charts import display_financial_charts, display_prediction_chart
 from advanced_charts import display_all_charts
-from web_search import search_financial_news, extract_key_info
-from ollama_models import check_ollama_connection, check_ollama_cloud_connection, list_ollama_models, list_ollama_cloud_models, analyze_financial_data_with_ollama
-from embeddings import find_similar_texts, embed_financial_data
+from web_search import get_financial_news
+from ollama_models import check_ollama_connection, check_ollama_cloud_connection, list_ollama_models, list_ollama_cloud_models, analyze_financial_data_with_ollama, ollama_backends, warm_up_ollama_models_async, preload_ollama_models, is_model_hot, get_model_latency_stats
+from analysis_orchestrator import AnalysisBackend, iter_analyses
+from embeddings import financial_texts, load_embedding_cache, load_vector_index, search_vector_index, VECTOR_INDEX_NPROBE
+from motif_search import find_similar_windows
+from session_cache import session_cached
+from llm_cache import load_response_cache, data_scope
+from instrumentation import get_metrics_store, start_profile, stop_profile, DEBUG_PANEL
 
 st.set_page_config(
     page_title="FinGPT Analyst",
@@ -72,102 +83,39 @@ Financial Data & AI Analyst
 ```
 """)
 
-st.sidebar.markdown("### ⚙ Configuration Panel")
+SECTIONS = [
+    "📊 Basic Charts",
+    "📈 Advanced Analytics",
+    "🤖 AI Analyst",
+    "🔮 Price Prediction",
+    "📰 News & Insights"
+]
 
-with st.sidebar:
-    st.markdown("**Market Data Settings**")
-    ticker = st.text_input("Ticker Symbol", value="NVDA", placeholder="e.g., AAPL, GOOGL")
-    
-    col_start, col_end = st.columns(2)
-    with col_start:
-        start_date = st.date_input("Start Date", datetime.now() - timedelta(days=365))
-    with col_end:
-        end_date = st.date_input("End Date", datetime.now())
-    
-    st.markdown("---")
-    fetch_btn = st.button("⚡ Fetch Market Data", use_container_width=True)
-    
-    if fetch_btn:
-        with st.spinner("Loading market data..."):
-            fetch_market_data(ticker, start_date, end_date)
-            if 'df' in st.session_state:
-                st.success("✓ Data loaded successfully")
+def basic_charts_section(df, current_ticker):
+    st.markdown("### Basic Market Visualization")
+    try:
+        display_financial_charts(df, current_ticker)
+    except Exception as e:
+        st.error(f"Error displaying charts: {str(e)}")
 
-if 'df' in st.session_state:
-    df = st.session_state['df']
-    current_ticker = st.session_state['ticker']
-    
-    df = validate_and_clean_data(df)
-    
-    if df is None or len(df) == 0:
-        st.error("❌ Invalid or empty data. Please try a different ticker or date range.")
-        st.stop()
-    
-    if len(df) < 2:
-        st.warning("⚠ Not enough data points. Please select a longer date range.")
-        st.stop()
-    
-    st.markdown("---")
-    
-    st.markdown(f"### 📊 Market Summary: {current_ticker}")
-    
-    col1, col2, col3, col4 = st.columns(4)
-    
-    with col1:
-        latest_price = df['Close'].iloc[-1]
-        if isinstance(latest_price, pd.Series):
-            latest_price = latest_price.values[0]
-        st.metric("💵 Current Price", f"${float(latest_price):.2f}")
-    
-    with col2:
-        current_close = df['Close'].iloc[-1]
-        prev_close = df['Close'].iloc[-2]
-        if isinstance(current_close, pd.Series):
-            current_close = current_close.values[0]
-        if isinstance(prev_close, pd.Series):
-            prev_close = prev_close.values[0]
-        price_change = float(current_close) - float(prev_close)
-        pct_change = (price_change / float(prev_close)) * 100
-        st.metric("📈 Daily Change", f"${price_change:.2f}", f"{pct_change:.2f}%")
-    
-    with col3:
-        avg_volume = df['Volume'].mean()
-        if isinstance(avg_volume, pd.Series):
-            avg_volume = avg_volume.values[0]
-        st.metric("📊 Avg Volume", f"{float(avg_volume):,.0f}")
-    
-    with col4:
-        high_52w = df['High'].tail(252).max()
-        if isinstance(high_52w, pd.Series):
-            high_52w = high_52w.values[0]
-        st.metric("🎯 52-Week High", f"${float(high_52w):.2f}")
-    
-    st.markdown("---")
-    
-    tab_viz, tab_adv_viz, tab_ai, tab_ml, tab_news = st.tabs([
-        "📊 Basic Charts",
-        "📈 Advanced Analytics",
-        "🤖 AI Analyst",
-        "🔮 Price Prediction",
-        "📰 News & Insights"
-    ])
-    
-    with tab_viz:
-        st.markdown("### Basic Market Visualization")
-        try:
-            display_financial_charts(df, current_ticker)
-        except Exception as e:
-            st.error(f"Error displaying charts: {str(e)}")
-    
-    with tab_adv_viz:
-        st.markdown("### Advanced Technical Analysis")
-        try:
-            display_all_charts(df, current_ticker)
-        except Exception as e:
-            st.error(f"Error displaying advanced charts: {str(e)}")
-    
-    with tab_ai:
-        st.markdown("""
+def advanced_charts_section(df, current_ticker):
+    st.markdown("### Advanced Technical Analysis")
+    try:
+        display_all_charts(df, current_ticker)
+    except Exception as e:
+        st.error(f"Error displaying advanced charts: {str(e)}")
+
+def response_cache_caption():
+    """Show the LLM response cache hit/miss counters"""
+    stats = load_response_cache().stats()
+    st.caption(
+        f"Response cache: {stats['exact_hits']} exact + {stats['semantic_hits']} similar hits, "
+        f"{stats['misses']} misses ({stats['hit_rate']:.0%} hit rate, {stats['size']} stored)"
+    )
+
+@st.fragment
+def ai_analyst_section(df, data_key):
+    st.markdown("""
 ```
    ___    ___   ___              _           _   
   / _ \  |_ _| / _ \  _ _   __ _| |_  _ ___ | |_ 
@@ -176,42 +124,45 @@ if 'df' in st.session_state:
                                    |__/           
 ```
 """)
-        st.caption("Ask questions about trends, patterns, and insights")
-        
-        llm = initialize_gemini_model()
-        if llm:
-            recent_data = df.tail(10).to_string()
-            summary_stats = df.describe().to_string()
-            prompt = create_analysis_prompt()
-            chain = prompt | llm
-            
-            user_query = st.text_area("💬 Enter your question:", placeholder="What are the key trends in this data?", height=100)
-            
-            if st.button("▶ Run Analysis", use_container_width=True, key="ai_analyst_button"):
-                if user_query:
-                    col_left, col_mid, col_right = st.columns([1, 3, 1])
-                    
-                    with col_mid:
-                        with st.spinner("🔄 Analyzing..."):
-                            try:
-                                response = chain.invoke({
-                                    "question": user_query,
-                                    "data": recent_data,
-                                    "stats": summary_stats
-                                })
-                                
-                                st.markdown("### 📊 Analysis Results")
-                                st.markdown("---")
-                                st.write(response.content)
-                            except Exception as e:
-                                st.error(f"❌ Error: {str(e)}")
-                else:
-                    st.warning("⚠ Please enter a question first")
-        else:
-            st.warning("⚠ AI model not initialized. Check API configuration.")
+    st.caption("Ask questions about trends, patterns, and insights")
     
-    with tab_ml:
-        st.markdown("""
+    llm = initialize_gemini_model()
+    if llm:
+        analysis_context = session_cached('analysis_context', data_key, lambda: build_analysis_context(df))
+        recent_data = analysis_context['data']
+        summary_stats = analysis_context['stats']
+        prompt = create_analysis_prompt()
+        chain = prompt | llm
+        
+        user_query = st.text_area("💬 Enter your question:", placeholder="What are the key trends in this data?", height=100)
+        
+        if st.button("▶ Run Analysis", use_container_width=True, key="ai_analyst_button"):
+            if user_query:
+                col_left, col_mid, col_right = st.columns([1, 3, 1])
+                
+                with col_mid:
+                    try:
+                        chunks, stream_stats = stream_gemini_analysis(chain, {
+                            "question": user_query,
+                            "data": recent_data,
+                            "stats": summary_stats
+                        }, cache_context=(GEMINI_MODEL, prompt.template, session_cached('llm_scope', data_key, lambda: data_scope(df, data_key[0]))))
+                        
+                        st.markdown("### 📊 Analysis Results")
+                        st.markdown("---")
+                        st.write_stream(chunks)
+                        st.caption(stream_stats.summary())
+                        response_cache_caption()
+                    except Exception as e:
+                        st.error(f"❌ Error: {str(e)}")
+            else:
+                st.warning("⚠ Please enter a question first")
+    else:
+        st.warning("⚠ AI model not initialized. Check API configuration.")
+
+@st.fragment
+def prediction_section(df, data_key):
+    st.markdown("""
 ```
   ___              _ _      _   _          
  | _ \_ _ ___ _ __| (_)_ __| |_(_)___ _ _  
@@ -219,127 +170,350 @@ if 'df' in st.session_state:
  |_| |_| \___\_\__,_|_|_\__|\__|_\___/_||_|
 ```
 """)
-        st.caption("Next-day prediction using Linear Regression")
-        
+    st.caption("Next-day prediction using Linear Regression")
+    
+    band_col1, band_col2 = st.columns(2)
+    band_method = band_col1.selectbox("Forecast band simulation", ["GBM", "Bootstrap"], help="Monte Carlo paths from the last year of daily returns")
+    band_horizon = band_col2.slider("Band horizon (trading days)", 5, 60, 30)
+    
+    try:
+        # The trend-line state is kept per ticker, so a refreshed history that only adds bars is an O(1) update per bar
+        predictors = st.session_state.setdefault('trend_predictors', {})
+        prediction = session_cached('prediction', data_key, lambda: cached_predictor(predictors, data_key[0], df['Close'].to_numpy()).predict_next())
+        bands = None
         try:
-            prediction = perform_price_prediction(df)
-            display_prediction_chart(df, prediction)
-        except Exception as e:
-            st.error(f"❌ Prediction error: {str(e)}")
+            bands = session_cached('forecast_bands', data_key, lambda: simulate_quantile_bands(df['Close'], horizon=band_horizon, method=band_method.lower()), band_method, band_horizon)
+        except ValueError as e:
+            st.warning(f"⚠ Forecast bands unavailable: {str(e)}")
+        display_prediction_chart(df, prediction, bands)
+    except Exception as e:
+        st.error(f"❌ Prediction error: {str(e)}")
     
-    with tab_news:
-        st.markdown(f"### 📰 Latest Financial News: {current_ticker}")
-        
+    with st.expander("📏 Walk-forward accuracy"):
+        st.caption("The same trend-line model refit at every bar on past data only, scored on the next bar; forgetting rows weight recent bars more")
         try:
-            with st.spinner("🔍 Fetching news..."):
-                search_results = search_financial_news(current_ticker)
-            
-            if search_results:
-                key_info = extract_key_info(search_results)
-                
-                if key_info:
-                    for i, article in enumerate(key_info):
-                        with st.expander(f"📄 [{i+1}] {article['title']}", expanded=i==0):
-                            st.markdown(f"**🔗 Source:** {article['url']}")
-                            st.markdown(article['snippet'])
-                else:
-                    st.info("ℹ No news articles found.")
+            report = session_cached('walk_forward', data_key, lambda: walk_forward_report(df))
+            if len(report) > 0:
+                st.dataframe(report[report['Period'] == 'All'].drop(columns='Period'), hide_index=True, use_container_width=True)
+                st.dataframe(report[report['Period'] != 'All'], hide_index=True, use_container_width=True)
             else:
-                st.info("ℹ No recent news available.")
+                st.info("ℹ Not enough data for a walk-forward evaluation.")
         except Exception as e:
-            st.error(f"❌ News fetch error: {str(e)}")
+            st.error(f"❌ Backtest error: {str(e)}")
+
+def news_section(current_ticker):
+    st.markdown(f"### 📰 Latest Financial News: {current_ticker}")
+    
+    try:
+        with st.spinner("🔍 Fetching news..."):
+            key_info = get_financial_news(current_ticker)
         
-        st.markdown("---")
+        if key_info:
+            for i, article in enumerate(key_info):
+                with st.expander(f"📄 [{i+1}] {article['title']}", expanded=i==0):
+                    st.markdown(f"**🔗 Source:** {article['url']}")
+                    st.markdown(article['snippet'])
+        else:
+            st.info("ℹ No recent news available.")
+    except Exception as e:
+        st.error(f"❌ News fetch error: {str(e)}")
+
+@st.fragment
+def patterns_section(df, data_key):
+    st.markdown("---")
+    
+    col_left_space, col_patterns, col_right_space = st.columns([1, 2, 1])
+    
+    with col_patterns:
+        st.markdown("### 🔍 Historical Patterns")
         
-        col_left_space, col_patterns, col_right_space = st.columns([1, 2, 1])
+        pattern_window = 20
+        if len(df) >= 2 * pattern_window:
+            try:
+                st.caption(f"Past {pattern_window}-bar windows shaped most like the latest {pattern_window} bars (price and volume)")
+                similar_windows = session_cached('similar_windows', data_key, lambda: find_similar_windows(df, window=pattern_window, top_k=3, columns=('Close', 'Volume')))
+                
+                for _, match in similar_windows.iterrows():
+                    start = pd.to_datetime(match['Start']).strftime('%Y-%m-%d')
+                    end = pd.to_datetime(match['End']).strftime('%Y-%m-%d')
+                    st.write(f"**📅 {start} → {end}**")
+                    next_return = f"{match['Next_Return']:+.2%}" if pd.notna(match['Next_Return']) else "n/a"
+                    st.caption(f"Distance: {match['Distance']:.3f} · Following {pattern_window}-bar return: {next_return}")
+            except Exception as e:
+                st.warning(f"⚠ Pattern analysis unavailable")
+        else:
+            st.info(f"ℹ Need at least {2 * pattern_window} data points for pattern matching.")
         
-        with col_patterns:
-            st.markdown("### 🔍 Historical Patterns")
-            
-            if len(df) > 5:
-                try:
-                    text_repr, embeddings = embed_financial_data(df)
+        if len(df) > 5 and st.checkbox("Also run text-embedding similarity (downloads a model)", value=False):
+            try:
+                # Built (or memory-mapped from disk) once per dataset; each query is one encoding plus a matrix-vector product
+                def build_index():
+                    texts = financial_texts(df)
+                    return load_vector_index(texts) if texts else None
+                
+                index = session_cached('vector_index', data_key, build_index)
+                
+                if index is not None:
+                    query = "significant market movement"
+                    similar_periods = search_vector_index(index, query, top_k=3, nprobe=VECTOR_INDEX_NPROBE)
                     
-                    if text_repr:
-                        query = "significant market movement"
-                        similar_periods = find_similar_texts(query, text_repr, top_k=3)
-                        
-                        for period, similarity in similar_periods:
-                            st.write(f"**📅 {period}**")
-                            st.progress(similarity)
-                            st.caption(f"Similarity: {similarity:.1%}")
-                except Exception as e:
-                    st.warning(f"⚠ Pattern analysis unavailable")
+                    for period, similarity in similar_periods:
+                        st.write(f"**📅 {period}**")
+                        st.progress(similarity)
+                        st.caption(f"Similarity: {similarity:.1%}")
+                    
+                    cache_stats = load_embedding_cache().stats()
+                    st.caption(f"Embedding cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses ({cache_stats['hit_rate']:.0%} hit rate)")
+            except Exception as e:
+                st.warning(f"⚠ Pattern analysis unavailable")
+
+def debug_panel():
+    """Sidebar panel with per-stage timings, metric exports and a one-rerun profiler"""
+    metrics = get_metrics_store()
+    with st.sidebar.expander("🛠 Performance Debug"):
+        rows = metrics.summary()
+        if rows:
+            table = pd.DataFrame(rows)
+            for column in ('p50', 'p95', 'max'):
+                table[f'{column} (ms)'] = table[column] * 1000
+            st.dataframe(
+                table[['stage', 'calls', 'errors', 'p50 (ms)', 'p95 (ms)', 'max (ms)', 'bytes']].round(1),
+                hide_index=True,
+                use_container_width=True
+            )
+        else:
+            st.caption("No stages recorded yet")
         
-        st.markdown("---")
+        col_json, col_prom = st.columns(2)
+        with col_json:
+            st.download_button("JSON", metrics.to_json(), file_name="metrics.json", mime="application/json", use_container_width=True)
+        with col_prom:
+            st.download_button("Prometheus", metrics.to_prometheus(), file_name="metrics.prom", mime="text/plain", use_container_width=True)
         
-        col_l, col_ollama, col_r = st.columns([1, 2, 1])
+        if st.button("Clear metrics", use_container_width=True):
+            metrics.clear()
+            st.rerun()
         
-        with col_ollama:
-            st.markdown("### 🖥 Offline AI Analysis (Ollama)")
-            
-            # Check both local and cloud connections
-            local_available = check_ollama_connection()
-            cloud_available = check_ollama_cloud_connection()
+        if st.button("Profile next rerun", use_container_width=True):
+            st.session_state['profile_next_rerun'] = True
+            st.rerun()
+        
+        if 'last_profile' in st.session_state:
+            st.code(st.session_state['last_profile'], language=None)
+
+@st.fragment
+def ollama_section(df, current_ticker):
+    st.markdown("---")
+    
+    col_l, col_ollama, col_r = st.columns([1, 2, 1])
+    
+    with col_ollama:
+        st.markdown("### 🖥 Offline AI Analysis (Ollama)")
+        
+        # Check both local and cloud connections
+        local_available = check_ollama_connection()
+        cloud_available = check_ollama_cloud_connection()
+        
+        if local_available or cloud_available:
+            # Show connection status
+            if local_available:
+                st.success("✓ Local Ollama Connected")
+            if cloud_available:
+                st.success("✓ Ollama Cloud Connected")
             
-            if local_available or cloud_available:
-                # Show connection status
+            # Let user choose between local and cloud
+            use_cloud = False
+            if cloud_available:
                 if local_available:
-                    st.success("✓ Local Ollama Connected")
-                if cloud_available:
-                    st.success("✓ Ollama Cloud Connected")
+                    use_cloud = st.checkbox("Use Ollama Cloud (instead of local)", value=True)
+                else:
+                    use_cloud = True
+                    st.info("ℹ Using Ollama Cloud (local not available)")
+            
+            # Get available models
+            if use_cloud:
+                models = list_ollama_cloud_models()
+            else:
+                models = list_ollama_models()
+            
+            if models:
+                selected_model = st.selectbox("🤖 Model", models, index=0)
                 
-                # Let user choose between local and cloud
-                use_cloud = False
-                if cloud_available:
+                # Load the selected model in the background so the first query doesn't pay for it
+                if not use_cloud:
                     if local_available:
-                        use_cloud = st.checkbox("Use Ollama Cloud (instead of local)", value=True)
-                    else:
-                        use_cloud = True
-                        st.info("ℹ Using Ollama Cloud (local not available)")
+                        preload_ollama_models()
+                    if warm_up_ollama_models_async([selected_model]):
+                        st.caption(f"🔄 Loading {selected_model} into memory...")
+                    elif is_model_hot(selected_model):
+                        st.caption(f"🔥 {selected_model} is loaded")
                 
-                # Get available models
-                if use_cloud:
-                    models = list_ollama_cloud_models()
-                else:
-                    models = list_ollama_models()
+                model_latency = get_model_latency_stats().get(selected_model if not use_cloud else f"{selected_model} (cloud)")
+                if model_latency and (model_latency['cold_mean'] or model_latency['warm_mean']):
+                    cold = f"{model_latency['cold_mean']:.1f}s" if model_latency['cold_mean'] is not None else "n/a"
+                    warm = f"{model_latency['warm_mean']:.1f}s" if model_latency['warm_mean'] is not None else "n/a"
+                    st.caption(f"First-output latency — cold: {cold}, warm: {warm}")
+                ollama_query = st.text_area(
+                    "💬 Query",
+                    "What are the key trends and insights from this data?",
+                    height=100,
+                    key="ollama_query_textarea"
+                )
                 
-                if models:
-                    selected_model = st.selectbox("🤖 Model", models, index=0)
-                    ollama_query = st.text_area(
-                        "💬 Query",
-                        "What are the key trends and insights from this data?",
-                        height=100,
-                        key="ollama_query_textarea"
-                    )
+                if st.button("▶ Run Analysis", use_container_width=True, key="ollama_analysis_button"):
+                    if ollama_query:
+                        try:
+                            chunks, stream_stats = analyze_financial_data_with_ollama(
+                                df, ollama_query, selected_model, use_cloud=use_cloud, stream=True, ticker=current_ticker
+                            )
+                            st.markdown("### 🤖 Ollama Analysis Results")
+                            st.markdown("---")
+                            ollama_response = st.write_stream(chunks)
+                            if ollama_response:
+                                st.caption(stream_stats.summary())
+                                response_cache_caption()
+                            else:
+                                st.error("❌ Failed to get response from Ollama")
+                        except Exception as e:
+                            st.error(f"❌ Failed to get response from Ollama: {str(e)}")
+                    else:
+                        st.warning("⚠ Please enter a query first")
+                
+                with st.expander("⚡ Compare models concurrently"):
+                    compare_models = st.multiselect("Models", models, default=models[:1], key="compare_models")
+                    compare_gemini = st.checkbox("Include Gemini", value=bool(os.getenv("GOOGLE_API_KEY")), key="compare_gemini")
                     
-                    if st.button("▶ Run Analysis", use_container_width=True, key="ollama_analysis_button"):
-                        if ollama_query:
-                            with st.spinner("⏳ Processing with Ollama..."):
-                                ollama_response = analyze_financial_data_with_ollama(
-                                    df, ollama_query, selected_model, use_cloud=use_cloud
-                                )
-                                if ollama_response:
-                                    st.markdown("### 🤖 Ollama Analysis Results")
-                                    st.markdown("---")
-                                    st.write(ollama_response)
-                                else:
-                                    st.error("❌ Failed to get response from Ollama")
+                    if st.button("▶ Run Comparison", use_container_width=True, key="compare_button"):
+                        if ollama_query and (compare_models or compare_gemini):
+                            backends = ollama_backends(compare_models, use_cloud=use_cloud, ticker=current_ticker)
+                            if compare_gemini:
+                                gemini_llm = initialize_gemini_model()
+                                if gemini_llm:
+                                    backends.insert(0, AnalysisBackend(
+                                        "gemini",
+                                        lambda data, query: analyze_financial_data_with_gemini(gemini_llm, data, query, ticker=current_ticker)
+                                    ))
+                            
+                            with st.spinner(f"⏳ Querying {len(backends)} models..."):
+                                for result in iter_analyses(backends, df, ollama_query):
+                                    st.markdown(f"#### {result['backend']} · {result['latency']:.1f}s")
+                                    if result['error']:
+                                        st.error(f"❌ {result['error']}")
+                                    else:
+                                        st.write(result['response'])
+                                response_cache_caption()
                         else:
-                            st.warning("⚠ Please enter a query first")
-                else:
-                    st.warning("⚠ No Ollama models found. Please pull a model first.")
+                            st.warning("⚠ Please enter a query and pick at least one model")
             else:
-                st.warning("❌ Ollama not available")
-                st.info("💡 Options:\n1. Install local Ollama from: https://ollama.ai\n2. Use Ollama Cloud (already configured)")
+                st.warning("⚠ No Ollama models found. Please pull a model first.")
+        else:
+            st.warning("❌ Ollama not available")
+            st.info("💡 Options:\n1. Install local Ollama from: https://ollama.ai\n2. Use Ollama Cloud (already configured)")
 
-else:
-    st.markdown("---")
-    
-    col1, col2, col3 = st.columns([1, 2, 1])
-    
-    with col2:
-        st.markdown("""
+rerun_started = time.perf_counter()
+rerun_profiler = None
+if st.session_state.pop('profile_next_rerun', False):
+    rerun_profiler = start_profile()
+    if rerun_profiler is None:
+        st.session_state['last_profile'] = "Another session is profiling right now; try again in a moment."
+try:
+    st.sidebar.markdown("### ⚙ Configuration Panel")
+
+    with st.sidebar:
+        st.markdown("**Market Data Settings**")
+        ticker = st.text_input("Ticker Symbol", value="NVDA", placeholder="e.g., AAPL, GOOGL")
+        
+        col_start, col_end = st.columns(2)
+        with col_start:
+            start_date = st.date_input("Start Date", datetime.now() - timedelta(days=365))
+        with col_end:
+            end_date = st.date_input("End Date", datetime.now())
+        
+        st.markdown("---")
+        fetch_btn = st.button("⚡ Fetch Market Data", use_container_width=True)
+        
+        if fetch_btn:
+            with st.spinner("Loading market data..."):
+                fetch_market_data(ticker, start_date, end_date)
+                if 'df' in st.session_state:
+                    st.success("✓ Data loaded successfully")
+
+    if 'df' in st.session_state:
+        df = st.session_state['df']
+        current_ticker = st.session_state['ticker']
+        
+        df = validate_and_clean_data(df)
+        
+        if df is None or len(df) == 0:
+            st.error("❌ Invalid or empty data. Please try a different ticker or date range.")
+            st.stop()
+        
+        if len(df) < 2:
+            st.warning("⚠ Not enough data points. Please select a longer date range.")
+            st.stop()
+        
+        st.markdown("---")
+        
+        st.markdown(f"### 📊 Market Summary: {current_ticker}")
+        
+        col1, col2, col3, col4 = st.columns(4)
+        
+        with col1:
+            latest_price = df['Close'].iloc[-1]
+            if isinstance(latest_price, pd.Series):
+                latest_price = latest_price.values[0]
+            st.metric("💵 Current Price", f"${float(latest_price):.2f}")
+        
+        with col2:
+            current_close = df['Close'].iloc[-1]
+            prev_close = df['Close'].iloc[-2]
+            if isinstance(current_close, pd.Series):
+                current_close = current_close.values[0]
+            if isinstance(prev_close, pd.Series):
+                prev_close = prev_close.values[0]
+            price_change = float(current_close) - float(prev_close)
+            pct_change = (price_change / float(prev_close)) * 100
+            st.metric("📈 Daily Change", f"${price_change:.2f}", f"{pct_change:.2f}%")
+        
+        with col3:
+            avg_volume = df['Volume'].mean()
+            if isinstance(avg_volume, pd.Series):
+                avg_volume = avg_volume.values[0]
+            st.metric("📊 Avg Volume", f"{float(avg_volume):,.0f}")
+        
+        with col4:
+            high_52w = df['High'].tail(252).max()
+            if isinstance(high_52w, pd.Series):
+                high_52w = high_52w.values[0]
+            st.metric("🎯 52-Week High", f"${float(high_52w):.2f}")
+        
+        st.markdown("---")
+        
+        data_key = (current_ticker, frame_fingerprint(df))
+        
+        # Only the selected section runs; widgets inside a section rerun just that fragment
+        active_section = st.radio("Section", SECTIONS, horizontal=True, key="active_section", label_visibility="collapsed")
+        
+        if active_section == SECTIONS[0]:
+            basic_charts_section(df, current_ticker)
+        elif active_section == SECTIONS[1]:
+            advanced_charts_section(df, current_ticker)
+        elif active_section == SECTIONS[2]:
+            ai_analyst_section(df, data_key)
+        elif active_section == SECTIONS[3]:
+            prediction_section(df, data_key)
+        else:
+            news_section(current_ticker)
+            patterns_section(df, data_key)
+            ollama_section(df, current_ticker)
+
+    else:
+        st.markdown("---")
+        
+        col1, col2, col3 = st.columns([1, 2, 1])
+        
+        with col2:
+            st.markdown("""
 ```
  _    _      _                          
 | |  | |    | |                         
@@ -352,22 +526,22 @@ else:
 =====================================
 ```
 """)
-        
-        st.info("👈 Enter a ticker symbol in the sidebar and click 'Fetch Market Data' to begin")
-        
-        st.markdown("### 🚀 Quick Start Guide")
-        st.markdown("""
+            
+            st.info("👈 Enter a ticker symbol in the sidebar and click 'Fetch Market Data' to begin")
+            
+            st.markdown("### 🚀 Quick Start Guide")
+            st.markdown("""
 **Step 1:** Enter a ticker symbol (e.g., NVDA, AAPL, TSLA)  
 **Step 2:** Select your preferred date range  
 **Step 3:** Click 'Fetch Market Data' to load data  
 **Step 4:** Explore the tabs for different analyses
 """)
-        
-        st.markdown("---")
-        
-        st.markdown("### 🎯 Platform Features")
-        
-        st.markdown("""
+            
+            st.markdown("---")
+            
+            st.markdown("### 🎯 Platform Features")
+            
+            st.markdown("""
 **📊 Basic Charts**  
 View price movements, volume, and candlestick patterns
 
@@ -383,10 +557,10 @@ Machine learning forecasting for next-day prices
 **📰 News & Insights**  
 Real-time news with historical pattern matching
 """)
-        
-        st.markdown("---")
-        
-        st.markdown("""
+            
+            st.markdown("---")
+            
+            st.markdown("""
 ```
  ___        _               
 |_ _|_ _  _| |_ ___  
@@ -399,4 +573,13 @@ Real-time news with historical pattern matching
 • Technical analysis indicators
 • News aggregation from multiple sources
 ```
-""")
\ No newline at end of file
+""")
+finally:
+    # st.stop() and errors end the rerun early; the timing and profiler must still be closed.
+    # After st.stop() Streamlit rejects session writes, so only the profile of a completed rerun is kept.
+    get_metrics_store().record('app.rerun', time.perf_counter() - rerun_started)
+    if rerun_profiler is not None:
+        st.session_state['last_profile'] = stop_profile(rerun_profiler)
+
+if DEBUG_PANEL or st.query_params.get('debug') == '1':
+    debug_panel()
@@ -0,0 +1,187 @@
+"""
+Walk-forward evaluation of the trend-line price model.
+
+perform_price_prediction fits Close ~ a + b * day on the history and predicts
+the next bar. Here that fit is replayed at every bar in closed form: the
+least-squares sums for each training window come from cumulative sums
+(expanding windows) or a sliding-window product (rolling windows), so a full
+walk-forward over every bar, for many tickers at once, is a handful of
+vectorized array operations instead of one sklearn fit per step.
+Exponentially weighted fits (a forgetting factor) are replayed with the
+online RecursiveTrendPredictor, one O(1) update per bar.
+"""
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+from online_regression import RecursiveTrendPredictor
+
+DEFAULT_MIN_TRAIN = 20
+DEFAULT_FORGETTING = (0.98,)
+
+def predict_next_from_sums(m, sum_y, sum_xy):
+    """Next-bar prediction of an OLS line fitted to m points at x = 0..m-1"""
+    sum_x = m * (m - 1) / 2
+    sum_xx = (m - 1) * m * (2 * m - 1) / 6
+    denom = m * sum_xx - sum_x ** 2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slope = np.where(denom > 0, (m * sum_xy - sum_x * sum_y) / np.where(denom > 0, denom, 1), 0.0)
+    intercept = (sum_y - slope * sum_x) / m
+    return intercept + slope * m
+
+def _fit_and_predict(m, sum_x, sum_xx, sum_y, sum_xy, x_next):
+    """Prediction at x_next of an OLS line fitted from its moment sums (NaN where m < 2)"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        denom = m * sum_xx - sum_x ** 2
+        slope = np.where(denom > 0, (m * sum_xy - sum_x * sum_y) / np.where(denom > 0, denom, 1), 0.0)
+        intercept = (sum_y - slope * sum_x) / m
+    return np.where(m >= 2, intercept + slope * x_next, np.nan)
+
+def walk_forward_predictions(close, window=None, min_train=DEFAULT_MIN_TRAIN):
+    """One-step-ahead trend-line predictions for every bar.
+
+    close is a 1-D array or a 2-D (bars x tickers) array. window=None trains on
+    all prior bars (expanding); an integer trains on the last `window` bars
+    (rolling). Entry t predicts close[t] from bars before t and is NaN until
+    enough training bars exist.
+
+    Missing closes are left out of the fits, and each column's bar numbers
+    start at its first valid close, so a ticker listed later than the others
+    in a date-aligned panel is scored exactly as if its own history had been
+    passed alone.
+    """
+    y = np.asarray(close, dtype=float)
+    n = y.shape[0]
+    predictions = np.full(y.shape, np.nan)
+    valid = np.isfinite(y)
+    complete = valid.all()
+    shape = (-1,) + (1,) * (y.ndim - 1)
+    rows = np.arange(n).reshape(shape)
+    if complete:
+        filled, first = y, 0
+    else:
+        filled = np.where(valid, y, 0.0)
+        first = np.where(valid.any(axis=0), valid.argmax(axis=0), n)
+        # Exact prefix sums of the valid bars' count, row number and squared row number
+        zero = np.zeros((1,) + y.shape[1:], dtype=np.int64)
+        cum_m, cum_r, cum_rr = (np.concatenate([zero, np.cumsum(valid * power, axis=0)]) for power in (1, rows, rows * rows))
+
+    def moments(start, stop, origin):
+        # Count, sum x and sum x^2 over valid bars start..stop-1 (1-D row bounds), with x = row - origin
+        if complete:
+            # Every bar is present: sums of consecutive integers in closed form
+            start, stop = np.reshape(start, shape).astype(float), np.reshape(stop, shape).astype(float)
+            lo, hi = start - origin, stop - origin
+            sum_x = (hi * (hi - 1) - lo * (lo - 1)) / 2
+            sum_xx = ((hi - 1) * hi * (2 * hi - 1) - (lo - 1) * lo * (2 * lo - 1)) / 6
+            return stop - start, sum_x, sum_xx
+        m = cum_m[stop] - cum_m[start]
+        sum_r = cum_r[stop] - cum_r[start]
+        sum_rr = cum_rr[stop] - cum_rr[start]
+        return m.astype(float), (sum_r - origin * m).astype(float), (sum_rr - 2 * origin * sum_r + origin * origin * m).astype(float)
+
+    if window is None:
+        start = max(min_train, 2)
+        if n <= start:
+            return predictions
+        # Bar numbers count from each column's first valid close; target t trains on bars 0..t-1
+        origin = np.minimum(first, n - 1)
+        x = (rows - origin).astype(float)
+        # Sums over bars 0..t-1 are the cumulative sums at t-1 (missing closes were zeroed)
+        sum_y = np.cumsum(filled, axis=0)[start - 1:n - 1]
+        sum_xy = np.cumsum(x * filled, axis=0)[start - 1:n - 1]
+        m, sum_x, sum_xx = moments(np.zeros(n - start, dtype=np.int64), np.arange(start, n), origin)
+        predictions[start:] = _fit_and_predict(m, sum_x, sum_xx, sum_y, sum_xy, x[start:n])
+        if not complete:
+            predictions[start:][m < start] = np.nan
+        return predictions
+
+    window = int(window)
+    if window < 2 or n <= window:
+        return predictions
+
+    # Windows over bars 0..n-2; window w = y[s:s+W] predicts y[s+W], with x = 0..W-1 inside it
+    starts = np.arange(n - window)
+    m, sum_x, sum_xx = moments(starts, starts + window, starts.reshape(shape))
+    values = sliding_window_view(filled[:-1], window, axis=0)
+    fitted = _fit_and_predict(m, sum_x, sum_xx, values.sum(axis=-1), values @ np.arange(window, dtype=float), float(window))
+    predictions[window:] = fitted
+    if not complete:
+        # A column is scored once `window` bars have passed since its first valid close
+        predictions[window:][np.broadcast_to(rows[window:] - first < window, fitted.shape)] = np.nan
+    return predictions
+
+def walk_forward_online(close, forgetting, min_train=DEFAULT_MIN_TRAIN):
+    """One-step-ahead predictions from a trend line that down-weights bar k back by forgetting**k"""
+    y = np.asarray(close, dtype=float)
+    predictions = np.full(len(y), np.nan)
+    start = max(min_train, 2)
+    if len(y) <= start:
+        return predictions
+
+    predictor = RecursiveTrendPredictor.from_series(y[:start], forgetting)
+    predictions[start] = predictor.predict_next()
+    for t in range(start, len(y) - 1):
+        predictions[t + 1] = predictor.update(y[t])
+    return predictions
+
+def score_predictions(predictions, actual, previous):
+    """MAE, RMSE and directional accuracy over the bars that have a prediction"""
+    valid = np.isfinite(predictions) & np.isfinite(actual) & np.isfinite(previous)
+    if not valid.any():
+        return {'Bars': 0, 'MAE': np.nan, 'RMSE': np.nan, 'Directional_Accuracy': np.nan}
+
+    errors = predictions[valid] - actual[valid]
+    predicted_move = np.sign(predictions[valid] - previous[valid])
+    actual_move = np.sign(actual[valid] - previous[valid])
+    return {
+        'Bars': int(valid.sum()),
+        'MAE': float(np.mean(np.abs(errors))),
+        'RMSE': float(np.sqrt(np.mean(errors ** 2))),
+        'Directional_Accuracy': float(np.mean(predicted_move == actual_move))
+    }
+
+def walk_forward_report(df, windows=(None, 20, 60, 252), min_train=DEFAULT_MIN_TRAIN, period='Y', forgetting=DEFAULT_FORGETTING):
+    """Walk-forward metrics for one ticker, per training window and per calendar period.
+
+    Returns a DataFrame with one row per (window, period) plus an 'All' row per
+    window. period is a pandas period alias such as 'Y', 'Q' or 'M'; each
+    forgetting factor adds an exponentially weighted fit as another window.
+    """
+    close = df['Close'].to_numpy(dtype=float)
+    previous = np.concatenate([[np.nan], close[:-1]])
+    dates = pd.to_datetime(df['Date']) if 'Date' in df.columns else pd.to_datetime(df.index)
+    periods = pd.DatetimeIndex(dates).to_period(period).astype(str).to_numpy()
+
+    rows = []
+    def add_rows(label, predictions):
+        for name in pd.unique(periods):
+            mask = periods == name
+            rows.append({'Window': label, 'Period': name, **score_predictions(predictions[mask], close[mask], previous[mask])})
+        rows.append({'Window': label, 'Period': 'All', **score_predictions(predictions, close, previous)})
+
+    for window in windows:
+        if window is not None and window >= len(close):
+            continue
+        add_rows('Expanding' if window is None else f'Rolling {window}', walk_forward_predictions(close, window, min_train))
+    for factor in forgetting:
+        add_rows(f'Forgetting {factor:g}', walk_forward_online(close, factor, min_train))
+
+    report = pd.DataFrame(rows)
+    return report[report['Bars'] > 0].reset_index(drop=True) if len(report) else report
+
+def walk_forward_panel(closes, window=None, min_train=DEFAULT_MIN_TRAIN):
+    """Walk-forward metrics for many tickers at once.
+
+    closes is a DataFrame of close prices with one column per ticker (rows
+    aligned by date). Returns one row of MAE/RMSE/directional accuracy per ticker.
+    """
+    values = closes.to_numpy(dtype=float)
+    predictions = walk_forward_predictions(values, window, min_train)
+    previous = np.vstack([np.full((1, values.shape[1]), np.nan), values[:-1]])
+
+    rows = [
+        {'Ticker': ticker, **score_predictions(predictions[:, i], values[:, i], previous[:, i])}
+        for i, ticker in enumerate(closes.columns)
+    ]
+    return pd.DataFrame(rows)
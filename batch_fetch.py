@@ -0,0 +1,111 @@
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from market_cache import MarketDataCache, normalize_bars
+from utils import clean_market_data
+
+DEFAULT_MAX_WORKERS = 8
+
+def yfinance_bulk_downloader(tickers, start, end, interval="1d"):
+    """Download several tickers in a single yfinance request, grouped by ticker"""
+    import yfinance as yf
+    
+    return yf.download(tickers, start=start, end=end, interval=interval, group_by='ticker', progress=False, threads=True)
+
+def _clean_or_error(df_raw):
+    if df_raw is None or df_raw.empty:
+        return None, "No data found"
+
+    # Runs in pool threads without a script context, so problems are returned rather than shown
+    df_clean, error = clean_market_data(df_raw)
+    if error:
+        return None, error
+    if df_clean is None or len(df_clean) == 0:
+        return None, "Invalid data"
+
+    return df_clean, None
+
+def _unique_tickers(tickers):
+    seen = []
+    for ticker in tickers:
+        ticker = ticker.strip().upper()
+        if ticker and ticker not in seen:
+            seen.append(ticker)
+    return seen
+
+def fetch_many(tickers, start_date, end_date, interval="1d", max_workers=DEFAULT_MAX_WORKERS, cache=None):
+    """Fetch many tickers concurrently through the market data cache.
+
+    Returns (frames, errors): cleaned frames keyed by ticker and an error
+    message per ticker that failed, so one bad symbol never aborts the batch.
+    Workers never write to the page; the caller reports errors from its own
+    thread.
+    """
+    tickers = _unique_tickers(tickers)
+    cache = cache or MarketDataCache()
+    frames, errors = {}, {}
+
+    def fetch_one(ticker):
+        return _clean_or_error(cache.get(ticker, start_date, end_date, interval))
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(tickers) or 1))) as pool:
+        futures = {pool.submit(fetch_one, ticker): ticker for ticker in tickers}
+        for future in as_completed(futures):
+            ticker = futures[future]
+            try:
+                df_clean, error = future.result()
+            except Exception as e:
+                df_clean, error = None, str(e)
+
+            if error:
+                errors[ticker] = error
+            else:
+                frames[ticker] = df_clean
+
+    return frames, errors
+
+def fetch_many_bulk(tickers, start_date, end_date, interval="1d", downloader=yfinance_bulk_downloader):
+    """Fetch many tickers with one multi-symbol download, bypassing the cache.
+
+    Faster than per-ticker requests for a cold universe; returns the same
+    (frames, errors) pair as fetch_many.
+    """
+    tickers = _unique_tickers(tickers)
+    frames, errors = {}, {}
+
+    try:
+        df_all = downloader(tickers, start=start_date, end=end_date, interval=interval)
+    except Exception as e:
+        return frames, {ticker: str(e) for ticker in tickers}
+
+    for ticker in tickers:
+        try:
+            if isinstance(df_all.columns, pd.MultiIndex) and ticker in df_all.columns.get_level_values(0):
+                df_raw = df_all[ticker].dropna(how='all')
+            elif len(tickers) == 1:
+                df_raw = df_all
+            else:
+                errors[ticker] = "No data found"
+                continue
+
+            df_clean, error = _clean_or_error(normalize_bars(df_raw))
+        except Exception as e:
+            df_clean, error = None, str(e)
+
+        if error:
+            errors[ticker] = error
+        else:
+            frames[ticker] = df_clean
+
+    return frames, errors
+
+def to_panel(frames):
+    """Stack per-ticker frames into one long-format frame with a 'Ticker' column"""
+    if not frames:
+        return pd.DataFrame(columns=['Ticker', 'Date', 'Open', 'High', 'Low', 'Close', 'Volume'])
+
+    panel = pd.concat(
+        [df.assign(Ticker=ticker) for ticker, df in frames.items()],
+        ignore_index=True
+    )
+    columns = ['Ticker', 'Date'] + [col for col in panel.columns if col not in ('Ticker', 'Date')]
+    return panel[columns].sort_values(['Ticker', 'Date'], ignore_index=True)
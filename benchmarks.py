@@ -0,0 +1,1499 @@
+"""
+Benchmarks for FinGPT hot paths.
+
+Every benchmark runs against local fakes, so no API keys or network are needed.
+Run one with 'python benchmarks.py <name>' or all of them with 'python benchmarks.py'.
+Add '--json results.json' to save the numbers, and '--compare baseline.json' to
+fail when any timing got slower than the baseline by more than the tolerance.
+'python benchmarks.py --check' instead runs the correctness checks, which
+compare fast paths and caches against their reference behaviour.
+"""
+
+import argparse
+import ast
+import contextlib
+import itertools
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+import pandas as pd
+
+# Cold-import budget for everything app.py imports, in seconds
+IMPORT_TIME_BUDGET = float(os.getenv('IMPORT_TIME_BUDGET', '3.0'))
+# Heavy dependencies that must only be imported on first use
+DEFERRED_IMPORTS = (
+    'sentence_transformers', 'torch', 'langchain_google_genai', 'langchain_core',
+    'seaborn', 'plotly.express', 'sklearn', 'yfinance', 'matplotlib.pyplot',
+)
+
+# Series sizes for the hot-path suite: one year and ten years of daily bars, then one-minute bars
+SUITE_SIZES = (250, 2_520, 100_000, 1_000_000, 5_000_000)
+# Largest series embedded in the suite; every row becomes a text and a cache entry
+EMBED_MAX_BARS = 100_000
+# Stub encoder cost per text, close to all-MiniLM-L6-v2 batch throughput on one CPU core
+EMBED_SECONDS_PER_TEXT = 2e-4
+# Result labels ending in these hold counts, sizes or ratios; every other float is a duration in seconds
+NON_TIMING_SUFFIXES = ('tokens', 'bytes', 'tickers/sec', 'exceptions', 'hit rate', 'texts encoded')
+
+def synthetic_ohlcv(n_bars, start="2000-01-03", freq="B", seed=0):
+    """Build a deterministic random-walk OHLCV frame indexed by 'Date'"""
+    rng = np.random.default_rng(seed)
+    index = pd.date_range(start, periods=n_bars, freq=freq, name='Date')
+
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n_bars)))
+    open_ = np.concatenate([[close[0]], close[:-1]])
+    spread = np.abs(rng.normal(0, 0.005, n_bars)) * close
+    high = np.maximum(open_, close) + spread
+    low = np.minimum(open_, close) - spread
+    volume = rng.integers(1_000_000, 10_000_000, n_bars).astype(float)
+
+    return pd.DataFrame({'Open': open_, 'High': high, 'Low': low, 'Close': close, 'Volume': volume}, index=index)
+
+def fake_downloader(latency=0.05):
+    """Return a downloader with the yfinance signature that sleeps to mimic network latency"""
+    def download(ticker, start, end, interval="1d"):
+        time.sleep(latency)
+        index = pd.bdate_range(start, end, inclusive='left')
+        seed = sum(ord(c) for c in ticker)
+        return synthetic_ohlcv(len(index), start=index[0] if len(index) else start, seed=seed)
+
+    return download
+
+@contextlib.contextmanager
+def local_stub_server(routes):
+    """Serve canned responses on localhost and yield the base URL.
+
+    routes maps a path to a callable taking the decoded JSON request body (or
+    None for GET) and returning either a JSON-serializable object or an
+    iterable of objects, which is streamed as NDJSON chunks.
+    """
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, *args):
+            pass
+
+        def _respond(self, body):
+            handler = routes.get(self.path.split('?')[0])
+            if handler is None:
+                self.send_response(404)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+
+            result = handler(body)
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            if isinstance(result, (dict, list)):
+                payload = json.dumps(result).encode()
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+                return
+
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+            for chunk in result:
+                line = (json.dumps(chunk) + '\n').encode()
+                self.wfile.write(f"{len(line):x}\r\n".encode() + line + b"\r\n")
+                self.wfile.flush()
+            self.wfile.write(b"0\r\n\r\n")
+
+        def do_GET(self):
+            self._reply(None)
+
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length', 0))
+            self._reply(json.loads(self.rfile.read(length) or b'null'))
+
+        def _reply(self, body):
+            try:
+                self._respond(body)
+            except (BrokenPipeError, ConnectionResetError):
+                # The client gave up first (e.g. its request timeout expired)
+                pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+def _timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+def bench_batch_fetch(n_tickers=50, latency=0.05, workers=(1, 4, 8, 16)):
+    """Concurrent fetch_many against a sequential per-ticker loop"""
+    from market_cache import MarketDataCache
+    from batch_fetch import fetch_many
+    from utils import validate_and_clean_data
+
+    tickers = [f"T{i:03d}" for i in range(n_tickers)]
+    start, end = "2023-01-01", "2024-01-01"
+    results = {}
+
+    def sequential():
+        cache = MarketDataCache(tempfile.mkdtemp(), fake_downloader(latency))
+        return {t: validate_and_clean_data(cache.get(t, start, end)) for t in tickers}
+
+    _, results['sequential'] = _timed(sequential)
+
+    for n in workers:
+        cache = MarketDataCache(tempfile.mkdtemp(), fake_downloader(latency))
+        (frames, errors), elapsed = _timed(fetch_many, tickers, start, end, max_workers=n, cache=cache)
+        assert len(frames) == n_tickers and not errors
+        results[f'workers={n}'] = elapsed
+
+    return results
+
+def bench_ollama_rerun(reruns=50, latency=0.005):
+    """Per-rerun Ollama discovery overhead: bare requests.get against pooled, cached client"""
+    import requests
+    import ollama_models
+
+    def tags(_):
+        time.sleep(latency)
+        return {'models': [{'name': 'stub:7b'}]}
+
+    results = {}
+    with local_stub_server({'/api/tags': tags}) as base_url:
+        def before():
+            # The original code issued a fresh connection for the health check and again for the model list
+            for _ in range(reruns):
+                requests.get(f"{base_url}/api/tags").status_code == 200
+                requests.get(f"{base_url}/api/tags").json()
+
+        def after():
+            ollama_models.OLLAMA_BASE_URL = base_url
+            ollama_models.clear_ollama_status_cache()
+            for _ in range(reruns):
+                ollama_models.check_ollama_connection()
+                ollama_models.list_ollama_models()
+
+        _, elapsed = _timed(before)
+        results['before (per rerun)'] = elapsed / reruns
+        _, elapsed = _timed(after)
+        results['after (per rerun)'] = elapsed / reruns
+
+    return results
+
+def bench_ollama_streaming(n_tokens=40, token_delay=0.01):
+    """Time to first visible text: blocking generate against NDJSON streaming"""
+    import ollama_models
+
+    def generate(body):
+        words = [f"tok{i} " for i in range(n_tokens)]
+        if not body.get('stream'):
+            time.sleep(token_delay * n_tokens)
+            return {'response': ''.join(words), 'done': True}
+
+        def chunks():
+            for word in words:
+                time.sleep(token_delay)
+                yield {'response': word, 'done': False}
+            yield {'response': '', 'done': True, 'eval_count': n_tokens}
+        return chunks()
+
+    results = {}
+    with local_stub_server({'/api/generate': generate}) as base_url:
+        ollama_models.OLLAMA_BASE_URL = base_url
+
+        _, results['blocking (first text)'] = _timed(ollama_models.generate_ollama_response, "prompt", "stub")
+
+        chunks, stats = ollama_models.stream_ollama_response("prompt", "stub")
+        text = ''.join(chunks)
+        assert text.split() == [f"tok{i}" for i in range(n_tokens)] and stats.tokens == n_tokens
+        results['streaming (first text)'] = stats.time_to_first_token
+        results['streaming (total)'] = stats.total_time
+
+    return results
+
+def bench_prompt_context(sizes=(250, 2520, 50_000)):
+    """Prompt size and build time: tail(10)/describe() text against the budgeted compact context"""
+    from prompt_context import build_analysis_context, estimate_tokens
+    import indicators
+
+    results = {}
+    for n in sizes:
+        df = synthetic_ohlcv(n).reset_index()
+
+        legacy, elapsed = _timed(lambda: df.tail(10).to_string() + "\n" + df.describe().to_string())
+        results[f'n={n} legacy build'] = elapsed
+        results[f'n={n} legacy tokens'] = estimate_tokens(legacy)
+
+        indicators.clear_indicator_cache()
+        context, elapsed = _timed(build_analysis_context, df)
+        results[f'n={n} compact build'] = elapsed
+        results[f'n={n} compact tokens'] = estimate_tokens(context['data'] + "\n" + context['stats'])
+
+    return results
+
+def bench_ollama_warmup(load_delay=0.5, gen_delay=0.05):
+    """Cold versus warm generate latency, and the effect of warming a model up ahead of time"""
+    import ollama_models
+
+    loaded = set()
+    lock = threading.Lock()
+
+    def generate(body):
+        with lock:
+            cold = body['model'] not in loaded
+            loaded.add(body['model'])
+        load = load_delay if cold else 0.0
+        time.sleep(load + (gen_delay if body['prompt'] else 0))
+        return {'response': 'ok' if body['prompt'] else '', 'done': True, 'load_duration': int(load * 1e9)}
+
+    def running(_):
+        with lock:
+            return {'models': [{'name': f"{model}:latest"} for model in sorted(loaded)]}
+
+    results = {}
+    with local_stub_server({'/api/generate': generate, '/api/ps': running}) as base_url:
+        ollama_models.OLLAMA_BASE_URL = base_url
+        ollama_models.clear_ollama_status_cache()
+
+        _, results['first call (cold)'] = _timed(ollama_models.generate_ollama_response, "prompt", "model-a")
+        _, results['second call (warm)'] = _timed(ollama_models.generate_ollama_response, "prompt", "model-a")
+
+        results['warm-up of model-b'] = ollama_models.warm_up_ollama_model("model-b")
+        _, results['first call after warm-up'] = _timed(ollama_models.generate_ollama_response, "prompt", "model-b")
+        assert ollama_models.is_model_hot("model-b")
+
+    return results
+
+def bench_walk_forward(n_bars=2520, n_tickers=500, window=60):
+    """Vectorized walk-forward over a ticker panel against refitting sklearn at every step"""
+    from sklearn.linear_model import LinearRegression
+    from backtest import walk_forward_panel
+
+    closes = pd.DataFrame({f"T{i:03d}": synthetic_ohlcv(n_bars, seed=i)['Close'].to_numpy() for i in range(n_tickers)})
+    results = {}
+
+    _, results[f'panel expanding ({n_tickers} tickers)'] = _timed(walk_forward_panel, closes)
+    _, results[f'panel rolling {window} ({n_tickers} tickers)'] = _timed(walk_forward_panel, closes, window)
+
+    def sklearn_loop():
+        close = closes.iloc[:, 0].to_numpy()
+        for t in range(20, n_bars):
+            LinearRegression().fit(np.arange(t).reshape(-1, 1), close[:t]).predict([[t]])
+
+    _, results['sklearn refit loop (1 ticker)'] = _timed(sklearn_loop)
+    return results
+
+def bench_indicator_append(sizes=(20_000, 100_000, 1_000_000), new_bars=(25, 250), repeat=3):
+    """get_indicators after appending bars to a cached frame: streamed extension against a full recompute"""
+    import indicators
+
+    results = {}
+    stream_min = indicators.STREAM_MIN_BARS
+    indicators.STREAM_MIN_BARS = 0
+    try:
+        for n in sizes:
+            df = suite_frame(n)
+            for new in new_bars:
+                def append():
+                    indicators.clear_indicator_cache()
+                    indicators.get_indicators(df.iloc[:-new])
+                    return _timed(indicators.get_indicators, df)[1]
+
+                def recompute():
+                    indicators.clear_indicator_cache()
+                    return _timed(indicators.get_indicators, df)[1]
+
+                results[f'{n} bars +{new} streamed'] = min(append() for _ in range(repeat))
+                results[f'{n} bars +{new} recomputed'] = min(recompute() for _ in range(repeat))
+    finally:
+        indicators.STREAM_MIN_BARS = stream_min
+        indicators.clear_indicator_cache()
+    return results
+
+def bench_universe_forecast(n_tickers=2000, n_bars=2520, worker_counts=(1, 2, 4, 8)):
+    """Universe forecast throughput (tickers/sec) and scaling across process-pool sizes"""
+    from universe_forecast import scaling_report
+
+    closes = {f"T{i:04d}": synthetic_ohlcv(n_bars, seed=i)['Close'].to_numpy() for i in range(n_tickers)}
+    report = scaling_report(closes, worker_counts)
+
+    results = {}
+    for row in report.itertuples():
+        results[f'workers={row.workers}'] = row.seconds
+        results[f'workers={row.workers} tickers/sec'] = int(row.tickers_per_sec)
+    return results
+
+def bench_monte_carlo(n_paths=100_000, horizon=30, n_bars=1000):
+    """Monte Carlo band simulation time (target: 100k paths x 30 steps under 1s on one core)"""
+    from monte_carlo import simulate_quantile_bands
+
+    close = synthetic_ohlcv(n_bars)['Close'].to_numpy()
+    results = {}
+    for method in ('gbm', 'bootstrap'):
+        _, results[method] = _timed(simulate_quantile_bands, close, horizon, n_paths, method)
+    return results
+
+def bench_chart_payload(n_bars=100_000):
+    """Plotly JSON payload size and Matplotlib render time per chart, with and without downsampling"""
+    import matplotlib
+    matplotlib.use('Agg')
+    import advanced_charts
+    import charts
+    import downsample
+    import render_cache
+
+    df = synthetic_ohlcv(n_bars, freq='min').reset_index()
+    captured = {}
+
+    def capture_plotly(fig, **kwargs):
+        captured['bytes'] = len(fig.to_json())
+
+    def capture_image(image, **kwargs):
+        captured['bytes'] = len(image)
+
+    plotly_chart, image = advanced_charts.st.plotly_chart, render_cache.st.image
+    advanced_charts.st.plotly_chart = capture_plotly
+    render_cache.st.image = capture_image
+    enabled = downsample.DOWNSAMPLE_ENABLED
+
+    results = {}
+    try:
+        for label, fn in [
+            ('candlestick', lambda: advanced_charts.display_candlestick_chart(df)),
+            ('volume', lambda: advanced_charts.display_volume_chart(df)),
+            ('moving averages', lambda: advanced_charts.display_moving_averages(df)),
+            ('price line (png)', lambda: charts.display_financial_charts(df, 'SYN')),
+        ]:
+            for mode, flag in (('full', False), ('downsampled', True)):
+                downsample.DOWNSAMPLE_ENABLED = flag
+                captured.clear()
+                _, results[f'{label} {mode}'] = _timed(fn)
+                results[f'{label} {mode} bytes'] = captured.get('bytes', 0)
+    finally:
+        advanced_charts.st.plotly_chart, render_cache.st.image = plotly_chart, image
+        downsample.DOWNSAMPLE_ENABLED = enabled
+    return results
+
+def bench_render_cache(n_bars=1260):
+    """Matplotlib chart reruns: seaborn vs the plain Matplotlib fast path on a miss, and a cache hit"""
+    import matplotlib
+    matplotlib.use('Agg')
+    import advanced_charts
+    import charts
+    import render_cache
+    from monte_carlo import simulate_quantile_bands
+
+    df = synthetic_ohlcv(n_bars).reset_index()
+    bands = simulate_quantile_bands(df['Close'], 30, 10_000)
+    image = render_cache.st.image
+    render_cache.st.image = lambda *args, **kwargs: None
+    fast_path = render_cache.CHART_FAST_PATH
+
+    results = {}
+    try:
+        for label, fn, modes in [
+            ('price line', lambda: charts.display_financial_charts(df, 'SYN'), (False, True)),
+            ('prediction', lambda: charts.display_prediction_chart(df, 101.5, bands), (False, True)),
+            ('correlation heatmap', lambda: advanced_charts.display_correlation_heatmap(df), (False,)),
+        ]:
+            for flag in modes:
+                mode = 'fast path' if flag else 'seaborn'
+                render_cache.CHART_FAST_PATH = charts.CHART_FAST_PATH = flag
+                render_cache.load_render_cache.clear()
+                _, results[f'{label} miss ({mode})'] = _timed(fn)
+            _, results[f'{label} hit'] = _timed(fn)
+    finally:
+        render_cache.st.image = image
+        render_cache.CHART_FAST_PATH = charts.CHART_FAST_PATH = fast_path
+    return results
+
+def bench_app_rerun(n_bars=1260, search_latency=0.3, script='app.py'):
+    """Wall time of full app.py reruns for typical interactions, with local stubs for Ollama and news search"""
+    import os
+    from streamlit.testing.v1 import AppTest
+
+    def search(body):
+        time.sleep(search_latency)
+        return {'organic': [{'title': f"Headline {i}", 'link': f"https://news.example/{i}", 'snippet': "..."} for i in range(5)]}
+
+    routes = {
+        '/api/tags': lambda body: {'models': [{'name': 'llama3:8b'}]},
+        '/api/ps': lambda body: {'models': []},
+        '/api/generate': lambda body: {'response': '', 'done': True},
+        '/search': search,
+    }
+    df = synthetic_ohlcv(n_bars).reset_index()
+
+    with local_stub_server(routes) as base_url, tempfile.TemporaryDirectory() as directory:
+        os.environ.update({
+            'OLLAMA_BASE_URL': base_url,
+            'SERPER_URL': f"{base_url}/search",
+            'SERPER_API_KEY': 'bench',
+            'SEARCH_MODE': 'sequential',
+            'NEWS_CACHE_PATH': os.path.join(directory, 'news.sqlite'),
+        })
+        at = AppTest.from_file(script, default_timeout=120)
+        at.session_state['df'] = df
+        at.session_state['ticker'] = 'SYN'
+
+        def step(action):
+            started = time.perf_counter()
+            action()
+            return time.perf_counter() - started
+
+        def open_section(label):
+            sections = [radio for radio in at.radio if radio.key == 'active_section']
+            if sections:
+                sections[0].set_value(next(option for option in sections[0].options if label in option)).run()
+
+        results = {}
+        results['first load'] = step(at.run)
+        results['rerun, nothing changed'] = step(at.run)
+
+        open_section('News')
+        results['edit Ollama query (News)'] = step(lambda: at.text_area(key='ollama_query_textarea').input("Any momentum?").run())
+
+        open_section('Prediction')
+        horizon = next(slider for slider in at.slider if 'horizon' in slider.label)
+        results['move band horizon (Prediction)'] = step(lambda: horizon.set_value(45).run())
+        results['exceptions'] = len(at.exception)
+    return results
+
+def app_imports(path='app.py'):
+    """Modules imported at the top level of the Streamlit script"""
+    with open(path) as f:
+        tree = ast.parse(f.read())
+    modules = []
+    for node in tree.body:
+        if isinstance(node, ast.ImportFrom) and node.level == 0:
+            modules.append(node.module)
+        elif isinstance(node, ast.Import):
+            modules.extend(alias.name for alias in node.names)
+    return list(dict.fromkeys(modules))
+
+def import_profile(modules):
+    """Run 'python -X importtime' over modules in a fresh interpreter; return {module: cumulative seconds} per line"""
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f"import {', '.join(modules)}"],
+        capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__))
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"Importing the app failed: {proc.stderr.strip().splitlines()[-1]}")
+
+    profile = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # Nesting shows as two extra spaces of indentation per level
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        profile.append((name.strip(), depth, int(cumulative) / 1e6))
+    return profile
+
+def bench_import_time(budget=IMPORT_TIME_BUDGET, runs=3, top=8):
+    """Cold import time of app.py's imports; fails past the budget or when a deferred dependency loads eagerly"""
+    modules = app_imports()
+    profiles = [import_profile(modules) for _ in range(runs)]
+    totals = sorted(sum(seconds for _, depth, seconds in profile if depth == 0) for profile in profiles)
+    total = totals[len(totals) // 2]
+
+    # Heaviest top-level imports from the median run
+    profile = profiles[[sum(s for _, d, s in p if d == 0) for p in profiles].index(total)]
+    results = {'total (median)': total}
+    for name, _, seconds in sorted((entry for entry in profile if entry[1] == 0), key=lambda entry: -entry[2])[:top]:
+        results[name] = seconds
+
+    eager = sorted({name for name, _, _ in profile if name in DEFERRED_IMPORTS})
+    if eager:
+        raise RuntimeError(f"Deferred dependencies imported at startup: {', '.join(eager)}")
+    if total > budget:
+        raise RuntimeError(f"Startup imports took {total:.2f}s, over the {budget:.2f}s budget")
+    return results
+
+# Search responses in each provider's shape, as returned by the APIs
+RECORDED_SEARCH_PAYLOADS = {
+    'serper': {
+        'searchParameters': {'q': 'NVDA financial news', 'type': 'search', 'engine': 'google'},
+        'organic': [
+            {
+                'title': f"NVIDIA shares move after earnings update {i}",
+                'link': f"https://www.example-markets.com/nvda/earnings-{i}?utm_source=feed",
+                'snippet': "NVIDIA reported quarterly revenue ahead of estimates as data center demand "
+                           "continued to grow, while guidance pointed to further expansion.",
+                'date': f"{i + 1} hours ago",
+                'position': i + 1,
+            }
+            for i in range(10)
+        ],
+        'topStories': [{'title': "Chip stocks rally", 'link': "https://news.example.com/chips", 'source': "Example News"}],
+        'relatedSearches': [{'query': 'nvda stock forecast'}, {'query': 'nvidia earnings date'}],
+    },
+    'searchapi': {
+        'search_metadata': {'id': 'search_123', 'status': 'Success'},
+        'answerBox': {
+            'type': 'organic_result',
+            'title': 'NVIDIA Corp (NVDA) stock price',
+            'link': 'https://www.example-finance.com/quote/NVDA',
+            'snippet': "NVIDIA closed higher on Friday, extending its weekly gain as semiconductor stocks advanced.",
+        },
+        'organic_results': [{'position': 1, 'title': 'NVDA quote', 'link': 'https://www.example-finance.com/quote/NVDA'}],
+    },
+    'exa': SimpleNamespace(results=[
+        SimpleNamespace(
+            title=f"NVIDIA outlook and analyst notes {i}",
+            url=f"https://research.example.org/nvda/{i}",
+            text="Analysts raised price targets on NVIDIA after the company detailed its product roadmap. " * 12,
+        )
+        for i in range(10)
+    ]),
+}
+RECORDED_SEARCH_PAYLOADS['merged'] = {'merged': [RECORDED_SEARCH_PAYLOADS[name] for name in ('exa', 'serper', 'searchapi')]}
+
+class StubEmbeddingModel:
+    """Stand-in for the sentence transformer that maps each text to a deterministic unit vector"""
+
+    def __init__(self, dim=384, seconds_per_text=0.0):
+        self.frequencies = np.arange(1, dim + 1, dtype=np.float32)
+        self.seconds_per_text = seconds_per_text
+        self.encoded = 0
+
+    def encode(self, texts, **kwargs):
+        self.encoded += len(texts)
+        time.sleep(self.seconds_per_text * len(texts))
+        seeds = np.fromiter((zlib.crc32(text.encode()) for text in texts), dtype=np.float32, count=len(texts))
+        vectors = np.sin(np.outer(seeds, self.frequencies))
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+def suite_frame(n_bars, seed=0):
+    """Raw bars as the market cache returns them: daily up to ten years, one-minute bars beyond"""
+    return synthetic_ohlcv(n_bars, freq='B' if n_bars <= 2_520 else 'min', seed=seed)
+
+def _best_of(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        _, elapsed = _timed(fn)
+        best = min(best, elapsed)
+    return best
+
+def bench_hot_paths(sizes=SUITE_SIZES, repeat=3):
+    """Data cleaning, metrics, indicators, prediction, embedding and news parsing across series sizes"""
+    import advanced_charts
+    import embeddings
+    import indicators
+    from embedding_cache import EmbeddingCache
+    from models import perform_price_prediction
+    from utils import validate_and_clean_data, get_financial_metrics
+    from web_search import extract_key_info
+
+    results = {}
+    plotly_chart = advanced_charts.st.plotly_chart
+    load_model, load_cache = embeddings.load_embedding_model, embeddings.load_embedding_cache
+    advanced_charts.st.plotly_chart = lambda *args, **kwargs: None
+    model = StubEmbeddingModel(seconds_per_text=EMBED_SECONDS_PER_TEXT)
+    embeddings.load_embedding_model = lambda: model
+
+    def chart(display, df):
+        def run():
+            # Clear the memo so the indicator computation is measured, not the cache hit
+            indicators.clear_indicator_cache()
+            display(df)
+        return run
+
+    try:
+        for n_bars in sizes:
+            raw = suite_frame(n_bars)
+            df = validate_and_clean_data(raw)
+            runs = repeat if n_bars <= 100_000 else 1
+
+            cases = {
+                'validate_and_clean_data': lambda: validate_and_clean_data(raw),
+                'get_financial_metrics': lambda: get_financial_metrics(df),
+                'compute_indicators': lambda: indicators.compute_indicators(df['Close'], df['High'], df['Low']),
+                'moving averages chart': chart(advanced_charts.display_moving_averages, df),
+                'bollinger bands chart': chart(advanced_charts.display_bollinger_bands, df),
+                'rsi chart': chart(advanced_charts.display_rsi_indicator, df),
+                'perform_price_prediction': lambda: perform_price_prediction(df),
+            }
+            for name, fn in cases.items():
+                results[f'{name} @ {n_bars:,}'] = _best_of(fn, runs)
+
+            if n_bars <= EMBED_MAX_BARS:
+                with tempfile.TemporaryDirectory() as directory:
+                    cache = EmbeddingCache(os.path.join(directory, 'embeddings.sqlite'))
+                    embeddings.load_embedding_cache = lambda: cache
+                    _, results[f'embed_financial_data cold @ {n_bars:,}'] = _timed(embeddings.embed_financial_data, df)
+                    encoded, hits, misses = model.encoded, cache.hits, cache.misses
+                    results[f'embed_financial_data warm @ {n_bars:,}'] = _best_of(lambda: embeddings.embed_financial_data(df), runs)
+                    # The warm runs must be served from the cache, not the model
+                    results[f'embed_financial_data warm @ {n_bars:,} texts encoded'] = model.encoded - encoded
+                    results[f'embed_financial_data warm @ {n_bars:,} hit rate'] = (cache.hits - hits) / (cache.hits - hits + cache.misses - misses)
+            del raw, df
+    finally:
+        advanced_charts.st.plotly_chart = plotly_chart
+        embeddings.load_embedding_model, embeddings.load_embedding_cache = load_model, load_cache
+        indicators.clear_indicator_cache()
+
+    calls = 1000
+    for provider, payload in RECORDED_SEARCH_PAYLOADS.items():
+        def parse_many(payload=payload):
+            for _ in range(calls):
+                extract_key_info(payload)
+        results[f'extract_key_info {provider} (per call)'] = _best_of(parse_many, repeat) / calls
+    return results
+
+def check_market_cache_adjustment():
+    """Cached bars are rebuilt when a re-adjustment changes the overlapping bar, and extended otherwise"""
+    from market_cache import MarketDataCache
+
+    history = synthetic_ohlcv(len(pd.bdate_range("2020-01-01", "2025-12-31")), start="2020-01-01")
+    state = {'factor': 1.0, 'calls': []}
+
+    def download(ticker, start, end, interval="1d"):
+        state['calls'].append((str(start), str(end)))
+        bars = history.loc[pd.Timestamp(start):pd.Timestamp(end) - pd.Timedelta(days=1)].copy()
+        bars[['Open', 'High', 'Low', 'Close']] *= state['factor']
+        return bars
+
+    def expected(start, end):
+        bars = history.loc[start:pd.Timestamp(end) - pd.Timedelta(days=1)]
+        return bars[['Open', 'High', 'Low', 'Close']] * state['factor']
+
+    with tempfile.TemporaryDirectory() as directory:
+        cache = MarketDataCache(directory, download)
+        cache.get("T", "2024-03-01", "2024-06-01")
+        extended = cache.get("T", "2024-01-01", "2024-09-01")
+        assert len(state['calls']) == 3, f"extending should download only head and tail, got {state['calls']}"
+        assert np.allclose(extended[['Open', 'High', 'Low', 'Close']], expected("2024-01-01", "2024-09-01"))
+
+        # A 2:1 split re-adjusts every earlier price; the stitched series must not jump
+        state['factor'] = 0.5
+        split = cache.get("T", "2024-01-01", "2024-12-01")
+        assert len(state['calls']) == 5, f"a changed overlap should trigger one full download, got {state['calls']}"
+        assert np.allclose(split[['Open', 'High', 'Low', 'Close']], expected("2024-01-01", "2024-12-01"))
+        assert state['calls'][-1] == ("2024-01-01", "2024-12-01")
+
+        # Entries past MARKET_CACHE_MAX_AGE_DAYS are treated as missing
+        meta_path = cache._paths("T", "1d")[1]
+        with open(meta_path) as f:
+            meta = json.load(f)
+        meta['fetched_at'] = (pd.Timestamp.now() - pd.Timedelta(days=365)).isoformat()
+        with open(meta_path, 'w') as f:
+            json.dump(meta, f)
+        assert cache.load("T", "1d")[0] is None
+
+    return {'downloads': len(state['calls'])}
+
+def _assert_close(label, got, expected, rtol=1e-9):
+    got, expected = np.asarray(got, dtype=float), np.asarray(expected, dtype=float)
+    assert np.array_equal(np.isnan(got), np.isnan(expected)), f"{label}: NaN positions differ"
+    scale = np.nanmax(np.abs(expected)) if np.isfinite(expected).any() else 1.0
+    error = np.nanmax(np.abs(got - expected)) / scale if np.isfinite(expected).any() else 0.0
+    assert error <= rtol, f"{label}: relative error {error:.2e} > {rtol:.0e}"
+    return error
+
+def check_streaming_indicators(n_bars=20_000, new_bars=25):
+    """Streaming indicator state matches compute_indicators, replayed from scratch and resumed from a cached frame"""
+    import indicators
+    from streaming_indicators import IndicatorState
+
+    df = suite_frame(n_bars)
+    batch = indicators.compute_indicators(df['Close'], df['High'], df['Low'])
+    state = IndicatorState()
+    streamed = pd.DataFrame([state.update(bar) for bar in df[['High', 'Low', 'Close']].to_dict('records')])
+    worst = max(_assert_close(f"replay {name}", streamed[name], values) for name, values in batch.items())
+
+    # Resume from a cached frame large enough to take the streaming path
+    df = suite_frame(max(n_bars, indicators.STREAM_MIN_BARS + new_bars))
+    batch = indicators.compute_indicators(df['Close'], df['High'], df['Low'])
+
+    # A few appended bars extend the cached frame incrementally instead of recomputing it
+    compute = indicators.compute_indicators
+
+    def no_batch(*args, **kwargs):
+        raise AssertionError("appending bars to a cached frame fell back to a batch recompute")
+
+    indicators.clear_indicator_cache()
+    try:
+        indicators.get_indicators(df.iloc[:-new_bars])
+        indicators.compute_indicators = no_batch
+        extended, incremental = _timed(indicators.get_indicators, df)
+        indicators.compute_indicators = compute
+        indicators.clear_indicator_cache()
+        recomputed, full = _timed(indicators.get_indicators, df)
+    finally:
+        indicators.compute_indicators = compute
+        indicators.clear_indicator_cache()
+    assert list(extended.columns) == list(recomputed.columns)
+    worst = max([worst] + [_assert_close(f"resumed {name}", extended[name], recomputed[name]) for name in batch])
+    return {'max relative error': f"{worst:.1e}", 'incremental': format_value(incremental).strip(), 'full': format_value(full).strip()}
+
+def check_financial_texts(n_bars=2_520):
+    """Vectorized row texts equal the original per-row f-strings, so embedding cache keys are unchanged"""
+    from embeddings import financial_texts
+    from utils import validate_and_clean_data
+
+    for df in (validate_and_clean_data(suite_frame(n_bars)), validate_and_clean_data(suite_frame(100_000)).head(n_bars)):
+        expected = [
+            f"Date: {row['Date']}, Open: {row['Open']}, High: {row['High']}, Low: {row['Low']}, Close: {row['Close']}, Volume: {row['Volume']}"
+            for _, row in df.iterrows()
+        ]
+        texts = financial_texts(df)
+        mismatched = [i for i, (got, want) in enumerate(zip(texts, expected)) if got != want]
+        assert len(texts) == len(expected) and not mismatched, f"row {mismatched[0]}: {texts[mismatched[0]]!r} != {expected[mismatched[0]]!r}"
+    return {'rows': 2 * n_bars}
+
+def check_search_fan_out(step=0.1):
+    """Sequential, first, hedged and merge search modes against sleep-based fake providers, plus the Exa timeout"""
+    import web_search
+    from news_cache import NewsCache
+
+    release = threading.Event()
+    started = {}
+
+    def provider(name, delay, result=None, fail=False, hang=False):
+        def search(query):
+            started[name] = time.monotonic()
+            if hang:
+                release.wait(10)
+                return None
+            time.sleep(delay)
+            if fail:
+                raise RuntimeError(f"{name} failed")
+            return result
+        return (name, search)
+
+    def article(title, url):
+        return {'organic': [{'title': title, 'link': url, 'snippet': f"{title} snippet"}]}
+
+    try:
+        # Sequential: providers run in order and stop at the first good result
+        started.clear()
+        result = web_search._search_sequential("q", [provider('a', 0, None), provider('b', 0, 'B'), provider('c', 0, 'C')])
+        assert result == 'B' and 'c' not in started, f"sequential: {result}, started {sorted(started)}"
+
+        # First: every provider starts at once and the fastest good result wins
+        started.clear()
+        t0 = time.monotonic()
+        results = web_search.fan_out_search("q", [provider('slow', 3 * step, 'S'), provider('fast', step, 'F')])
+        assert results == [('fast', 'F')] and time.monotonic() - t0 < 2.5 * step, f"first: {results}"
+
+        # Hedged: the backup starts one hedge delay after a slow primary, and providers
+        # whose slot never comes up are not started at all
+        started.clear()
+        t0 = time.monotonic()
+        results = web_search.fan_out_search(
+            "q", [provider('primary', 5 * step, 'P'), provider('backup', step, 'B'), provider('spare', 0, 'X')],
+            hedge_delay=2 * step
+        )
+        assert results == [('backup', 'B')], f"hedged: {results}"
+        assert started['backup'] - t0 >= 1.9 * step and 'spare' not in started, f"hedged start times {started}"
+
+        # A provider that fails straight away hands over without waiting for its hedge slot
+        started.clear()
+        t0 = time.monotonic()
+        results = web_search.fan_out_search("q", [provider('broken', 0, fail=True), provider('next', 0, 'N')], hedge_delay=10 * step)
+        assert results == [('next', 'N')] and started['next'] - t0 < 5 * step, f"failover: {results} {started}"
+
+        # A hung provider is abandoned at the deadline
+        t0 = time.monotonic()
+        results = web_search.fan_out_search("q", [provider('hung', 0, hang=True)], deadline=2 * step)
+        assert results == [] and time.monotonic() - t0 < 5 * step, "hung provider held the search past its deadline"
+
+        # Merge: every good result within the deadline, in arrival order, deduplicated downstream
+        providers = [
+            provider('serper', step, article("Chip maker beats estimates", "https://www.news.com/a?utm_source=x")),
+            provider('searchapi', 2 * step, article("Chip maker beats estimates", "https://news.com/a/")),
+            provider('exa', 0, article("Guidance raised", "https://other.com/b")),
+            provider('late', 20 * step, article("Too late", "https://late.com/c")),
+        ]
+        results = web_search.fan_out_search("q", providers, collect_all=True, deadline=5 * step)
+        assert [name for name, _ in results] == ['exa', 'serper', 'searchapi'], f"merge order: {results}"
+
+        with tempfile.TemporaryDirectory() as directory:
+            cache = NewsCache(os.path.join(directory, 'news.sqlite'))
+            original = web_search.SEARCH_PROVIDERS, web_search.load_news_cache
+            web_search.SEARCH_PROVIDERS, web_search.load_news_cache = providers[:3], lambda: cache
+            try:
+                articles = web_search.get_financial_news("TEST", mode="merge")
+            finally:
+                web_search.SEARCH_PROVIDERS, web_search.load_news_cache = original
+        titles = sorted(a['title'] for a in articles)
+        assert titles == ["Chip maker beats estimates", "Guidance raised"], f"merge dedup: {titles}"
+
+        # Exa requests carry SEARCH_PROVIDER_TIMEOUT, so a hung Exa endpoint fails fast
+        def hung_search(body):
+            release.wait(10)
+            return {'results': []}
+
+        with local_stub_server({'/search': hung_search}) as base_url:
+            saved = web_search.EXA_BASE_URL, web_search.SEARCH_PROVIDER_TIMEOUT, os.environ.get('EXA_API_KEY')
+            web_search.EXA_BASE_URL, web_search.SEARCH_PROVIDER_TIMEOUT = base_url, 2 * step
+            os.environ['EXA_API_KEY'] = 'test'
+            try:
+                t0 = time.monotonic()
+                result = web_search.search_exa("q")
+                elapsed = time.monotonic() - t0
+            finally:
+                web_search.EXA_BASE_URL, web_search.SEARCH_PROVIDER_TIMEOUT = saved[:2]
+                if saved[2] is None:
+                    os.environ.pop('EXA_API_KEY')
+                else:
+                    os.environ['EXA_API_KEY'] = saved[2]
+                release.set()
+        assert result is None and elapsed < 5 * step, f"Exa call took {elapsed:.2f}s despite the timeout"
+    finally:
+        release.set()
+    return {'exa timeout': format_value(elapsed).strip()}
+
+def check_llm_cache_scope():
+    """Semantic cache hits need the same data scope and hard keys; only the free text is compared"""
+    from llm_cache import ResponseCache, data_scope
+
+    def embed(text):
+        # Character trigram counts: near-identical wording scores close to 1
+        vector = np.zeros(512)
+        text = f"  {text.lower()} "
+        for i in range(len(text) - 2):
+            vector[zlib.crc32(text[i:i + 3].encode()) % 512] += 1
+        return vector
+
+    df = suite_frame(250).reset_index()
+    scope = data_scope(df, "NVDA")
+    cache = ResponseCache(embed_fn=embed, similarity_threshold=0.85)
+    cache.store("model", "template", scope, "Is NVDA overbought right now?", "overbought answer")
+    cache.store("model", "template", scope, "What was the close on 2024-01-02?", "close answer")
+
+    cases = [
+        ("Is NVDA overbought right now", scope, "overbought answer"),
+        ("Right now, is NVDA overbought?", scope, "overbought answer"),
+        ("Is NVDA oversold right now?", scope, None),
+        ("Is AMD overbought right now?", scope, None),
+        ("What was the close on 2024-01-03?", scope, None),
+        ("Is NVDA overbought right now?", data_scope(df.iloc[:-1], "NVDA"), None),
+        ("Is NVDA overbought right now?", data_scope(df, "AMD"), None),
+    ]
+    for question, case_scope, expected in cases:
+        got = cache.lookup("model", "template", case_scope, question)
+        assert got == expected, f"{question!r}: got {got!r}, expected {expected!r}"
+    return cache.stats()
+
+def check_analysis_orchestrator(step=0.1):
+    """Completion order, the overall deadline and per-group concurrency limits with sleep-based fake backends"""
+    from analysis_orchestrator import AnalysisBackend, iter_analyses
+
+    lock = threading.Lock()
+    running = {}
+    peak = {}
+
+    def backend(name, delay, group=None, response="ok", fail=False):
+        def fn(df, query):
+            key = group or name
+            with lock:
+                running[key] = running.get(key, 0) + 1
+                peak[key] = max(peak.get(key, 0), running[key])
+            try:
+                time.sleep(delay)
+                if fail:
+                    raise RuntimeError("backend failed")
+                return response
+            finally:
+                with lock:
+                    running[key] -= 1
+        return AnalysisBackend(name, fn, group)
+
+    # Results arrive in completion order, and wall time tracks the slowest backend
+    t0 = time.perf_counter()
+    results = list(iter_analyses([backend('slow', 3 * step), backend('fast', step), backend('mid', 2 * step)], None, "q"))
+    wall = time.perf_counter() - t0
+    assert [r['backend'] for r in results] == ['fast', 'mid', 'slow'], f"order: {[r['backend'] for r in results]}"
+    assert wall < 4.5 * step, f"backends did not overlap: {wall:.2f}s"
+
+    # Failures and empty answers are reported per backend
+    results = {r['backend']: r for r in iter_analyses([backend('broken', 0, fail=True), backend('empty', 0, response="")], None, "q")}
+    assert results['broken']['error'] == "backend failed" and results['empty']['error'] == "Empty response"
+
+    # A backend still running at the deadline is reported as timed out without waiting for it
+    t0 = time.perf_counter()
+    results = list(iter_analyses([backend('hung', 20 * step), backend('quick', 0)], None, "q", deadline=2 * step))
+    wall = time.perf_counter() - t0
+    assert [r['backend'] for r in results] == ['quick', 'hung'] and results[1]['error'].startswith("Timed out"), f"deadline: {results}"
+    assert wall < 5 * step, f"deadline not enforced: {wall:.2f}s"
+
+    # Group semaphores: one request at a time for a local server, two for a cloud group
+    peak.clear()
+    t0 = time.perf_counter()
+    backends = [backend(f'local-{i}', step, group='local') for i in range(3)] + [backend(f'cloud-{i}', step, group='cloud') for i in range(4)]
+    results = list(iter_analyses(backends, None, "q", concurrency={'local': 1, 'cloud': 2}))
+    wall = time.perf_counter() - t0
+    assert len(results) == 7 and not any(r['error'] for r in results)
+    assert peak == {'local': 1, 'cloud': 2}, f"in-flight peaks {peak}"
+    assert 2.9 * step <= wall < 5 * step, f"grouped wall time {wall:.2f}s"
+    return {'peak in flight': peak, 'grouped wall': format_value(wall).strip()}
+
+def check_ollama_residency():
+    """keep_alive parsing of Go durations, and hot/cold status taken from the server's /api/ps"""
+    import ollama_models
+
+    parse = ollama_models.parse_keep_alive
+    cases = {'30m': 1800, '1h30m': 5400, '1m30s': 90, '1m30.5s': 90.5, '500ms': 0.5, '2h': 7200, '45': 45, '-1': None, '-1m': None}
+    for value, expected in cases.items():
+        assert parse(value) == expected, f"parse_keep_alive({value!r}) = {parse(value)}"
+    for value in ('', '5x', '1h30', 'm'):
+        try:
+            parse(value)
+        except ValueError:
+            continue
+        raise AssertionError(f"parse_keep_alive({value!r}) did not fail")
+
+    running = []
+    requests_seen = []
+
+    def ps(_):
+        requests_seen.append('/api/ps')
+        return {'models': [{'name': name} for name in running]}
+
+    def generate(body):
+        requests_seen.append('/api/generate')
+        running.append(f"{body['model']}:latest")
+        return {'response': 'ok', 'done': True}
+
+    original = ollama_models.OLLAMA_BASE_URL
+    ollama_models.clear_ollama_status_cache()
+    try:
+        with local_stub_server({'/api/ps': ps, '/api/generate': generate}) as base_url:
+            ollama_models.OLLAMA_BASE_URL = base_url
+            # Used a moment ago by us, but the server has already evicted it
+            ollama_models._record_model_use(base_url, 'evicted', 0.1, False)
+            assert not ollama_models.is_model_hot('evicted')
+            # The list is cached: further checks within OLLAMA_STATUS_TTL do not ask again
+            for _ in range(5):
+                ollama_models.is_model_hot('evicted')
+            assert requests_seen == ['/api/ps'], f"uncached /api/ps: {requests_seen}"
+
+            # Loaded by another client; an untagged name matches ':latest'
+            running.extend(['shared:latest', 'tagged:7b'])
+            ollama_models.clear_ollama_status_cache()
+            assert ollama_models.is_model_hot('shared') and ollama_models.is_model_hot('tagged:7b')
+            assert not ollama_models.is_model_hot('tagged')
+            assert ollama_models.list_running_ollama_models() == running
+
+            # Generating does not probe the server first, and marks the model as loaded
+            ollama_models.clear_ollama_status_cache()
+            del requests_seen[:]
+            assert ollama_models.generate_ollama_response("prompt", "fresh") == 'ok'
+            assert requests_seen == ['/api/generate'], f"generate probed the server: {requests_seen}"
+            assert ollama_models.is_model_hot('fresh', ask_server=False), "an answered model was not marked hot"
+            assert ollama_models.is_model_hot('fresh') and requests_seen == ['/api/generate', '/api/ps']
+            # With a fresh cached list, the answering model is added to it without asking again
+            ollama_models.generate_ollama_response("prompt", "other")
+            running.remove('other:latest')
+            assert ollama_models.is_model_hot('other') and requests_seen.count('/api/ps') == 1
+
+        # Server unreachable: fall back to our own last-used time and keep_alive, and stop asking
+        with socket.socket() as closed:
+            closed.bind(('127.0.0.1', 0))
+            ollama_models.OLLAMA_BASE_URL = f"http://127.0.0.1:{closed.getsockname()[1]}"
+        ollama_models._record_model_use(ollama_models.OLLAMA_BASE_URL, 'used', 0.1, False)
+        assert ollama_models.is_model_hot('used') and not ollama_models.is_model_hot('unused')
+        assert ollama_models._running_cache[ollama_models.OLLAMA_BASE_URL][1] is None
+    finally:
+        ollama_models.OLLAMA_BASE_URL = original
+        ollama_models._model_status.clear()
+        ollama_models.clear_ollama_status_cache()
+    return {'durations parsed': len(cases)}
+
+def check_online_regression(n_bars=3000, new_bars=50, forgetting=0.98):
+    """Recursive least squares against the batch (weighted) OLS fit, walk-forward and incremental use"""
+    from models import perform_price_prediction
+    from online_regression import RecursiveTrendPredictor, cached_predictor
+    from backtest import walk_forward_predictions, walk_forward_online
+
+    df = synthetic_ohlcv(n_bars)
+    close = df['Close'].to_numpy()
+    before = df.copy()
+
+    def weighted_ols_next(prices, factor):
+        t = np.arange(len(prices), dtype=float)
+        root = np.sqrt(factor ** t[::-1])
+        coef = np.linalg.lstsq(np.column_stack([root, root * t]), root * prices, rcond=None)[0]
+        return coef[0] + coef[1] * len(prices)
+
+    errors = {}
+    # forgetting=1 is the sklearn fit perform_price_prediction makes
+    bootstrapped = RecursiveTrendPredictor.from_series(close)
+    errors['batch'] = _assert_close("from_series vs LinearRegression", bootstrapped.predict_next(), perform_price_prediction(df))
+    streamed = RecursiveTrendPredictor()
+    for price in close:
+        streamed.update(price)
+    errors['per-bar'] = _assert_close("per-bar updates vs LinearRegression", streamed.predict_next(), perform_price_prediction(df), rtol=1e-8)
+
+    weighted = RecursiveTrendPredictor(forgetting)
+    weighted.extend(close)
+    expected = weighted_ols_next(close, forgetting)
+    errors['weighted per-bar'] = _assert_close("weighted updates vs weighted OLS", weighted.predict_next(), expected, rtol=1e-8)
+    errors['weighted batch'] = _assert_close("weighted from_series vs weighted OLS", RecursiveTrendPredictor.from_series(close, forgetting).predict_next(), expected)
+
+    # Walk-forward: the online replay with forgetting=1 is the expanding closed form
+    errors['walk-forward'] = _assert_close("online vs expanding walk-forward", walk_forward_online(close, 1.0), walk_forward_predictions(close), rtol=1e-8)
+    online = walk_forward_online(close[:400], forgetting)
+    spot = [weighted_ols_next(close[:t], forgetting) for t in (20, 100, 399)]
+    errors['weighted walk-forward'] = _assert_close("weighted walk-forward", online[[20, 100, 399]], spot, rtol=1e-8)
+
+    # Incremental use: appended bars extend the cached predictor, a revised history rebuilds it
+    cache = {}
+    first = cached_predictor(cache, 'T', close[:-new_bars])
+    extended = cached_predictor(cache, 'T', close)
+    assert extended is first, "appended bars rebuilt the predictor"
+    errors['extended'] = _assert_close("extended vs rebuilt", extended.predict_next(), RecursiveTrendPredictor.from_series(close).predict_next(), rtol=1e-8)
+    revised = close.copy()
+    revised[10] *= 1.01
+    assert cached_predictor(cache, 'T', revised) is not first, "a revised history reused stale state"
+
+    pd.testing.assert_frame_equal(df, before)
+    return {'max relative error': f"{max(errors.values()):.1e}"}
+
+def check_session_cache(limit=4):
+    """session_cached keeps at most SESSION_CACHE_MAX_ENTRIES results, dropping the least recently used"""
+    import streamlit as st
+    import session_cache
+    from session_cache import session_cached, clear_session_cache
+
+    calls = []
+    def compute(value):
+        calls.append(value)
+        return value
+
+    original = session_cache.SESSION_CACHE_MAX_ENTRIES
+    session_cache.SESSION_CACHE_MAX_ENTRIES = limit
+    try:
+        clear_session_cache()
+        for horizon in range(limit):
+            session_cached('bands', 'data', lambda: compute(horizon), horizon)
+        session_cached('bands', 'data', lambda: compute(0), 0)
+        session_cached('bands', 'data', lambda: compute(limit), limit)
+        cache = st.session_state[session_cache.SESSION_CACHE_KEY]['values']
+        assert calls.count(0) == 1 and ('bands', 0) in cache and ('bands', 1) not in cache, "eviction ignored recent use"
+        # A slider sweep: every new value is a new entry
+        for horizon in range(limit + 1, 3 * limit):
+            session_cached('bands', 'data', lambda: compute(horizon), horizon)
+        assert len(cache) == limit, f"{len(cache)} entries kept"
+        assert list(cache) == [('bands', h) for h in range(2 * limit, 3 * limit)]
+
+        session_cached('bands', 'data', lambda: compute(-1), 3 * limit - 1)
+        assert calls[-1] == 3 * limit - 1, "a cached entry was recomputed"
+        session_cached('bands', 'other data', lambda: compute(-1), 0)
+        assert len(st.session_state[session_cache.SESSION_CACHE_KEY]['values']) == 1, "new data kept old entries"
+    finally:
+        session_cache.SESSION_CACHE_MAX_ENTRIES = original
+        clear_session_cache()
+    return {'computed': len(calls)}
+
+def check_rerun_instrumentation(script='app.py'):
+    """Reruns ended early by st.stop() still record app.rerun and release the profiler; a busy profiler is refused"""
+    from streamlit.testing.v1 import AppTest
+    from instrumentation import get_metrics_store, start_profile, stop_profile
+
+    def rerun_count():
+        return get_metrics_store().totals.get('app.rerun', {}).get('calls', 0)
+
+    at = AppTest.from_file(script, default_timeout=120)
+    # One bar passes cleaning but stops the page at the "not enough data points" check
+    at.session_state['df'] = synthetic_ohlcv(1).reset_index()
+    at.session_state['ticker'] = 'SYN'
+    at.session_state['profile_next_rerun'] = True
+    before = rerun_count()
+    at.run()
+    assert not at.exception, f"app raised {[e.value for e in at.exception]}"
+    assert any("Not enough data points" in w.value for w in at.warning), "the early st.stop() path was not taken"
+    assert rerun_count() == before + 1, "app.rerun was not recorded for a stopped rerun"
+    profiler = start_profile()
+    assert profiler is not None, "the stopped rerun left the profiler running"
+    try:
+        at.session_state['profile_next_rerun'] = True
+        at.run()
+        assert "Another session is profiling" in at.session_state['last_profile']
+    finally:
+        stop_profile(profiler)
+
+    # A completed rerun keeps its profile
+    at.session_state['df'] = synthetic_ohlcv(300).reset_index()
+    at.session_state['profile_next_rerun'] = True
+    at.run()
+    assert not at.exception and 'cumulative' in at.session_state['last_profile'], "the profile was not collected"
+    return {'reruns recorded': rerun_count() - before}
+
+def check_walk_forward(n_bars=200, late_start=50, gap=(120, 125), min_train=20, windows=(None, 20, 60)):
+    """Closed-form walk-forward against a per-bar np.polyfit refit, on a panel with a late-listed column and a gap"""
+    from backtest import walk_forward_predictions, walk_forward_panel
+
+    closes = pd.DataFrame({f"T{i}": synthetic_ohlcv(n_bars, seed=i)['Close'].to_numpy() for i in range(3)})
+    closes.iloc[:late_start, 1] = np.nan
+    closes.iloc[gap[0]:gap[1], 2] = np.nan
+    values = closes.to_numpy()
+
+    def refit(column, window):
+        # Fit only the valid bars before t; x counts from the column's first valid bar (expanding) or the window start
+        y = values[:, column]
+        valid = np.isfinite(y)
+        first = valid.argmax()
+        expected = np.full(n_bars, np.nan)
+        for t in range(n_bars):
+            lo = 0 if window is None else t - window
+            if (window is None and valid[:t].sum() < max(min_train, 2)) or (window is not None and (lo < 0 or t - first < window)):
+                continue
+            rows = np.flatnonzero(valid[lo:t]) + lo
+            origin = first if window is None else lo
+            slope, intercept = np.polyfit(rows - origin, y[rows], 1)
+            expected[t] = intercept + slope * (t - origin)
+        return expected
+
+    worst = 0.0
+    for window in windows:
+        predictions = walk_forward_predictions(values, window, min_train)
+        for column in range(values.shape[1]):
+            label = f"{closes.columns[column]} {'expanding' if window is None else f'rolling {window}'}"
+            worst = max(worst, _assert_close(label, predictions[:, column], refit(column, window), rtol=1e-8))
+        # The late-listed column scores exactly as its own history passed alone
+        alone = walk_forward_predictions(values[late_start:, 1], window, min_train)
+        _assert_close(f"late column alone ({window})", predictions[late_start:, 1], alone, rtol=1e-12)
+
+    report = walk_forward_panel(closes)
+    assert report['Bars'].tolist() == [n_bars - min_train, n_bars - late_start - min_train, n_bars - min_train - (gap[1] - gap[0]) - 1], report
+    assert report[['MAE', 'RMSE', 'Directional_Accuracy']].notna().all().all()
+    return {'max relative error': f"{worst:.1e}"}
+
+def check_vector_index(n_vectors=20_000, dim=64, n_clusters=200, n_queries=50, top_k=10, min_recall=0.95):
+    """Exact top-k against brute-force cosine, save/load round trip, IVF recall at VECTOR_INDEX_NPROBE, and on-disk eviction"""
+    import embeddings
+    from embedding_cache import EmbeddingCache
+    from vector_index import VectorIndex
+
+    rng = np.random.default_rng(0)
+    centers = rng.normal(size=(n_clusters, dim))
+    vectors = centers[rng.integers(0, n_clusters, n_vectors)] + rng.normal(size=(n_vectors, dim))
+    queries = centers[rng.integers(0, n_clusters, n_queries)] + rng.normal(size=(n_queries, dim))
+    texts = [f"row {i}" for i in range(n_vectors)]
+    unit = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    index = VectorIndex(vectors, texts)
+    for query in queries:
+        scores = unit @ (query / np.linalg.norm(query))
+        expected = np.argsort(-scores, kind='stable')[:top_k]
+        found = index.search(query, top_k)
+        assert [text for text, _ in found] == [texts[i] for i in expected], "exact search order differs from brute force"
+        _assert_close("exact search scores", [score for _, score in found], scores[expected], rtol=1e-5)
+
+    index.train_ivf()
+    recall = np.mean([
+        len({t for t, _ in index.search(q, top_k)} & {t for t, _ in index.search(q, top_k, nprobe=embeddings.VECTOR_INDEX_NPROBE)}) / top_k
+        for q in queries
+    ])
+    assert recall >= min_recall, f"IVF recall@{top_k} at nprobe={embeddings.VECTOR_INDEX_NPROBE} is {recall:.3f}"
+
+    with tempfile.TemporaryDirectory() as directory:
+        index.save(directory)
+        for mmap in (True, False):
+            loaded = VectorIndex.load(directory, mmap=mmap)
+            assert np.array_equal(loaded.vectors, index.vectors) and loaded.texts == index.texts
+            assert np.array_equal(loaded.centroids, index.centroids) and np.array_equal(loaded.assignments, index.assignments)
+            for query in queries[:5]:
+                for nprobe in (None, embeddings.VECTOR_INDEX_NPROBE):
+                    assert loaded.search(query, top_k, nprobe) == index.search(query, top_k, nprobe), "search changed after load"
+
+    # Saved indexes are evicted least recently used first
+    load_model, load_cache = embeddings.load_embedding_model, embeddings.load_embedding_cache
+    model = StubEmbeddingModel()
+    with tempfile.TemporaryDirectory() as directory:
+        cache = EmbeddingCache(os.path.join(directory, 'embeddings.sqlite'))
+        embeddings.load_embedding_model, embeddings.load_embedding_cache = (lambda: model), (lambda: cache)
+        try:
+            index_dir = os.path.join(directory, 'indexes')
+            corpora = {name: [f"{name} text {i}" for i in range(50)] for name in 'abc'}
+            saved = lambda: sorted(os.listdir(index_dir))
+            for name in ('a', 'b', 'a', 'c'):
+                embeddings.load_vector_index(corpora[name], index_dir=index_dir, max_entries=2)
+                time.sleep(0.01)
+            assert saved() == sorted(embeddings.corpus_key(corpora[name]) for name in 'ac'), "the least recently used index was not evicted"
+            encoded = model.encoded
+            assert embeddings.load_vector_index(corpora['a'], index_dir=index_dir, max_entries=2).texts == corpora['a']
+            assert model.encoded == encoded and len(saved()) == 2, "a saved index was rebuilt"
+        finally:
+            embeddings.load_embedding_model, embeddings.load_embedding_cache = load_model, load_cache
+            cache._conn.close()
+    return {'ivf recall': round(float(recall), 3), 'lists': len(index.centroids)}
+
+def check_motif_search(n_points=400, window=16, k=3):
+    """MASS and the matrix profile against brute-force z-normalized distances, and motif pairs reported once"""
+    from motif_search import mass, matrix_profile, top_k_motifs
+
+    rng = np.random.default_rng(0)
+    series = np.cumsum(rng.normal(size=n_points))
+    # Plant two copies of one shape so the best motif pair is known and symmetric
+    pattern = 5 * np.sin(np.linspace(0, 3 * np.pi, window))
+    for start in (60, 250):
+        series[start:start + window] = series[start] + pattern
+
+    windows = sliding_window_view(series, window)
+    z = (windows - windows.mean(axis=1, keepdims=True)) / windows.std(axis=1, keepdims=True)
+    brute = np.sqrt(((z[:, None, :] - z[None, :, :]) ** 2).sum(axis=-1))
+
+    query = series[300:300 + window] + rng.normal(scale=0.1, size=window)
+    zq = (query - query.mean()) / query.std()
+    worst = _assert_close("mass", mass(query, series), np.sqrt(((z - zq) ** 2).sum(axis=1)), rtol=1e-6)
+
+    profile, index = matrix_profile(series, window)
+    zone = max(1, window // 4)
+    excluded = np.abs(np.arange(len(z))[:, None] - np.arange(len(z))[None, :]) <= zone
+    expected = np.where(excluded, np.inf, brute)
+    worst = max(worst, _assert_close("matrix profile", profile, expected.min(axis=1), rtol=1e-6))
+    assert np.all(np.abs(index - np.arange(len(index))) > zone), "a neighbour inside the exclusion zone"
+    worst = max(worst, _assert_close("profile index", brute[np.arange(len(index)), index], profile, rtol=1e-6))
+
+    exclusion = window // 2
+    motifs = top_k_motifs(profile, index, k, exclusion)
+    assert motifs[0] == int(np.argmin(profile)) and {motifs[0], int(index[motifs[0]])} & {60, 250}, f"planted pair not found first: {motifs}"
+    assert list(profile[motifs]) == sorted(profile[motifs])
+    for a, b in itertools.combinations(motifs, 2):
+        # Each pair once, and no reported window overlaps another pair's windows
+        for x, y in itertools.product((a, index[a]), (b, index[b])):
+            assert abs(int(x) - int(y)) > exclusion, f"motif pairs ({a}, {index[a]}) and ({b}, {index[b]}) overlap"
+    return {'max relative error': f"{worst:.1e}", 'motifs': [(int(i), int(index[i])) for i in motifs]}
+
+def check_monte_carlo_bands(n_paths=20_000, horizon=20, chunk_size=6_000, n_bars=500):
+    """Histogram quantile bands against np.quantile on the same simulated paths, within one bin width"""
+    from monte_carlo import DEFAULT_QUANTILES, HISTOGRAM_BINS, _draw_chunk, _log_returns, simulate_quantile_bands
+
+    close = synthetic_ohlcv(n_bars)['Close'].to_numpy()
+    returns = _log_returns(close, 252)
+    mean, std = returns.mean(), returns.std(ddof=1)
+    steps = np.arange(1, horizon + 1)
+    # Same bin width simulate_quantile_bands derives for each step
+    spread = max(std, np.abs(returns).max() / 3, 1e-8)
+    width = 20 * spread * np.sqrt(steps) / HISTOGRAM_BINS
+
+    details = {}
+    for method in ('gbm', 'bootstrap'):
+        bands = simulate_quantile_bands(close, horizon, n_paths, method, seed=7, chunk_size=chunk_size)
+        # Redraw the identical paths chunk by chunk from the same seeded generator
+        rng = np.random.default_rng(7)
+        sizes = [min(chunk_size, n_paths - done) for done in range(0, n_paths, chunk_size)]
+        cumulative = np.vstack([np.cumsum(_draw_chunk(rng, method, returns, mean, std, (size, horizon)), axis=1)
+                                for size in sizes])
+        exact = np.quantile(cumulative, DEFAULT_QUANTILES, axis=0)
+        worst = 0.0
+        for q, expected in zip(DEFAULT_QUANTILES, exact):
+            error = np.abs(np.log(bands[q].to_numpy() / close[-1]) - expected) / width
+            assert error.max() <= 1.0, f"{method} q={q}: band off by {error.max():.2f} bins"
+            worst = max(worst, error.max())
+        details[method] = f"max error {worst:.2f} bins"
+    return details
+
+def check_downsample(cases=((10_000, 1200), (5_003, 997), (50, 49), (50, 3))):
+    """LTTB keeps the end points, the exact threshold and increasing x; OHLC buckets keep open, high, low and close"""
+    import downsample
+
+    enabled = downsample.DOWNSAMPLE_ENABLED
+    downsample.DOWNSAMPLE_ENABLED = True
+    try:
+        for n, threshold in cases:
+            df = synthetic_ohlcv(n, seed=n).reset_index()
+            df.loc[n // 3:n // 3 + 5, 'Close'] = np.nan
+            kept = downsample.lttb_indices(df['Close'].to_numpy(), threshold)
+            assert len(kept) == threshold, f"LTTB n={n}: {len(kept)} points for a threshold of {threshold}"
+            assert kept[0] == 0 and kept[-1] == n - 1, f"LTTB n={n}: end points dropped"
+            assert np.all(np.diff(kept) > 0), f"LTTB n={n}: x not strictly increasing"
+            lines = downsample.downsample_lines(df, ['Close', 'Open'], threshold)
+            assert len(lines) == threshold and lines['Date'].is_monotonic_increasing and lines['Date'].is_unique
+
+            bars = downsample.downsample_ohlc(df, threshold)
+            size = -(-n // threshold)
+            groups = df.groupby(np.arange(n) // size)
+            expected = pd.DataFrame({
+                'Date': groups['Date'].first(),
+                'Open': groups['Open'].nth(0).to_numpy(),
+                'High': groups['High'].max(),
+                'Low': groups['Low'].min(),
+                'Close': groups['Close'].nth(-1).to_numpy(),
+                'Volume': groups['Volume'].sum(),
+            }).reset_index(drop=True)
+            assert len(bars) <= threshold, f"OHLC n={n}: {len(bars)} bars for a threshold of {threshold}"
+            pd.testing.assert_frame_equal(bars, expected, check_dtype=False)
+    finally:
+        downsample.DOWNSAMPLE_ENABLED = enabled
+    return {'cases': [f"{n}->{threshold}" for n, threshold in cases]}
+
+def check_batch_fetch(start="2023-01-01", end="2024-01-01"):
+    """A failing ticker reports its own error in fetch_many and fetch_many_bulk without touching the good frame"""
+    from market_cache import MarketDataCache
+    from batch_fetch import fetch_many, fetch_many_bulk
+
+    good = fake_downloader(0.0)
+
+    def download(ticker, start, end, interval="1d"):
+        if ticker == "BAD":
+            raise ValueError("delisted: BAD")
+        if ticker == "EMPTY":
+            return good(ticker, start, end).iloc[:0]
+        return good(ticker, start, end, interval)
+
+    def bulk_download(tickers, start, end, interval="1d"):
+        # yfinance keeps a failed symbol as an all-NaN column group
+        frames = {}
+        for ticker in tickers:
+            try:
+                frames[ticker] = download(ticker, start, end, interval)
+            except ValueError:
+                frames[ticker] = good("GOOD", start, end) * np.nan
+        return pd.concat(frames, axis=1)
+
+    with tempfile.TemporaryDirectory() as directory:
+        alone, _ = fetch_many(["GOOD"], start, end, cache=MarketDataCache(os.path.join(directory, 'alone'), download))
+        frames, errors = fetch_many(["bad", "GOOD", "EMPTY"], start, end,
+                                    cache=MarketDataCache(os.path.join(directory, 'mixed'), download))
+    assert set(frames) == {"GOOD"}, f"unexpected frames {sorted(frames)}"
+    assert errors == {"BAD": "delisted: BAD", "EMPTY": "No data found"}, f"unexpected errors {errors}"
+    pd.testing.assert_frame_equal(frames["GOOD"], alone["GOOD"])
+
+    bulk_alone, _ = fetch_many_bulk(["GOOD"], start, end, downloader=bulk_download)
+    bulk, bulk_errors = fetch_many_bulk(["GOOD", "BAD"], start, end, downloader=bulk_download)
+    assert set(bulk) == {"GOOD"} and set(bulk_errors) == {"BAD"}, f"bulk: frames {sorted(bulk)}, errors {bulk_errors}"
+    pd.testing.assert_frame_equal(bulk["GOOD"], bulk_alone["GOOD"])
+    pd.testing.assert_frame_equal(bulk["GOOD"], alone["GOOD"], check_dtype=False)
+    return {'errors': {**errors, **{f"{t} (bulk)": e for t, e in bulk_errors.items()}}}
+
+CHECKS = {
+    'market_cache_adjustment': check_market_cache_adjustment,
+    'streaming_indicators': check_streaming_indicators,
+    'financial_texts': check_financial_texts,
+    'search_fan_out': check_search_fan_out,
+    'llm_cache_scope': check_llm_cache_scope,
+    'analysis_orchestrator': check_analysis_orchestrator,
+    'ollama_residency': check_ollama_residency,
+    'online_regression': check_online_regression,
+    'session_cache': check_session_cache,
+    'rerun_instrumentation': check_rerun_instrumentation,
+    'walk_forward': check_walk_forward,
+    'vector_index': check_vector_index,
+    'motif_search': check_motif_search,
+    'monte_carlo_bands': check_monte_carlo_bands,
+    'downsample': check_downsample,
+    'batch_fetch': check_batch_fetch,
+}
+
+BENCHMARKS = {
+    'batch_fetch': bench_batch_fetch,
+    'ollama_rerun': bench_ollama_rerun,
+    'ollama_streaming': bench_ollama_streaming,
+    'prompt_context': bench_prompt_context,
+    'ollama_warmup': bench_ollama_warmup,
+    'walk_forward': bench_walk_forward,
+    'indicator_append': bench_indicator_append,
+    'universe_forecast': bench_universe_forecast,
+    'monte_carlo': bench_monte_carlo,
+    'chart_payload': bench_chart_payload,
+    'render_cache': bench_render_cache,
+    'app_rerun': bench_app_rerun,
+    'import_time': bench_import_time,
+    'hot_paths': bench_hot_paths,
+}
+
+def is_timing(label, value):
+    """Whether a result is a duration in seconds rather than a count, size or ratio"""
+    return isinstance(value, float) and not label.endswith(NON_TIMING_SUFFIXES)
+
+def format_value(value, label=''):
+    if isinstance(value, float) and not is_timing(label, value):
+        return f"{value:10.4g}"
+    if isinstance(value, float):
+        if value < 1e-3:
+            return f"{value * 1e6:10.1f} us"
+        return f"{value * 1000:10.1f} ms"
+    return f"{value:10}"
+
+def run_metadata():
+    """Commit, interpreter and library versions to store next to saved results"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        commit = None
+    return {
+        'commit': commit or None,
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+    }
+
+def compare_results(baseline, current, tolerance):
+    """Timings in current slower than baseline by more than tolerance (a fraction), as (name, label, old, new)"""
+    regressions = []
+    for name, results in current.items():
+        for label, value in results.items():
+            old = baseline.get(name, {}).get(label)
+            if is_timing(label, value) and is_timing(label, old) and old > 0 and value > old * (1 + tolerance):
+                regressions.append((name, label, old, value))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Run FinGPT benchmarks")
+    parser.add_argument('names', nargs='*', help="Benchmarks to run (default: all)")
+    parser.add_argument('--json', help="Write results and run metadata to this file")
+    parser.add_argument('--compare', help="Baseline JSON file from an earlier --json run")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="Allowed slowdown against the baseline (0.25 = 25%%)")
+    parser.add_argument('--check', action='store_true', help="Run the correctness checks instead of benchmarks")
+    args = parser.parse_args()
+
+    if args.check:
+        failures = 0
+        for name in args.names or CHECKS:
+            try:
+                details = CHECKS[name]()
+            except AssertionError as e:
+                failures += 1
+                print(f"FAIL {name}: {e}")
+                continue
+            print(f"ok   {name} {details or ''}")
+        sys.exit(1 if failures else 0)
+
+    all_results = {}
+    for name in args.names or BENCHMARKS:
+        results = BENCHMARKS[name]()
+        all_results[name] = results
+        print(f"== {name}")
+        for label, value in results.items():
+            print(f"  {label:<40} {format_value(value, label)}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'meta': run_metadata(), 'results': all_results}, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare_results(baseline['results'], all_results, args.tolerance)
+        print(f"== compared with {baseline['meta'].get('commit') or args.compare}")
+        for name, label, old, new in regressions:
+            print(f"  {name}: {label} {format_value(old).strip()} -> {format_value(new).strip()} ({new / old - 1:+.0%})")
+        if regressions:
+            sys.exit(1)
+        print("  no regressions")
+
+if __name__ == "__main__":
+    main()
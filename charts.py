@@ -1,7 +1,9 @@
 import streamlit as st
-import seaborn as sns
-import matplotlib.pyplot as plt
 import pandas as pd
+from downsample import downsample_lines
+from indicators import frame_fingerprint
+from instrumentation import timed
+from render_cache import CHART_FAST_PATH, get_pyplot, load_render_cache, render_figure, render_key, line_plot, show_image
 
 def safe_extract_value(value):
     if isinstance(value, pd.Series):
@@ -12,6 +14,7 @@ def safe_extract_value(value):
         return value[0] if len(value) > 0 else 0
     return value
 
+@timed('chart.price_line')
 def display_financial_charts(df, current_ticker):
     if df is None or len(df) == 0:
         st.error("No data available to display")
@@ -33,61 +36,73 @@ def display_financial_charts(df, current_ticker):
         return
 
     try:
-        fig, ax = plt.subplots(figsize=(10, 4))
-        
         if 'Date' in df.columns:
             df_plot = df[['Date', 'Close']].copy()
-            df_plot = df_plot.dropna()
+            df_plot = downsample_lines(df_plot.dropna(), ['Close'])
             
             if len(df_plot) > 0:
-                sns.lineplot(data=df_plot, x='Date', y='Close', ax=ax, color='blue')
-                plt.xticks(rotation=45)
-                ax.set_title(f"{current_ticker} Price Movement")
-                ax.set_xlabel("Date")
-                ax.set_ylabel("Close Price ($)")
-                plt.tight_layout()
-                st.pyplot(fig)
+                def draw():
+                    fig, ax = get_pyplot().subplots(figsize=(10, 4))
+                    line_plot(ax, df_plot['Date'], df_plot['Close'], color='blue')
+                    ax.tick_params(axis='x', labelrotation=45)
+                    ax.set_title(f"{current_ticker} Price Movement")
+                    ax.set_xlabel("Date")
+                    ax.set_ylabel("Close Price ($)")
+                    fig.tight_layout()
+                    return fig
+                
+                key = render_key('price_line', frame_fingerprint(df_plot, ['Date', 'Close']), current_ticker, CHART_FAST_PATH)
+                show_image(render_figure(load_render_cache(), key, draw))
             else:
                 st.warning("No valid data to plot")
         else:
             st.error("Date column not found in data")
     except Exception as e:
         st.error(f"Error creating chart: {str(e)}")
-    finally:
-        plt.close()
 
-def display_prediction_chart(df, prediction):
+@timed('chart.prediction')
+def display_prediction_chart(df, prediction, bands=None):
     try:
         prediction_value = safe_extract_value(prediction)
         
         st.metric("Predicted Price for Tomorrow", f"${float(prediction_value):.2f}")
         st.write("This uses a trend-line algorithm (Linear Regression).")
         
-        fig, ax = plt.subplots(figsize=(10, 4))
-        
         if 'Date' in df.columns:
             recent_df = df.tail(30)[['Date', 'Close']].copy()
             recent_df = recent_df.dropna()
             
             if len(recent_df) > 0:
-                sns.lineplot(data=recent_df, x='Date', y='Close', ax=ax, color='blue', label='Historical')
-                
-                last_date = pd.to_datetime(recent_df['Date'].iloc[-1])
-                next_date = last_date + pd.Timedelta(days=1)
+                def draw():
+                    fig, ax = get_pyplot().subplots(figsize=(10, 4))
+                    line_plot(ax, recent_df['Date'], recent_df['Close'], color='blue', label='Historical')
+                    
+                    last_date = pd.to_datetime(recent_df['Date'].iloc[-1])
+                    next_date = last_date + pd.Timedelta(days=1)
+                    
+                    ax.scatter(next_date, prediction_value, color='red', s=100, zorder=5, label='Prediction')
+                    
+                    if bands is not None and len(bands) > 0:
+                        band_dates = pd.bdate_range(next_date, periods=len(bands))
+                        ax.fill_between(band_dates, bands[0.05], bands[0.95], color='orange', alpha=0.2, label='5-95% band')
+                        ax.fill_between(band_dates, bands[0.25], bands[0.75], color='orange', alpha=0.4, label='25-75% band')
+                        ax.plot(band_dates, bands[0.5], color='orange', linestyle='--', label='Median path')
+                    
+                    ax.legend()
+                    ax.tick_params(axis='x', labelrotation=45)
+                    ax.set_title("Price Prediction")
+                    ax.set_xlabel("Date")
+                    ax.set_ylabel("Price ($)")
+                    fig.tight_layout()
+                    return fig
                 
-                ax.scatter(next_date, prediction_value, color='red', s=100, zorder=5, label='Prediction')
-                ax.legend()
-                plt.xticks(rotation=45)
-                ax.set_title("Price Prediction")
-                ax.set_xlabel("Date")
-                ax.set_ylabel("Price ($)")
-                plt.tight_layout()
-                st.pyplot(fig)
+                bands_fingerprint = None if bands is None else frame_fingerprint(bands, list(bands.columns))
+                key = render_key('prediction', frame_fingerprint(recent_df, ['Date', 'Close']), float(prediction_value),
+                                 bands_fingerprint, CHART_FAST_PATH)
+                show_image(render_figure(load_render_cache(), key, draw))
             else:
                 st.warning("Not enough data for prediction visualization")
         else:
             st.warning("Date information not available for prediction chart")
     except Exception as e:
         st.error(f"Error displaying prediction: {str(e)}")
-    finally:
-        plt.close()
\ No newline at end of file
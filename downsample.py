@@ -0,0 +1,83 @@
+"""
+Downsampling for large price series before they are charted.
+
+A chart cannot show more points than it has pixels, but Plotly ships every
+row to the browser and seaborn draws every row. Line series are reduced with
+Largest-Triangle-Three-Buckets (LTTB), which keeps the visual shape including
+spikes; candlestick and volume data are re-aggregated into coarser OHLCV bars
+(first open, max high, min low, last close, summed volume). Target point
+counts follow the chart width.
+"""
+
+import os
+import numpy as np
+import pandas as pd
+
+CHART_WIDTH_PX = int(os.getenv('CHART_WIDTH_PX', '1200'))
+PIXELS_PER_CANDLE = 4
+DOWNSAMPLE_ENABLED = os.getenv('CHART_DOWNSAMPLE', 'true').lower() == 'true'
+
+def target_points(kind="line", width=None):
+    """Number of points worth drawing for a chart of the given pixel width"""
+    width = width or CHART_WIDTH_PX
+    if kind == "line":
+        return width
+    return max(1, width // PIXELS_PER_CANDLE)
+
+def lttb_indices(y, n_out):
+    """Row positions kept by LTTB when reducing y to n_out points (first and last always kept)"""
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    # Gaps would poison the triangle areas; select on a gap-filled copy
+    if np.isnan(y).any():
+        y = pd.Series(y).ffill().bfill().fillna(0).to_numpy()
+
+    x = np.arange(n, dtype=float)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+def downsample_lines(df, columns, max_points=None):
+    """Rows of df kept by LTTB on the first of `columns`; every column shares the same x values"""
+    max_points = max_points or target_points("line")
+    if not DOWNSAMPLE_ENABLED or len(df) <= max_points:
+        return df
+    return df.iloc[lttb_indices(df[columns[0]].to_numpy(dtype=float), max_points)]
+
+def downsample_ohlc(df, max_points=None):
+    """Re-aggregate consecutive rows into at most max_points OHLCV bars dated at their first row"""
+    max_points = max_points or target_points("candle")
+    n = len(df)
+    if not DOWNSAMPLE_ENABLED or n <= max_points:
+        return df
+
+    size = -(-n // max_points)
+    starts = np.arange(0, n, size)
+    ends = np.minimum(starts + size, n) - 1
+
+    bars = {'Date': df['Date'].to_numpy()[starts]}
+    if 'Open' in df.columns:
+        bars['Open'] = df['Open'].to_numpy(dtype=float)[starts]
+    if 'High' in df.columns:
+        bars['High'] = np.fmax.reduceat(df['High'].to_numpy(dtype=float), starts)
+    if 'Low' in df.columns:
+        bars['Low'] = np.fmin.reduceat(df['Low'].to_numpy(dtype=float), starts)
+    if 'Close' in df.columns:
+        bars['Close'] = df['Close'].to_numpy(dtype=float)[ends]
+    if 'Volume' in df.columns:
+        bars['Volume'] = np.add.reduceat(np.nan_to_num(df['Volume'].to_numpy(dtype=float)), starts)
+    return pd.DataFrame(bars)
@@ -0,0 +1,82 @@
+import numpy as np
+import hashlib
+import sqlite3
+import threading
+import os
+
+EMBEDDING_CACHE_PATH = os.getenv('EMBEDDING_CACHE_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.embedding_cache.sqlite'))
+LOOKUP_BATCH_SIZE = 500
+
+def text_key(text, model_name):
+    """Content hash identifying one text embedded by one model"""
+    return hashlib.blake2b(f"{model_name}\0{text}".encode('utf-8'), digest_size=16).hexdigest()
+
+class EmbeddingCache:
+    """Persistent SQLite store of embeddings keyed by hash(model name, text).
+
+    encode() only runs the model on texts it has not seen before and keeps
+    hit/miss counters so the cache's effect is visible.
+    """
+
+    def __init__(self, path=EMBEDDING_CACHE_PATH):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, dim INTEGER, vector BLOB)"
+        )
+        self._conn.commit()
+
+    def _lookup(self, keys):
+        found = {}
+        for i in range(0, len(keys), LOOKUP_BATCH_SIZE):
+            batch = keys[i:i + LOOKUP_BATCH_SIZE]
+            rows = self._conn.execute(
+                f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(batch))})", batch
+            ).fetchall()
+            for key, blob in rows:
+                found[key] = np.frombuffer(blob, dtype=np.float32)
+        return found
+
+    def encode(self, texts, model, model_name):
+        """Return a float32 embedding matrix for texts, encoding only cache misses"""
+        texts = list(texts)
+        keys = [text_key(text, model_name) for text in texts]
+
+        with self._lock:
+            found = self._lookup(list(dict.fromkeys(keys)))
+
+            missing = {}
+            for key, text in zip(keys, texts):
+                if key not in found and key not in missing:
+                    missing[key] = text
+
+            if missing:
+                vectors = np.asarray(model.encode(list(missing.values())), dtype=np.float32)
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, dim, vector) VALUES (?, ?, ?)",
+                    [(key, vector.shape[0], vector.tobytes()) for key, vector in zip(missing, vectors)]
+                )
+                self._conn.commit()
+                found.update(zip(missing, vectors))
+
+            self.misses += len(missing)
+            self.hits += len(keys) - len(missing)
+
+        if not keys:
+            return np.empty((0, 0), dtype=np.float32)
+        return np.vstack([found[key] for key in keys])
+
+    def stats(self):
+        """Return hit/miss counters and the number of stored embeddings"""
+        with self._lock:
+            size = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+            'size': size
+        }
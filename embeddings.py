@@ -1,44 +1,140 @@
 import streamlit as st
-from sentence_transformers import SentenceTransformer
 import numpy as np
 import pandas as pd
+import hashlib
+import os
+import shutil
+import tempfile
+from vector_index import VectorIndex
+from embedding_cache import EmbeddingCache
+from instrumentation import stage, timed, payload_size
+
+EMBEDDING_MODEL_NAME = 'all-MiniLM-L6-v2'
+VECTOR_INDEX_DIR = os.getenv('VECTOR_INDEX_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.vector_index'))
+# Corpora at least this large get an IVF coarse quantizer; queries then probe VECTOR_INDEX_NPROBE lists
+IVF_MIN_VECTORS = int(os.getenv('IVF_MIN_VECTORS', '50000'))
+VECTOR_INDEX_NPROBE = int(os.getenv('VECTOR_INDEX_NPROBE', '16'))
+# Saved indexes kept on disk; the least recently used are deleted beyond this
+VECTOR_INDEX_MAX_ENTRIES = int(os.getenv('VECTOR_INDEX_MAX_ENTRIES', '16'))
 
 @st.cache_resource
+@timed('embeddings.load_model')
 def load_embedding_model():
     """Load and cache the sentence transformer model"""
-    return SentenceTransformer('all-MiniLM-L6-v2')
+    # Deferred: sentence_transformers pulls in torch, which takes seconds to import
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(EMBEDDING_MODEL_NAME)
+
+@st.cache_resource
+def load_embedding_cache():
+    """Open and cache the persistent embedding store"""
+    return EmbeddingCache()
 
+@timed('embeddings.generate', size=payload_size)
 def generate_embeddings(texts):
-    """Generate embeddings for a list of texts"""
+    """Generate embeddings for a list of texts, encoding only texts not seen before"""
     model = load_embedding_model()
-    embeddings = model.encode(texts)
+    embeddings = load_embedding_cache().encode(texts, model, EMBEDDING_MODEL_NAME)
     return embeddings
 
-def find_similar_texts(query, texts, top_k=5):
-    """Find the most similar texts to a query"""
+def build_vector_index(texts, embeddings=None):
+    """Build a vector index over texts, reusing embeddings when already computed"""
+    if embeddings is None:
+        embeddings = generate_embeddings(texts)
+    return VectorIndex(embeddings, texts)
+
+def corpus_key(texts, model_name=EMBEDDING_MODEL_NAME):
+    """Content hash of a corpus of texts embedded by one model"""
+    digest = hashlib.blake2b(model_name.encode('utf-8'), digest_size=16)
+    for text in texts:
+        digest.update(text.encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+def prune_vector_indexes(index_dir=VECTOR_INDEX_DIR, max_entries=VECTOR_INDEX_MAX_ENTRIES, keep=None):
+    """Delete the least recently used saved indexes beyond max_entries and return how many were removed"""
+    try:
+        names = [name for name in os.listdir(index_dir) if os.path.exists(os.path.join(index_dir, name, 'texts.json'))]
+    except FileNotFoundError:
+        return 0
+    # Directory mtimes are bumped on every load, so they order indexes by last use
+    names.sort(key=lambda name: os.path.getmtime(os.path.join(index_dir, name)), reverse=True)
+    stale = [name for name in names[max_entries:] if name != keep]
+    for name in stale:
+        shutil.rmtree(os.path.join(index_dir, name), ignore_errors=True)
+    return len(stale)
+
+def load_vector_index(texts, embeddings=None, index_dir=VECTOR_INDEX_DIR, max_entries=VECTOR_INDEX_MAX_ENTRIES):
+    """Return the index for this corpus, memory-mapped from disk when it was built before.
+
+    A new corpus is embedded (through the embedding cache), indexed, given an
+    IVF quantizer when large, and saved under index_dir keyed by its content.
+    At most max_entries indexes are kept; the least recently used are deleted.
+    """
+    key = corpus_key(texts)
+    path = os.path.join(index_dir, key)
+    if os.path.exists(os.path.join(path, 'texts.json')):
+        try:
+            index = VectorIndex.load(path, mmap=True)
+            os.utime(path)
+            return index
+        except Exception:
+            # A half-written or corrupt index is rebuilt below
+            shutil.rmtree(path, ignore_errors=True)
+
+    index = build_vector_index(texts, embeddings)
+    if len(index) >= IVF_MIN_VECTORS:
+        index.train_ivf()
+
+    os.makedirs(index_dir, exist_ok=True)
+    staging = tempfile.mkdtemp(dir=index_dir)
+    try:
+        index.save(staging)
+        os.replace(staging, path)
+    except OSError:
+        # Another session saved the same corpus first; its copy is identical
+        shutil.rmtree(staging, ignore_errors=True)
+    prune_vector_indexes(index_dir, max_entries, keep=key)
+    return index
+
+def search_vector_index(index, query, top_k=5, nprobe=None):
+    """Encode the query once and search an existing index"""
     model = load_embedding_model()
-    
-    # Generate embeddings
-    query_embedding = model.encode([query])
-    text_embeddings = model.encode(texts)
-    
-    # Calculate cosine similarities
-    similarities = np.dot(text_embeddings, query_embedding.T).flatten()
-    
-    # Get top-k most similar texts
-    top_indices = np.argsort(similarities)[::-1][:top_k]
-    
-    return [(texts[i], similarities[i]) for i in top_indices]
+    with stage('embeddings.query'):
+        query_embedding = model.encode([query])
+    return index.search(query_embedding, top_k=top_k, nprobe=nprobe)
+
+def find_similar_texts(query, texts, top_k=5, embeddings=None):
+    """Find the most similar texts to a query, reusing the saved index for this corpus"""
+    index = load_vector_index(texts, embeddings)
+    return search_vector_index(index, query, top_k, nprobe=VECTOR_INDEX_NPROBE)
+
+def _date_text(dates):
+    """str() of each value, vectorized for whole-second naive timestamps.
+
+    Series.astype(str) drops the time part ("2024-01-02") when every value is
+    at midnight; the row texts keep str(Timestamp) ("2024-01-02 00:00:00") so
+    existing embedding cache keys stay valid.
+    """
+    if pd.api.types.is_datetime64_dtype(dates) and not dates.isna().any() \
+            and not (dates.dt.microsecond.any() or dates.dt.nanosecond.any()):
+        return dates.dt.strftime('%Y-%m-%d %H:%M:%S')
+    return dates.map(str)
+
+def financial_texts(df):
+    """One text representation per row of financial data"""
+    return (
+        "Date: " + _date_text(df['Date'])
+        + ", Open: " + df['Open'].astype(str)
+        + ", High: " + df['High'].astype(str)
+        + ", Low: " + df['Low'].astype(str)
+        + ", Close: " + df['Close'].astype(str)
+        + ", Volume: " + df['Volume'].astype(str)
+    ).tolist()
 
 def embed_financial_data(df):
     """Create embeddings for financial data"""
-    # Convert financial data to text representations
-    text_representations = []
-    for _, row in df.iterrows():
-        text = f"Date: {row['Date']}, Open: {row['Open']}, High: {row['High']}, Low: {row['Low']}, Close: {row['Close']}, Volume: {row['Volume']}"
-        text_representations.append(text)
-    
-    # Generate embeddings
+    text_representations = financial_texts(df)
     embeddings = generate_embeddings(text_representations)
     
     return text_representations, embeddings
\ No newline at end of file
@@ -0,0 +1,182 @@
+import pandas as pd
+import numpy as np
+import hashlib
+import os
+from collections import OrderedDict
+
+FINGERPRINT_COLUMNS = ['Date', 'Open', 'High', 'Low', 'Close', 'Volume']
+INDICATOR_CACHE_MAX_MB = float(os.getenv('INDICATOR_CACHE_MAX_MB', '256'))
+# A cached frame is extended bar by bar when the new data appends at most this many bars.
+# Hashing and copying the frame cost about as much as a batch recompute up to ~30k bars, and
+# each streamed bar costs ~20 us, so both bounds follow `benchmarks.py indicator_append`
+# (the minimum must also exceed the longest window, so the batch clipping never applies)
+STREAM_MAX_NEW_BARS = 250
+STREAM_MIN_BARS = 50_000
+
+_indicator_cache = OrderedDict()
+_indicator_cache_bytes = 0
+
+def _row_hashes(df, columns=FINGERPRINT_COLUMNS):
+    columns = [col for col in columns if col in df.columns]
+    return pd.util.hash_pandas_object(df[columns], index=False).values, columns
+
+def _digest(hashed, columns):
+    digest = hashlib.blake2b(hashed.tobytes(), digest_size=16)
+    digest.update(repr((columns, len(hashed))).encode())
+    return digest.hexdigest()
+
+def frame_fingerprint(df, columns=FINGERPRINT_COLUMNS):
+    """Return a content hash of the given columns of a DataFrame"""
+    return _digest(*_row_hashes(df, columns))
+
+def _rolling_mean(x, window):
+    out = np.full(len(x), np.nan)
+    if window < 1 or len(x) < window:
+        return out
+    csum = np.empty(len(x) + 1)
+    csum[0] = 0.0
+    np.cumsum(x, out=csum[1:])
+    np.subtract(csum[window:], csum[:-window], out=out[window - 1:])
+    out[window - 1:] /= window
+    return out
+
+def _rolling_std(x, window):
+    if window < 2 or len(x) < window:
+        return np.full(len(x), np.nan)
+    # pandas' rolling std runs in O(n) memory; a strided window view would copy n x window values
+    return pd.Series(x).rolling(window).std(ddof=1).to_numpy()
+
+def _ema(x, span):
+    return pd.Series(x).ewm(span=span, adjust=False).mean().to_numpy()
+
+def _wilder(x, period):
+    return pd.Series(x).ewm(alpha=1 / period, adjust=False).mean().to_numpy()
+
+def compute_indicators(close, high, low, ma_windows=(20, 50), bb_window=20, bb_std=2,
+                       rsi_period=14, atr_period=14, macd=(12, 26, 9)):
+    """Compute every chart indicator from close/high/low arrays in one pass.
+
+    Moving-average windows are clipped to the series length, matching the
+    charts' historical behaviour for short ranges.
+    """
+    close = np.asarray(close, dtype=float)
+    high = np.asarray(high, dtype=float)
+    low = np.asarray(low, dtype=float)
+    n = len(close)
+    out = {}
+
+    for window in ma_windows:
+        out[f'MA_{window}'] = _rolling_mean(close, min(window, n))
+
+    bb_mean = out.get(f'MA_{bb_window}')
+    if bb_mean is None:
+        bb_mean = _rolling_mean(close, min(bb_window, n))
+    bb_dev = _rolling_std(close, min(bb_window, n))
+    out[f'STD_{bb_window}'] = bb_dev
+    out['Upper_Band'] = bb_mean + bb_dev * bb_std
+    out['Lower_Band'] = bb_mean - bb_dev * bb_std
+
+    delta = np.empty(n)
+    if n:
+        delta[0] = np.nan
+        delta[1:] = np.diff(close)
+    gain = _rolling_mean(np.where(delta > 0, delta, 0.0), rsi_period)
+    loss = _rolling_mean(np.where(delta < 0, -delta, 0.0), rsi_period)
+    del delta
+    loss[loss == 0] = 0.0001
+    # 100 - 100 / (1 + gain / loss), in place to keep large series within a few arrays of temporaries
+    rsi = np.divide(gain, loss, out=gain)
+    del loss
+    rsi += 1
+    np.divide(100, rsi, out=rsi)
+    np.subtract(100, rsi, out=rsi)
+    out['RSI'] = rsi
+
+    prev_close = np.concatenate([[np.nan], close[:-1]])
+    true_range = np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+    out[f'ATR_{atr_period}'] = _wilder(true_range, atr_period)
+
+    fast, slow, signal = macd
+    ema_fast = _ema(close, fast)
+    ema_slow = _ema(close, slow)
+    out[f'EMA_{fast}'] = ema_fast
+    out[f'EMA_{slow}'] = ema_slow
+    out['MACD'] = ema_fast - ema_slow
+    out['MACD_Signal'] = _ema(out['MACD'], signal)
+    out['MACD_Hist'] = out['MACD'] - out['MACD_Signal']
+
+    return out
+
+def _extend_cached(df, hashed, columns):
+    """Indicators for df from a cached frame of its leading rows plus streamed updates for the new bars, or None.
+
+    hashed and columns are df's row hashes, so a prefix fingerprint costs no rehashing.
+    """
+    from streaming_indicators import IndicatorState
+
+    n = len(df)
+    for key, (cached, _) in reversed(_indicator_cache.items()):
+        m = len(cached)
+        if not STREAM_MIN_BARS <= m < n or n - m > STREAM_MAX_NEW_BARS:
+            continue
+        # Cheap checks before hashing the prefix
+        if df['Close'].iloc[m - 1] != cached['Close'].iloc[-1]:
+            continue
+        if 'Date' in df.columns and df['Date'].iloc[m - 1] != cached['Date'].iloc[-1]:
+            continue
+        if _digest(hashed[:m], columns) != key:
+            continue
+
+        new = df.iloc[m:]
+        bars = new[['High', 'Low', 'Close']].to_numpy(dtype=float)
+        last = cached.iloc[-1]
+        if not (np.isfinite(bars).all() and np.isfinite(last.drop(['Date', 'Close'], errors='ignore').to_numpy(dtype=float)).all()):
+            return None
+
+        state = IndicatorState.from_history(cached['Close'].to_numpy(dtype=float), last)
+        rows = [state.update({'High': high, 'Low': low, 'Close': close}) for high, low, close in bars]
+        base = new[[col for col in ('Date', 'Close') if col in new.columns]]
+        tail = pd.concat([base, pd.DataFrame(rows, index=new.index)], axis=1)[cached.columns]
+        return pd.concat([cached, tail]).set_axis(df.index)
+    return None
+
+def get_indicators(df):
+    """Return df's Date/Close columns plus all indicator columns, memoized by content.
+
+    When df only appends a few bars to a cached frame, the new rows are
+    computed incrementally with streaming_indicators instead of rescanning
+    the whole history. The returned frame is shared between callers and must
+    not be modified.
+    """
+    global _indicator_cache_bytes
+
+    hashed, columns = _row_hashes(df)
+    key = _digest(hashed, columns)
+    cached = _indicator_cache.get(key)
+    if cached is not None:
+        _indicator_cache.move_to_end(key)
+        return cached[0]
+
+    result = _extend_cached(df, hashed, columns)
+    if result is None:
+        values = compute_indicators(df['Close'], df['High'], df['Low'])
+        base = df[[col for col in ('Date', 'Close') if col in df.columns]]
+        result = pd.concat([base, pd.DataFrame(values, index=df.index)], axis=1)
+
+    # Bounded by memory rather than entry count: one multi-million-row frame outweighs many short ones
+    size = int(result.memory_usage(index=True, deep=False).sum())
+    max_bytes = INDICATOR_CACHE_MAX_MB * 1024 * 1024
+    if size <= max_bytes:
+        _indicator_cache[key] = (result, size)
+        _indicator_cache_bytes += size
+        while _indicator_cache_bytes > max_bytes:
+            _, (_, evicted) = _indicator_cache.popitem(last=False)
+            _indicator_cache_bytes -= evicted
+
+    return result
+
+def clear_indicator_cache():
+    """Drop every memoized indicator frame"""
+    global _indicator_cache_bytes
+    _indicator_cache.clear()
+    _indicator_cache_bytes = 0
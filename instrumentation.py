@@ -0,0 +1,209 @@
+"""
+Lightweight per-stage timing for the app.
+
+Functions are wrapped with @timed(stage) (or a `with stage(...)` block) to
+record wall time, call counts, errors and payload sizes into a process-wide
+ring buffer. Percentiles come from the buffered samples; counts and totals
+cover every call since start. Metrics export as JSON or Prometheus text, and
+a single rerun can be captured with cProfile.
+"""
+
+import contextlib
+import cProfile
+import functools
+import io
+import json
+import os
+import pstats
+import threading
+import time
+from collections import deque
+import numpy as np
+import pandas as pd
+
+METRICS_BUFFER_SIZE = int(os.getenv('METRICS_BUFFER_SIZE', '4096'))
+DEBUG_PANEL = os.getenv('DEBUG_PANEL', 'false').lower() in ('1', 'true', 'yes')
+
+def payload_size(value):
+    """Approximate size in bytes of a result (text, bytes, frames, arrays, JSON-like data)"""
+    if value is None:
+        return None
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if isinstance(value, str):
+        return len(value.encode('utf-8'))
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=True))
+    if isinstance(value, (dict, list, tuple)):
+        try:
+            return len(json.dumps(value, default=str).encode('utf-8'))
+        except (TypeError, ValueError):
+            return None
+    results = getattr(value, 'results', None)
+    if results is not None:  # Exa responses
+        return sum(len(getattr(item, 'text', '') or '') for item in results)
+    return None
+
+class MetricsStore:
+    """Thread-safe ring buffer of (stage, seconds, size, error) samples plus running totals per stage"""
+
+    def __init__(self, max_samples=METRICS_BUFFER_SIZE):
+        self.samples = deque(maxlen=max_samples)
+        self.totals = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage, seconds, size=None, error=False):
+        with self._lock:
+            self.samples.append((stage, seconds, size, error, time.time()))
+            totals = self.totals.setdefault(stage, {'calls': 0, 'errors': 0, 'seconds': 0.0, 'bytes': 0})
+            totals['calls'] += 1
+            totals['errors'] += int(error)
+            totals['seconds'] += seconds
+            totals['bytes'] += size or 0
+
+    def clear(self):
+        with self._lock:
+            self.samples.clear()
+            self.totals.clear()
+
+    def summary(self):
+        """Per-stage calls, errors, p50/p95/max seconds and total bytes, slowest p95 first"""
+        with self._lock:
+            samples = list(self.samples)
+            totals = {stage: dict(values) for stage, values in self.totals.items()}
+
+        durations = {}
+        for stage, seconds, _, _, _ in samples:
+            durations.setdefault(stage, []).append(seconds)
+
+        rows = []
+        for stage, values in totals.items():
+            recent = np.array(durations.get(stage, [np.nan]))
+            rows.append({
+                'stage': stage,
+                'calls': values['calls'],
+                'errors': values['errors'],
+                'p50': float(np.nanpercentile(recent, 50)) if np.isfinite(recent).any() else None,
+                'p95': float(np.nanpercentile(recent, 95)) if np.isfinite(recent).any() else None,
+                'max': float(np.nanmax(recent)) if np.isfinite(recent).any() else None,
+                'total_seconds': values['seconds'],
+                'bytes': values['bytes'],
+            })
+        return sorted(rows, key=lambda row: -(row['p95'] or 0))
+
+    def to_json(self):
+        return json.dumps({'stages': self.summary(), 'buffered_samples': len(self.samples)}, indent=2)
+
+    def to_prometheus(self, prefix='fingpt'):
+        """Prometheus text exposition: a seconds summary per stage plus error and byte counters"""
+        rows = self.summary()
+        labels = {row['stage']: row['stage'].replace('\\', '\\\\').replace('"', '\\"') for row in rows}
+        lines = [
+            f"# HELP {prefix}_stage_seconds Wall time of instrumented stages",
+            f"# TYPE {prefix}_stage_seconds summary",
+        ]
+        for row in rows:
+            label = labels[row['stage']]
+            for quantile, key in (('0.5', 'p50'), ('0.95', 'p95')):
+                if row[key] is not None:
+                    lines.append(f'{prefix}_stage_seconds{{stage="{label}",quantile="{quantile}"}} {row[key]:.6f}')
+            lines.append(f'{prefix}_stage_seconds_sum{{stage="{label}"}} {row["total_seconds"]:.6f}')
+            lines.append(f'{prefix}_stage_seconds_count{{stage="{label}"}} {row["calls"]}')
+
+        lines += [f"# HELP {prefix}_stage_errors_total Calls that raised", f"# TYPE {prefix}_stage_errors_total counter"]
+        lines += [f'{prefix}_stage_errors_total{{stage="{labels[row["stage"]]}"}} {row["errors"]}' for row in rows]
+        lines += [f"# HELP {prefix}_stage_payload_bytes_total Bytes produced by stages", f"# TYPE {prefix}_stage_payload_bytes_total counter"]
+        lines += [f'{prefix}_stage_payload_bytes_total{{stage="{labels[row["stage"]]}"}} {row["bytes"]}' for row in rows]
+        return '\n'.join(lines) + '\n'
+
+_metrics = MetricsStore()
+
+def get_metrics_store():
+    """The process-wide metrics store"""
+    return _metrics
+
+@contextlib.contextmanager
+def stage(name, store=None):
+    """Time the enclosed block as one sample of stage `name`.
+
+    Yields a dict; set its 'size' key inside the block to record a payload size.
+    """
+    sample = {'size': None}
+    error = False
+    started = time.perf_counter()
+    try:
+        yield sample
+    except BaseException:
+        error = True
+        raise
+    finally:
+        (store or _metrics).record(name, time.perf_counter() - started, sample['size'], error)
+
+def timed(name, size=None):
+    """Decorator recording each call of the function as a sample of stage `name`.
+
+    size is an optional callable applied to the return value (e.g.
+    payload_size) to record how much data the call produced.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with stage(name) as sample:
+                result = fn(*args, **kwargs)
+                if size is not None:
+                    sample['size'] = size(result)
+                return result
+        return wrapper
+    return decorator
+
+def instrument_stream(name, chunks):
+    """Wrap a text-chunk iterator: records `name` from the first read until exhaustion and `name.ttft` at the first chunk"""
+    started = time.perf_counter()
+    received = 0
+    error = False
+    first = True
+    try:
+        for chunk in chunks:
+            if first and chunk:
+                _metrics.record(f"{name}.ttft", time.perf_counter() - started)
+                first = False
+            received += len(chunk.encode('utf-8')) if isinstance(chunk, str) else 0
+            yield chunk
+    except GeneratorExit:
+        # The consumer stopped reading early; not a failure of the stage
+        raise
+    except BaseException:
+        error = True
+        raise
+    finally:
+        _metrics.record(name, time.perf_counter() - started, received, error)
+
+# Only one profiler can be active per process, so sessions take turns
+_profile_lock = threading.Lock()
+
+def start_profile():
+    """Start a cProfile capture (e.g. at the top of a rerun), or return None while another is running"""
+    if not _profile_lock.acquire(blocking=False):
+        return None
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # A profiler outside this module (e.g. python -m cProfile) is already active
+        _profile_lock.release()
+        return None
+    return profiler
+
+def stop_profile(profiler, limit=40, sort='cumulative'):
+    """Stop a capture and return the top functions as pstats text"""
+    try:
+        profiler.disable()
+    finally:
+        _profile_lock.release()
+    output = io.StringIO()
+    pstats.Stats(profiler, stream=output).strip_dirs().sort_stats(sort).print_stats(limit)
+    return output.getvalue()
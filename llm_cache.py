@@ -0,0 +1,169 @@
+import streamlit as st
+import numpy as np
+import hashlib
+import threading
+import time
+import os
+import re
+from collections import OrderedDict
+from indicators import frame_fingerprint
+
+LLM_CACHE_TTL = float(os.getenv('LLM_CACHE_TTL', '3600'))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv('LLM_CACHE_MAX_ENTRIES', '512'))
+# Semantic lookup loads the sentence transformer, so it is opt-in
+LLM_CACHE_SEMANTIC = os.getenv('LLM_CACHE_SEMANTIC', 'false').lower() in ('1', 'true', 'yes')
+LLM_CACHE_SIMILARITY = float(os.getenv('LLM_CACHE_SIMILARITY', '0.92'))
+
+# Words that flip the meaning of otherwise near-identical questions; semantic matches must agree on them
+POLARITY_TERMS = frozenset((
+    'buy', 'sell', 'overbought', 'oversold', 'bullish', 'bearish', 'long', 'short', 'up', 'down',
+    'high', 'low', 'higher', 'lower', 'highest', 'lowest', 'above', 'below', 'rise', 'fall',
+    'increase', 'decrease', 'gain', 'loss', 'support', 'resistance', 'call', 'put', 'upside',
+    'downside', 'best', 'worst', 'top', 'bottom', 'max', 'min', 'maximum', 'minimum', 'not', 'no', 'never',
+))
+TICKER_PATTERN = re.compile(r'\$?\b[A-Z][A-Z0-9.\-]{1,9}\b')
+NUMBER_PATTERN = re.compile(r'\d[\d,./:\-]*%?')
+
+def normalize_question(question):
+    """Lowercase, trim and collapse whitespace and trailing punctuation"""
+    return ' '.join(question.lower().split()).rstrip('?!. ')
+
+def question_keys(question):
+    """Split a question into (hard keys, free text).
+
+    Hard keys are the tickers, dates and numbers it mentions plus its
+    polarity words (buy/sell, overbought/oversold, ...); two questions can
+    only share an answer when these are identical. Free text is what is left,
+    which semantic matching compares.
+    """
+    tickers = frozenset(token.lstrip('$') for token in TICKER_PATTERN.findall(question))
+    numbers = frozenset(NUMBER_PATTERN.findall(question))
+    words = re.findall(r"[a-z']+", question.lower())
+    polarity = frozenset(word for word in words if word in POLARITY_TERMS)
+    free = ' '.join(word for word in words if word not in POLARITY_TERMS and word.upper() not in tickers)
+    return (tickers, numbers, polarity), free
+
+def data_scope(df, ticker=None):
+    """Cache scope for answers about df: ticker, date range and a content hash of the bars"""
+    dates = df['Date'] if 'Date' in df.columns else df.index.to_series()
+    first, last = (str(dates.iloc[0]), str(dates.iloc[-1])) if len(df) else ('', '')
+    return f"{(ticker or '').upper()}|{first}|{last}|{frame_fingerprint(df)}"
+
+class ResponseCache:
+    """In-memory LLM response cache keyed by (model, prompt template, data scope, question).
+
+    Lookups try an exact match on the normalized question first. When an
+    embed_fn is given, they then fall back to the most similar cached question
+    for the same model, template and data scope (see data_scope) whose hard
+    keys (tickers, dates, numbers, polarity words; see question_keys) are
+    identical, if the cosine similarity of the remaining free text reaches
+    similarity_threshold. Entries expire after ttl seconds and the least
+    recently used are evicted beyond max_entries.
+    """
+
+    def __init__(self, ttl=LLM_CACHE_TTL, max_entries=LLM_CACHE_MAX_ENTRIES, embed_fn=None,
+                 similarity_threshold=LLM_CACHE_SIMILARITY):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.embed_fn = embed_fn
+        self.similarity_threshold = similarity_threshold
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _context_key(model, template, scope):
+        return hashlib.blake2b(f"{model}\0{template}\0{scope}".encode('utf-8'), digest_size=16).hexdigest()
+
+    def _embed(self, question):
+        vector = np.asarray(self.embed_fn(question), dtype=np.float32).ravel()
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _evict_expired(self, now):
+        expired = [key for key, entry in self._entries.items() if now - entry['created'] > self.ttl]
+        for key in expired:
+            del self._entries[key]
+
+    def lookup(self, model, template, scope, question):
+        """Return the cached response text, or None on a miss"""
+        context = self._context_key(model, template, scope)
+        key = (context, normalize_question(question))
+        hard_keys, free_text = question_keys(question)
+        now = time.time()
+
+        with self._lock:
+            self._evict_expired(now)
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.exact_hits += 1
+                return entry['response']
+
+            candidates = [
+                (k, e) for k, e in self._entries.items()
+                if k[0] == context and e['vector'] is not None and e['hard_keys'] == hard_keys
+            ]
+
+        if self.embed_fn is not None and candidates:
+            query = self._embed(free_text)
+            scores = [float(query @ entry['vector']) for _, entry in candidates]
+            best = int(np.argmax(scores))
+            if scores[best] >= self.similarity_threshold:
+                with self._lock:
+                    best_key, best_entry = candidates[best]
+                    if best_key in self._entries:
+                        self._entries.move_to_end(best_key)
+                    self.semantic_hits += 1
+                return best_entry['response']
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def store(self, model, template, scope, question, response):
+        """Cache a response; empty responses are ignored"""
+        if not response:
+            return
+        context = self._context_key(model, template, scope)
+        hard_keys, free_text = question_keys(question)
+        vector = self._embed(free_text) if self.embed_fn is not None else None
+
+        with self._lock:
+            key = (context, normalize_question(question))
+            self._entries[key] = {'response': response, 'created': time.time(), 'vector': vector, 'hard_keys': hard_keys}
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        """Return hit/miss counters, hit rate and current size"""
+        with self._lock:
+            hits = self.exact_hits + self.semantic_hits
+            total = hits + self.misses
+            return {
+                'exact_hits': self.exact_hits,
+                'semantic_hits': self.semantic_hits,
+                'misses': self.misses,
+                'hit_rate': hits / total if total else 0.0,
+                'size': len(self._entries)
+            }
+
+def cached_stream(cache, cache_context, question, chunks):
+    """Pass chunks through and store the full text once the stream finishes"""
+    parts = []
+    for chunk in chunks:
+        parts.append(chunk)
+        yield chunk
+    cache.store(*cache_context, question, ''.join(parts))
+
+@st.cache_resource
+def load_response_cache():
+    """Create and cache the process-wide LLM response cache"""
+    embed_fn = None
+    if LLM_CACHE_SEMANTIC:
+        from embeddings import load_embedding_model
+        embed_fn = lambda text: load_embedding_model().encode([text])[0]
+    return ResponseCache(embed_fn=embed_fn)
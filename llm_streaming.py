@@ -0,0 +1,68 @@
+import time
+
+class StreamStats:
+    """Latency figures for one streamed LLM response"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.first_token_at = None
+        self.finished_at = None
+        self.chunks = 0
+        # Backends that report their own token count (Ollama's eval_count) set this
+        self.token_count = None
+        # Set when the text came from the response cache instead of a model
+        self.cached = False
+
+    @property
+    def time_to_first_token(self):
+        if self.first_token_at is None:
+            return None
+        return self.first_token_at - self.started
+
+    @property
+    def total_time(self):
+        end = self.finished_at if self.finished_at is not None else time.perf_counter()
+        return end - self.started
+
+    @property
+    def tokens(self):
+        return self.token_count if self.token_count is not None else self.chunks
+
+    @property
+    def tokens_per_second(self):
+        if self.first_token_at is None:
+            return None
+        end = self.finished_at if self.finished_at is not None else time.perf_counter()
+        elapsed = end - self.first_token_at
+        return self.tokens / elapsed if elapsed > 0 else None
+
+    def summary(self):
+        """One-line human readable summary for display under a response"""
+        if self.cached:
+            return f"Served from cache in {self.total_time * 1000:.1f} ms"
+        ttft = self.time_to_first_token
+        rate = self.tokens_per_second
+        parts = [f"TTFT {ttft:.2f}s" if ttft is not None else "TTFT n/a"]
+        parts.append(f"{self.tokens} tokens in {self.total_time:.2f}s")
+        if rate:
+            parts.append(f"{rate:.1f} tok/s")
+        return " · ".join(parts)
+
+def timed_stream(chunks, stats):
+    """Yield non-empty text chunks from an iterator while recording timing into stats"""
+    try:
+        for chunk in chunks:
+            if not chunk:
+                continue
+            if stats.first_token_at is None:
+                stats.first_token_at = time.perf_counter()
+            stats.chunks += 1
+            yield chunk
+    finally:
+        stats.finished_at = time.perf_counter()
+
+def cached_response_stream(text):
+    """Return (chunks, stats) for a response served from cache, shaped like a live stream"""
+    stats = StreamStats()
+    stats.cached = True
+    return timed_stream(iter([text]), stats), stats
@@ -0,0 +1,181 @@
+import streamlit as st
+import pandas as pd
+import numpy as np
+import json
+import os
+from instrumentation import timed, payload_size
+
+MARKET_CACHE_DIR = os.getenv('MARKET_CACHE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.market_cache'))
+OHLCV_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+PRICE_COLUMNS = ['Open', 'High', 'Low', 'Close']
+# Relative price difference on an overlapping bar that marks the cache as stale (split/dividend re-adjustment)
+MARKET_CACHE_TOLERANCE = float(os.getenv('MARKET_CACHE_TOLERANCE', '1e-4'))
+# Cached history is re-downloaded in full once it is older than this many days
+MARKET_CACHE_MAX_AGE_DAYS = float(os.getenv('MARKET_CACHE_MAX_AGE_DAYS', '7'))
+
+@timed('market_data.yfinance', size=payload_size)
+def yfinance_downloader(ticker, start, end, interval="1d"):
+    """Download raw OHLCV bars for one ticker from yfinance"""
+    import yfinance as yf
+    
+    return yf.download(ticker, start=start, end=end, interval=interval, progress=False)
+
+def bars_consistent(cached, fresh, tolerance=MARKET_CACHE_TOLERANCE):
+    """True unless a bar present in both frames has prices differing by more than tolerance (relative)"""
+    common = cached.index.intersection(fresh.index)
+    columns = [col for col in PRICE_COLUMNS if col in cached.columns and col in fresh.columns]
+    if len(common) == 0 or not columns:
+        return True
+    old = cached.loc[common, columns].to_numpy(dtype=float)
+    new = fresh.loc[common, columns].to_numpy(dtype=float)
+    return bool(np.allclose(old, new, rtol=tolerance, atol=0, equal_nan=True))
+
+def normalize_bars(df):
+    """Bring a raw download into the stored layout: a sorted 'Date' index and flat OHLCV columns"""
+    if df is None or df.empty:
+        return pd.DataFrame(columns=OHLCV_COLUMNS, index=pd.DatetimeIndex([], name='Date'))
+
+    df = df.copy()
+    if isinstance(df.columns, pd.MultiIndex):
+        df.columns = df.columns.droplevel(1)
+
+    if 'Date' in df.columns:
+        df = df.set_index('Date')
+    df.index = pd.DatetimeIndex(df.index, name='Date')
+
+    columns = [col for col in OHLCV_COLUMNS if col in df.columns]
+    df = df[columns]
+    df = df[~df.index.duplicated(keep='last')]
+    return df.sort_index()
+
+class MarketDataCache:
+    """On-disk OHLCV store with one Parquet file per ticker and interval.
+
+    Each file has a JSON sidecar recording the [start, end) range that has
+    already been requested upstream and when the history was downloaded, so a
+    repeat request only downloads the missing head or tail of its range and
+    merges it into the stored bars.
+
+    Bars are auto-adjusted, so a split or dividend changes all earlier
+    prices. Every head/tail download therefore re-fetches the adjoining
+    cached bar; if it no longer matches, or the history is older than
+    MARKET_CACHE_MAX_AGE_DAYS, the whole range is downloaded again.
+    """
+
+    def __init__(self, cache_dir=MARKET_CACHE_DIR, downloader=yfinance_downloader):
+        self.cache_dir = cache_dir
+        self.downloader = downloader
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _paths(self, ticker, interval):
+        name = f"{ticker.strip().upper()}_{interval}".replace('/', '_')
+        base = os.path.join(self.cache_dir, name)
+        return base + '.parquet', base + '.json'
+
+    def load(self, ticker, interval="1d"):
+        """Return (bars, covered_start, covered_end, fetched_at) from disk, or Nones when missing or stale"""
+        data_path, meta_path = self._paths(ticker, interval)
+        if not (os.path.exists(data_path) and os.path.exists(meta_path)):
+            return None, None, None, None
+
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            # Entries written without a download time predate the max-age check and are rebuilt
+            fetched_at = pd.Timestamp(meta['fetched_at'])
+            if pd.Timestamp.now() - fetched_at > pd.Timedelta(days=MARKET_CACHE_MAX_AGE_DAYS):
+                return None, None, None, None
+            bars = pd.read_parquet(data_path)
+            return bars, pd.Timestamp(meta['start']), pd.Timestamp(meta['end']), fetched_at
+        except Exception:
+            # A corrupt or half-written entry is treated as a miss and rebuilt
+            return None, None, None, None
+
+    def save(self, ticker, interval, bars, covered_start, covered_end, fetched_at):
+        """Atomically write bars, their covered range and download time to disk"""
+        data_path, meta_path = self._paths(ticker, interval)
+
+        bars.to_parquet(data_path + '.tmp')
+        with open(meta_path + '.tmp', 'w') as f:
+            json.dump({
+                'start': covered_start.isoformat(),
+                'end': covered_end.isoformat(),
+                'fetched_at': fetched_at.isoformat()
+            }, f)
+
+        os.replace(data_path + '.tmp', data_path)
+        os.replace(meta_path + '.tmp', meta_path)
+
+    def _download(self, ticker, start, end, interval):
+        return normalize_bars(self.downloader(ticker, start=start.date(), end=end.date(), interval=interval))
+
+    def get(self, ticker, start_date, end_date, interval="1d"):
+        """Return bars in [start_date, end_date), downloading only what is not cached"""
+        ticker = ticker.strip().upper()
+        start = pd.Timestamp(start_date).normalize()
+        end = pd.Timestamp(end_date).normalize()
+
+        # Today's bar is still forming, so coverage never extends past it and
+        # the current session is always re-downloaded
+        covered_limit = min(end, pd.Timestamp.today().normalize())
+
+        bars, cov_start, cov_end, cached_at = self.load(ticker, interval)
+        fetched_at = pd.Timestamp.now()
+
+        if bars is not None:
+            pieces = [bars]
+            # Completed cached bars; anything from cov_end on may still have been forming
+            settled = bars[self._mask(bars.index, cov_start, cov_end)]
+            if start < cov_start:
+                # Reach one day past the head so the first cached bar is downloaded again
+                head = self._download(ticker, start, cov_start + pd.Timedelta(days=1), interval)
+                pieces.insert(0, head)
+                if not bars_consistent(settled.head(1), head):
+                    pieces = None
+            if pieces is not None and end > cov_end:
+                # Start at the last settled bar so it overlaps the new tail
+                tail_start = settled.index[-1].tz_localize(None).normalize() if not settled.empty else cov_end
+                tail = self._download(ticker, min(tail_start, cov_end), end, interval)
+                pieces.append(tail)
+                if not bars_consistent(settled.tail(1), tail):
+                    pieces = None
+
+            if pieces is None:
+                # Adjustment basis changed since the cached download; rebuild the whole range
+                start_all, end_all = min(start, cov_start), max(end, cov_end)
+                bars = self._download(ticker, start_all, end_all, interval)
+                cov_start, cov_end = start_all, min(end_all, pd.Timestamp.today().normalize())
+            elif len(pieces) > 1:
+                bars = normalize_bars(pd.concat([p for p in pieces if not p.empty] or [bars]))
+                cov_start = min(start, cov_start)
+                if end > cov_end:
+                    cov_end = max(cov_end, covered_limit)
+                # Merged history keeps the download time of its oldest part
+                fetched_at = cached_at
+            else:
+                # Nothing new was downloaded; skip rewriting the file
+                return self._slice(bars, start, end)
+        else:
+            bars = self._download(ticker, start, end, interval)
+            cov_start, cov_end = start, covered_limit
+
+        if not bars.empty:
+            self.save(ticker, interval, bars, cov_start, max(cov_start, cov_end), fetched_at)
+
+        return self._slice(bars, start, end)
+
+    @staticmethod
+    def _mask(index, start, end):
+        if getattr(index, 'tz', None) is not None:
+            start = start.tz_localize(index.tz)
+            end = end.tz_localize(index.tz)
+        return (index >= start) & (index < end)
+
+    @classmethod
+    def _slice(cls, bars, start, end):
+        return bars[cls._mask(bars.index, start, end)]
+
+@st.cache_resource
+def get_market_cache():
+    """Load and cache the shared on-disk market data store"""
+    return MarketDataCache()
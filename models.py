@@ -2,14 +2,32 @@ import streamlit as st
 import asyncio
 import nest_asyncio
 import os
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.prompts import PromptTemplate
-from sklearn.linear_model import LinearRegression
 import numpy as np
+from llm_streaming import StreamStats, timed_stream, cached_response_stream
+from llm_cache import load_response_cache, cached_stream, data_scope
+from prompt_context import build_analysis_context
+from instrumentation import stage, payload_size, instrument_stream
 
 # Apply nest_asyncio to allow nested event loops
 nest_asyncio.apply()
 
+GEMINI_MODEL = "gemini-2.5-flash"
+
+def _gemini_chat():
+    """langchain_google_genai.ChatGoogleGenerativeAI, imported on first use"""
+    from langchain_google_genai import ChatGoogleGenerativeAI
+    return ChatGoogleGenerativeAI
+
+def _prompt_template():
+    """langchain_core.prompts.PromptTemplate, imported on first use"""
+    from langchain_core.prompts import PromptTemplate
+    return PromptTemplate
+
+def _sklearn_lr():
+    """sklearn.linear_model.LinearRegression, imported on first use"""
+    from sklearn.linear_model import LinearRegression
+    return LinearRegression
+
 def initialize_gemini_model():
     """Initialize and return the Gemini model"""
     api_key = os.getenv("GOOGLE_API_KEY")
@@ -23,21 +41,64 @@ def initialize_gemini_model():
     except RuntimeError:
         pass
     
-    return ChatGoogleGenerativeAI(model="gemini-2.5-flash", google_api_key=api_key)
+    ChatGoogleGenerativeAI = _gemini_chat()
+    return ChatGoogleGenerativeAI(model=GEMINI_MODEL, google_api_key=api_key)
 
 def create_analysis_prompt():
     """Create and return the analysis prompt template"""
+    PromptTemplate = _prompt_template()
     return PromptTemplate(
         input_variables=["question", "data", "stats"],
         template="You are a financial analyst. Based on this data:\n{data}\n\nAnd these stats:\n{stats}\n\nAnswer the user: {question}"
     )
 
+def stream_gemini_analysis(chain, inputs, cache_context=None):
+    """Stream a LangChain chain's answer.
+
+    Returns (chunks, stats): a generator of text chunks and a StreamStats that
+    fills in time-to-first-token and tokens/sec as the generator is consumed.
+    cache_context is an optional (model, template, data fingerprint) tuple;
+    when given, repeat questions are answered from the response cache.
+    """
+    if cache_context is not None:
+        cache = load_response_cache()
+        cached = cache.lookup(*cache_context, inputs['question'])
+        if cached is not None:
+            return cached_response_stream(cached)
+    
+    stats = StreamStats()
+    chunks = instrument_stream('llm.gemini.stream', (chunk.content if hasattr(chunk, 'content') else str(chunk) for chunk in chain.stream(inputs)))
+    if cache_context is not None:
+        chunks = cached_stream(cache, cache_context, inputs['question'], chunks)
+    return timed_stream(chunks, stats), stats
+
+def analyze_financial_data_with_gemini(llm, df, query, ticker=None):
+    """Answer a question about df with Gemini using the standard analysis prompt"""
+    prompt = create_analysis_prompt()
+    cache = load_response_cache()
+    cache_context = (GEMINI_MODEL, prompt.template, data_scope(df, ticker))
+    cached = cache.lookup(*cache_context, query)
+    if cached is not None:
+        return cached
+    
+    context = build_analysis_context(df)
+    with stage('llm.gemini') as sample:
+        response = (prompt | llm).invoke({
+            "question": query,
+            "data": context['data'],
+            "stats": context['stats']
+        })
+        sample['size'] = payload_size(response.content)
+    cache.store(*cache_context, query, response.content)
+    return response.content
+
 def perform_price_prediction(df):
     """Perform price prediction using linear regression"""
-    df['Day_Num'] = np.arange(len(df))
-    X = df[['Day_Num']]
-    y = df['Close']
+    # Build the feature locally so the caller's frame is left untouched
+    X = np.arange(len(df)).reshape(-1, 1)
+    y = df['Close'].to_numpy()
     
+    LinearRegression = _sklearn_lr()
     model = LinearRegression()
     model.fit(X, y)
     
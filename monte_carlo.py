@@ -0,0 +1,75 @@
+"""
+Monte Carlo price bands for the prediction tab.
+
+Return paths are simulated as batched NumPy arrays (GBM with normally
+distributed log returns, or a bootstrap of historical log returns) from a
+seeded generator. Paths are generated chunk by chunk and folded into a fixed
+per-step histogram of cumulative log returns, so memory stays bounded by
+chunk_size x horizon no matter how many paths are drawn; quantiles are read
+off the histogram at the end.
+"""
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+HISTOGRAM_BINS = 4096
+
+def _log_returns(close, lookback):
+    close = np.asarray(close, dtype=float)
+    close = close[np.isfinite(close) & (close > 0)]
+    returns = np.diff(np.log(close))
+    return returns[-lookback:] if lookback else returns
+
+def _draw_chunk(rng, method, returns, mean, std, size):
+    if method == "gbm":
+        return rng.normal(mean, std, size)
+    if method == "bootstrap":
+        return returns[rng.integers(0, len(returns), size)]
+    raise ValueError(f"Unknown simulation method: {method}")
+
+def simulate_quantile_bands(close, horizon=30, n_paths=100_000, method="gbm", quantiles=DEFAULT_QUANTILES,
+                            seed=0, chunk_size=25_000, lookback=252, bins=HISTOGRAM_BINS):
+    """Simulate n_paths price paths and return quantile bands for steps 1..horizon.
+
+    Returns a DataFrame indexed by step with one column per quantile (price
+    levels). method is 'gbm' or 'bootstrap'; both use the last `lookback`
+    daily log returns of close.
+    """
+    close = np.asarray(close, dtype=float)
+    returns = _log_returns(close, lookback)
+    if len(returns) < 2:
+        raise ValueError("Need at least three prices to simulate returns")
+
+    mean, std = returns.mean(), returns.std(ddof=1)
+    steps = np.arange(1, horizon + 1)
+
+    # Per-step histogram range wide enough for any plausible cumulative return
+    spread = max(std, np.abs(returns).max() / 3, 1e-8)
+    low = mean * steps - 10 * spread * np.sqrt(steps)
+    high = mean * steps + 10 * spread * np.sqrt(steps)
+    width = (high - low) / bins
+    counts = np.zeros(horizon * bins, dtype=np.int64)
+    offsets = np.arange(horizon) * bins
+
+    rng = np.random.default_rng(seed)
+    remaining = n_paths
+    while remaining > 0:
+        size = min(chunk_size, remaining)
+        cumulative = np.cumsum(_draw_chunk(rng, method, returns, mean, std, (size, horizon)), axis=1)
+        bin_index = np.clip(((cumulative - low) / width).astype(np.int64), 0, bins - 1)
+        counts += np.bincount((bin_index + offsets).ravel(), minlength=horizon * bins)
+        remaining -= size
+
+    # Interpolate each quantile inside its bin from the per-step cumulative counts
+    cdf = np.cumsum(counts.reshape(horizon, bins), axis=1) / n_paths
+    bands = {}
+    for q in quantiles:
+        upper_bin = np.argmax(cdf >= q, axis=1)
+        below = np.where(upper_bin > 0, cdf[np.arange(horizon), np.maximum(upper_bin - 1, 0)], 0.0)
+        inside = cdf[np.arange(horizon), upper_bin] - below
+        fraction = np.where(inside > 0, (q - below) / np.where(inside > 0, inside, 1), 0.5)
+        log_return = low + (upper_bin + fraction) * width
+        bands[q] = close[-1] * np.exp(log_return)
+
+    return pd.DataFrame(bands, index=pd.Index(steps, name='Step'))
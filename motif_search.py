@@ -0,0 +1,184 @@
+"""
+Numeric time-series similarity search.
+
+Distance profiles use MASS (Mueen's Algorithm for Similarity Search): the
+z-normalized Euclidean distance between a query and every window of a series,
+computed with one FFT convolution in O(n log n). The matrix profile extends
+this to all-pairs search for motif (best repeated pattern) and discord (most
+unusual window) discovery.
+"""
+
+import numpy as np
+import pandas as pd
+
+def sliding_mean_std(series, window):
+    """Mean and population std of every length-window slice of series"""
+    csum = np.cumsum(np.insert(series, 0, 0.0))
+    csum_sq = np.cumsum(np.insert(series ** 2, 0, 0.0))
+    mean = (csum[window:] - csum[:-window]) / window
+    var = (csum_sq[window:] - csum_sq[:-window]) / window - mean ** 2
+    return mean, np.sqrt(np.maximum(var, 0.0))
+
+def sliding_dot_product(query, series):
+    """Dot product of query with every window of series, via FFT"""
+    n, m = len(series), len(query)
+    size = 1 << (n + m - 1).bit_length()
+    product = np.fft.irfft(np.fft.rfft(series, size) * np.fft.rfft(query[::-1], size), size)
+    return product[m - 1:n]
+
+def mass(query, series, series_stats=None):
+    """Z-normalized Euclidean distance from query to every window of series.
+
+    series_stats is an optional precomputed (mean, std) from sliding_mean_std,
+    reused when many queries run against the same series.
+    """
+    query = np.asarray(query, dtype=float)
+    series = np.asarray(series, dtype=float)
+    m = len(query)
+
+    mean_t, std_t = series_stats if series_stats is not None else sliding_mean_std(series, m)
+    mean_q, std_q = query.mean(), query.std()
+
+    dot = sliding_dot_product(query, series)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        corr = (dot - m * mean_q * mean_t) / (m * std_q * std_t)
+    # Flat windows (zero std) carry no shape; treat them as uncorrelated
+    corr = np.where(np.isfinite(corr), np.clip(corr, -1.0, 1.0), 0.0)
+    return np.sqrt(2 * m * (1 - corr))
+
+def _apply_exclusion(profile, center, zone):
+    profile[max(0, center - zone):center + zone + 1] = np.inf
+
+def top_k_matches(profile, k, exclusion_zone):
+    """Indices of the k smallest distances, skipping trivial overlapping matches"""
+    profile = profile.copy()
+    matches = []
+    for _ in range(k):
+        best = int(np.argmin(profile))
+        if not np.isfinite(profile[best]):
+            break
+        matches.append(best)
+        _apply_exclusion(profile, best, exclusion_zone)
+    return matches
+
+def top_k_motifs(profile, index, k, exclusion_zone):
+    """Start indices of the k best motif pairs, each unordered pair reported once.
+
+    Both windows of a reported pair get the exclusion zone: no later motif
+    may start or find its match there, which drops the B->A mirror of an A->B
+    pair and any pair overlapping an earlier one.
+    """
+    profile = profile.copy()
+    claimed = np.zeros(len(profile), dtype=bool)
+    motifs = []
+    while len(motifs) < k:
+        best = int(np.argmin(profile))
+        if not np.isfinite(profile[best]):
+            break
+        match = int(index[best])
+        _apply_exclusion(profile, best, exclusion_zone)
+        if claimed[match]:
+            continue
+        motifs.append(best)
+        for member in (best, match):
+            _apply_exclusion(profile, member, exclusion_zone)
+            claimed[max(0, member - exclusion_zone):member + exclusion_zone + 1] = True
+    return motifs
+
+def _distance_profile(df, window, columns):
+    total = None
+    for column in columns:
+        series = df[column].to_numpy(dtype=float)
+        profile = mass(series[-window:], series)
+        total = profile ** 2 if total is None else total + profile ** 2
+    return np.sqrt(total / len(columns))
+
+def find_similar_windows(df, window=20, top_k=3, columns=('Close',)):
+    """Find the past windows most similar in shape to the latest `window` bars.
+
+    Several columns (e.g. Close and Volume) are combined by averaging their
+    squared z-normalized distances. Returns a DataFrame with start/end dates,
+    the distance, and the return over the bars that followed each match.
+    """
+    n = len(df)
+    if n < 2 * window:
+        return pd.DataFrame(columns=['Start', 'End', 'Distance', 'Next_Return'])
+
+    profile = _distance_profile(df, window, columns)
+
+    # Exclude the query itself and the windows overlapping it
+    query_start = n - window
+    profile[query_start - window // 2:] = np.inf
+
+    matches = top_k_matches(profile, top_k, window // 2)
+    dates = df['Date'].to_numpy() if 'Date' in df.columns else df.index.to_numpy()
+    close = df['Close'].to_numpy(dtype=float)
+
+    rows = []
+    for start in matches:
+        end = start + window - 1
+        follow = min(end + window, n - 1)
+        rows.append({
+            'Start': dates[start],
+            'End': dates[end],
+            'Distance': float(profile[start]),
+            'Next_Return': close[follow] / close[end] - 1 if follow > end else np.nan
+        })
+    return pd.DataFrame(rows)
+
+def matrix_profile(series, window):
+    """Matrix profile and profile index of series (STOMP, O(n^2) time, O(n) memory).
+
+    Entry i is the distance from window i to its nearest non-trivial neighbour.
+    """
+    series = np.asarray(series, dtype=float)
+    n_windows = len(series) - window + 1
+    if n_windows < 2:
+        return np.full(max(n_windows, 0), np.inf), np.zeros(max(n_windows, 0), dtype=np.int64)
+
+    mean, std = sliding_mean_std(series, window)
+    zone = max(1, window // 4)
+
+    first_row = sliding_dot_product(series[:window], series)
+    dot = first_row.copy()
+
+    profile = np.full(n_windows, np.inf)
+    index = np.zeros(n_windows, dtype=np.int64)
+
+    for i in range(n_windows):
+        if i > 0:
+            # Update all dot products for window i from those of window i-1 in O(n)
+            dot[1:] = dot[:-1] - series[i - 1] * series[:n_windows - 1] + series[i + window - 1] * series[window:window + n_windows - 1]
+            dot[0] = first_row[i]
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            corr = (dot - window * mean[i] * mean) / (window * std[i] * std)
+        corr = np.where(np.isfinite(corr), np.clip(corr, -1.0, 1.0), 0.0)
+        distances = np.sqrt(2 * window * (1 - corr))
+        _apply_exclusion(distances, i, zone)
+
+        best = int(np.argmin(distances))
+        profile[i] = distances[best]
+        index[i] = best
+
+    return profile, index
+
+def find_motifs_and_discords(df, window=20, k=3, column='Close'):
+    """Return (motifs, discords) DataFrames from the matrix profile of one column"""
+    profile, index = matrix_profile(df[column].to_numpy(dtype=float), window)
+    dates = df['Date'].to_numpy() if 'Date' in df.columns else df.index.to_numpy()
+
+    motif_starts = top_k_motifs(profile, index, k, window // 2)
+    discord_starts = top_k_matches(-np.where(np.isfinite(profile), profile, -np.inf), k, window // 2)
+
+    motifs = pd.DataFrame([{
+        'Start': dates[i], 'End': dates[i + window - 1],
+        'Match_Start': dates[index[i]], 'Match_End': dates[index[i] + window - 1],
+        'Distance': float(profile[i])
+    } for i in motif_starts])
+    discords = pd.DataFrame([{
+        'Start': dates[i], 'End': dates[i + window - 1],
+        'Distance': float(profile[i])
+    } for i in discord_starts])
+    return motifs, discords
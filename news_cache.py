@@ -0,0 +1,123 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+NEWS_CACHE_PATH = os.getenv('NEWS_CACHE_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.news_cache.sqlite'))
+NEWS_CACHE_TTL = float(os.getenv('NEWS_CACHE_TTL', '900'))
+NEWS_CACHE_MAX_ENTRIES = int(os.getenv('NEWS_CACHE_MAX_ENTRIES', '256'))
+
+# Two articles whose 64-bit SimHashes differ in at most this many bits are near-duplicates
+SIMHASH_MAX_DISTANCE = 3
+# Query parameters dropped from URLs: any utm_* parameter, plus these exact names
+TRACKING_PARAM_PREFIXES = ('utm_',)
+TRACKING_PARAMS = frozenset(('fbclid', 'gclid', 'mc_cid', 'mc_eid', 'ref'))
+
+def normalize_query(query):
+    """Lowercase a query and collapse whitespace so equivalent queries share a key"""
+    return ' '.join(query.lower().split())
+
+def is_tracking_param(name):
+    """True for analytics parameters that do not change which page a URL points to"""
+    name = name.lower()
+    return name in TRACKING_PARAMS or name.startswith(TRACKING_PARAM_PREFIXES)
+
+def canonical_url(url):
+    """Canonical form of a URL: lowercase host without www, no tracking params, fragment or trailing slash"""
+    if not url or url == 'N/A':
+        return None
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    params = [(k, v) for k, v in parse_qsl(parts.query) if not is_tracking_param(k)]
+    return urlunsplit(('https' if parts.scheme in ('http', 'https') else parts.scheme, host, parts.path.rstrip('/'), urlencode(sorted(params)), ''))
+
+def simhash(text, bits=64):
+    """64-bit SimHash over word bigrams of text"""
+    words = re.findall(r'\w+', text.lower())
+    shingles = [' '.join(pair) for pair in zip(words, words[1:])] or words
+    if not shingles:
+        return 0
+
+    weights = [0] * bits
+    for shingle in shingles:
+        h = int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'big')
+        for bit in range(bits):
+            weights[bit] += 1 if h >> bit & 1 else -1
+    return sum(1 << bit for bit in range(bits) if weights[bit] > 0)
+
+def deduplicate_articles(articles, max_distance=SIMHASH_MAX_DISTANCE):
+    """Drop articles that repeat a canonical URL or are near-duplicates by title and snippet"""
+    seen_urls = set()
+    seen_hashes = []
+    unique = []
+
+    for article in articles:
+        url = canonical_url(article.get('url'))
+        if url and url in seen_urls:
+            continue
+
+        fingerprint = simhash(f"{article.get('title', '')} {article.get('snippet', '')}")
+        if fingerprint and any(bin(fingerprint ^ other).count('1') <= max_distance for other in seen_hashes):
+            continue
+
+        if url:
+            seen_urls.add(url)
+        if fingerprint:
+            seen_hashes.append(fingerprint)
+        unique.append(article)
+
+    return unique
+
+class NewsCache:
+    """SQLite-backed TTL cache of news results with a size-bounded LRU.
+
+    Entries are keyed by normalized query and survive restarts. Values must
+    be JSON-serializable, e.g. the article dicts from extract_key_info.
+    """
+
+    def __init__(self, path=NEWS_CACHE_PATH, ttl=NEWS_CACHE_TTL, max_entries=NEWS_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS news (key TEXT PRIMARY KEY, created REAL, accessed REAL, value TEXT)"
+        )
+        self._conn.commit()
+
+    def get(self, query):
+        """Return the cached value for query, or None if missing or expired"""
+        key = normalize_query(query)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT created, value FROM news WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if now - row[0] > self.ttl:
+                self._conn.execute("DELETE FROM news WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute("UPDATE news SET accessed = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+        return json.loads(row[1])
+
+    def set(self, query, value):
+        """Store value for query and evict the least recently used entries over the size bound"""
+        key = normalize_query(query)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO news (key, created, accessed, value) VALUES (?, ?, ?, ?)",
+                (key, now, now, json.dumps(value))
+            )
+            self._conn.execute(
+                "DELETE FROM news WHERE key IN (SELECT key FROM news ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+            self._conn.commit()
@@ -2,75 +2,299 @@ import streamlit as st
 import requests
 import json
 import os
+import re
+import threading
+import time
+from collections import deque
+from requests.adapters import HTTPAdapter
+from llm_streaming import StreamStats, timed_stream, cached_response_stream
+from llm_cache import load_response_cache, cached_stream, data_scope
+from prompt_context import build_analysis_context
+from analysis_orchestrator import AnalysisBackend, run_analyses, ANALYSIS_DEADLINE
+from instrumentation import timed, payload_size, instrument_stream
 
-OLLAMA_BASE_URL = "http://localhost:11434"
+OLLAMA_BASE_URL = os.getenv('OLLAMA_BASE_URL', 'http://localhost:11434')
 OLLAMA_CLOUD_BASE_URL = os.getenv('OLLAMA_CLOUD_BASE_URL', 'https://ollama.com')
 OLLAMA_CLOUD_API_KEY = os.getenv('OLLAMA_CLOUD_API_KEY')
 OLLAMA_CLOUD_MODELS = os.getenv('OLLAMA_CLOUD_MODELS', '').split(',') if os.getenv('OLLAMA_CLOUD_MODELS') else []
 
+# (connect, read) timeouts in seconds; generation gets a much longer read timeout
+OLLAMA_CONNECT_TIMEOUT = float(os.getenv('OLLAMA_CONNECT_TIMEOUT', '2'))
+OLLAMA_READ_TIMEOUT = float(os.getenv('OLLAMA_READ_TIMEOUT', '5'))
+OLLAMA_GENERATE_TIMEOUT = float(os.getenv('OLLAMA_GENERATE_TIMEOUT', '300'))
+# How long a health check / model list result is reused before asking again
+OLLAMA_STATUS_TTL = float(os.getenv('OLLAMA_STATUS_TTL', '30'))
+
+# How long Ollama keeps a model in memory after a request ('30m', '1h30m', seconds, or -1 for forever)
+OLLAMA_KEEP_ALIVE = os.getenv('OLLAMA_KEEP_ALIVE', '30m')
+# Comma-separated local models to load into memory when the app starts
+OLLAMA_PRELOAD_MODELS = [m.strip() for m in os.getenv('OLLAMA_PRELOAD_MODELS', '').split(',') if m.strip()]
+LATENCY_SAMPLES = 20
+
+# Go-style durations as accepted by Ollama: '30m', '1h30m', '1m30.5s', '500ms'
+DURATION_UNITS = {'ns': 1e-9, 'us': 1e-6, 'µs': 1e-6, 'ms': 1e-3, 's': 1, 'm': 60, 'h': 3600}
+DURATION_SEGMENT = re.compile(r'(\d+(?:\.\d*)?|\.\d+)(ns|us|µs|ms|h|m|s)')
+
+_sessions = {}
+_tags_cache = {}
+_running_cache = {}
+_model_status = {}
+_client_lock = threading.Lock()
+
+def get_ollama_session(base_url):
+    """Return a pooled keep-alive session for an Ollama server"""
+    with _client_lock:
+        session = _sessions.get(base_url)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            _sessions[base_url] = session
+        return session
+
+def _cloud_headers():
+    return {
+        "Authorization": f"Bearer {OLLAMA_CLOUD_API_KEY}",
+        "Content-Type": "application/json"
+    }
+
+def _get_tags(base_url, headers=None):
+    """Return (available, model names, error) for a server, cached for OLLAMA_STATUS_TTL seconds"""
+    now = time.monotonic()
+    with _client_lock:
+        cached = _tags_cache.get(base_url)
+    if cached and now - cached[0] < OLLAMA_STATUS_TTL:
+        return cached[1]
+
+    try:
+        response = get_ollama_session(base_url).get(
+            f"{base_url}/api/tags",
+            headers=headers,
+            timeout=(OLLAMA_CONNECT_TIMEOUT, OLLAMA_READ_TIMEOUT)
+        )
+        if response.status_code == 200:
+            status = (True, [model['name'] for model in response.json()['models']], None)
+        else:
+            status = (False, [], None)
+    except Exception as e:
+        status = (False, [], e)
+
+    with _client_lock:
+        _tags_cache[base_url] = (now, status)
+    return status
+
+def clear_ollama_status_cache():
+    """Forget cached health checks and model lists so the next call asks again"""
+    with _client_lock:
+        _tags_cache.clear()
+        _running_cache.clear()
+
 def check_ollama_connection():
     """Check if Ollama is running"""
-    try:
-        response = requests.get(f"{OLLAMA_BASE_URL}/api/tags")
-        return response.status_code == 200
-    except:
-        return False
+    available, _, _ = _get_tags(OLLAMA_BASE_URL)
+    return available
 
 def check_ollama_cloud_connection():
     """Check if Ollama Cloud is accessible"""
-    try:
-        if not OLLAMA_CLOUD_API_KEY:
-            return False
-        
-        headers = {
-            "Authorization": f"Bearer {OLLAMA_CLOUD_API_KEY}",
-            "Content-Type": "application/json"
-        }
-        response = requests.get(f"{OLLAMA_CLOUD_BASE_URL}/api/tags", headers=headers)
-        return response.status_code == 200
-    except:
+    if not OLLAMA_CLOUD_API_KEY:
         return False
+    available, _, _ = _get_tags(OLLAMA_CLOUD_BASE_URL, _cloud_headers())
+    return available
 
 def list_ollama_models():
     """List available Ollama models"""
-    try:
-        response = requests.get(f"{OLLAMA_BASE_URL}/api/tags")
-        if response.status_code == 200:
-            models = response.json()
-            return [model['name'] for model in models['models']]
-        return []
-    except Exception as e:
-        st.error(f"Error listing Ollama models: {str(e)}")
-        return []
+    _, models, error = _get_tags(OLLAMA_BASE_URL)
+    if error:
+        st.error(f"Error listing Ollama models: {str(error)}")
+    return models
 
 def list_ollama_cloud_models():
     """List available Ollama Cloud models"""
+    if not OLLAMA_CLOUD_API_KEY:
+        st.warning("Ollama Cloud API key not found")
+        return []
+    
+    _, models, error = _get_tags(OLLAMA_CLOUD_BASE_URL, _cloud_headers())
+    if error:
+        st.error(f"Error listing Ollama Cloud models: {str(error)}")
+    return models
+
+def parse_keep_alive(keep_alive):
+    """Convert an Ollama keep_alive value to seconds (None means forever)"""
+    value = str(keep_alive).strip()
     try:
-        if not OLLAMA_CLOUD_API_KEY:
-            st.warning("Ollama Cloud API key not found")
-            return []
-        
-        headers = {
-            "Authorization": f"Bearer {OLLAMA_CLOUD_API_KEY}",
-            "Content-Type": "application/json"
-        }
-        response = requests.get(f"{OLLAMA_CLOUD_BASE_URL}/api/tags", headers=headers)
+        seconds = float(value)
+    except ValueError:
+        sign = -1 if value.startswith('-') else 1
+        body = value.lstrip('+-')
+        if not body or DURATION_SEGMENT.sub('', body):
+            raise ValueError(f"Invalid keep_alive duration: {keep_alive!r}")
+        seconds = sign * sum(float(number) * DURATION_UNITS[unit] for number, unit in DURATION_SEGMENT.findall(body))
+    return None if seconds < 0 else seconds
+
+def _status_entry(base_url, model):
+    return _model_status.setdefault((base_url, model), {
+        'last_used': None,
+        'cold': deque(maxlen=LATENCY_SAMPLES),
+        'warm': deque(maxlen=LATENCY_SAMPLES),
+        'load_durations': deque(maxlen=LATENCY_SAMPLES),
+        'warming': False
+    })
+
+def _model_name(model):
+    return model if ':' in model else f"{model}:latest"
+
+def is_model_hot(model, use_cloud=False, ask_server=True):
+    """Whether a model should still be in memory.
+
+    The local server's list of loaded models (/api/ps, cached for
+    OLLAMA_STATUS_TTL seconds) decides, so models loaded by other clients or
+    evicted early count correctly. With ask_server=False only an already
+    cached list is used. Otherwise this falls back to whether we used the
+    model within its keep_alive window.
+    """
+    base_url = OLLAMA_CLOUD_BASE_URL if use_cloud else OLLAMA_BASE_URL
+    if not use_cloud:
+        running = _get_running(base_url, ask_server)
+        if running is not None:
+            return _model_name(model) in {_model_name(name) for name in running}
+    with _client_lock:
+        entry = _model_status.get((base_url, model))
+        last_used = entry['last_used'] if entry else None
+    if last_used is None:
+        return False
+    keep_alive = parse_keep_alive(OLLAMA_KEEP_ALIVE)
+    return keep_alive is None or time.monotonic() - last_used < keep_alive
+
+def _record_model_use(base_url, model, latency, was_hot, load_duration=None):
+    with _client_lock:
+        entry = _status_entry(base_url, model)
+        entry['last_used'] = time.monotonic()
+        entry['warm' if was_hot else 'cold'].append(latency)
+        if load_duration is not None:
+            # Ollama reports load_duration in nanoseconds
+            entry['load_durations'].append(load_duration / 1e9)
+        # The model just answered, so it is loaded now whatever the cached list says
+        cached = _running_cache.get(base_url)
+        if cached and cached[1] is not None and model not in cached[1]:
+            _running_cache[base_url] = (cached[0], cached[1] + [model])
+
+def get_model_latency_stats():
+    """Return {model: cold/warm sample counts and mean latencies in seconds} for models used so far.
+
+    Latency is the time until the first output arrived (the whole response
+    for non-streaming calls); load_mean is Ollama's own reported load time.
+    """
+    stats = {}
+    with _client_lock:
+        for (base_url, model), entry in _model_status.items():
+            name = model if base_url == OLLAMA_BASE_URL else f"{model} (cloud)"
+            stats[name] = {
+                'cold_count': len(entry['cold']),
+                'cold_mean': sum(entry['cold']) / len(entry['cold']) if entry['cold'] else None,
+                'warm_count': len(entry['warm']),
+                'warm_mean': sum(entry['warm']) / len(entry['warm']) if entry['warm'] else None,
+                'load_mean': sum(entry['load_durations']) / len(entry['load_durations']) if entry['load_durations'] else None,
+            }
+    return stats
+
+def _get_running(base_url, ask_server=True):
+    """Names of the models a server holds in memory, cached for OLLAMA_STATUS_TTL seconds.
+
+    Returns None if the server could not be asked, or if nothing is cached
+    and ask_server is False.
+    """
+    now = time.monotonic()
+    with _client_lock:
+        cached = _running_cache.get(base_url)
+    if cached and now - cached[0] < OLLAMA_STATUS_TTL:
+        return cached[1]
+    if not ask_server:
+        return None
+
+    running = None
+    try:
+        response = get_ollama_session(base_url).get(
+            f"{base_url}/api/ps",
+            timeout=(OLLAMA_CONNECT_TIMEOUT, OLLAMA_READ_TIMEOUT)
+        )
         if response.status_code == 200:
-            models = response.json()
-            return [model['name'] for model in models['models']]
-        return []
-    except Exception as e:
-        st.error(f"Error listing Ollama Cloud models: {str(e)}")
-        return []
+            running = [model['name'] for model in response.json().get('models', [])]
+    except Exception:
+        pass
+
+    with _client_lock:
+        _running_cache[base_url] = (now, running)
+    return running
+
+def list_running_ollama_models():
+    """Models the local Ollama server currently holds in memory (GET /api/ps)"""
+    return _get_running(OLLAMA_BASE_URL) or []
+
+def warm_up_ollama_model(model, use_cloud=False):
+    """Load a model into memory with an empty prompt and return the time it took"""
+    base_url = OLLAMA_CLOUD_BASE_URL if use_cloud else OLLAMA_BASE_URL
+    headers = _cloud_headers() if use_cloud else {"Content-Type": "application/json"}
+    was_hot = is_model_hot(model, use_cloud, ask_server=False)
+    
+    started = time.perf_counter()
+    response = get_ollama_session(base_url).post(
+        f"{base_url}/api/generate",
+        json={"model": model, "prompt": "", "stream": False, "keep_alive": OLLAMA_KEEP_ALIVE},
+        headers=headers,
+        timeout=(OLLAMA_CONNECT_TIMEOUT, OLLAMA_GENERATE_TIMEOUT)
+    )
+    latency = time.perf_counter() - started
+    if response.status_code != 200:
+        raise RuntimeError(f"Ollama API error: {response.status_code}")
+    
+    _record_model_use(base_url, model, latency, was_hot, response.json().get('load_duration'))
+    return latency
+
+def warm_up_ollama_models_async(models, use_cloud=False):
+    """Start background warm-up for models that are not already hot or warming"""
+    base_url = OLLAMA_CLOUD_BASE_URL if use_cloud else OLLAMA_BASE_URL
+    
+    def warm(model):
+        try:
+            warm_up_ollama_model(model, use_cloud)
+        except Exception:
+            pass
+        finally:
+            with _client_lock:
+                _status_entry(base_url, model)['warming'] = False
+    
+    started = []
+    for model in models:
+        if is_model_hot(model, use_cloud):
+            continue
+        with _client_lock:
+            entry = _status_entry(base_url, model)
+            if entry['warming']:
+                continue
+            entry['warming'] = True
+        threading.Thread(target=warm, args=(model,), daemon=True).start()
+        started.append(model)
+    return started
+
+@st.cache_resource
+def preload_ollama_models():
+    """Warm up OLLAMA_PRELOAD_MODELS once per server process"""
+    return warm_up_ollama_models_async(OLLAMA_PRELOAD_MODELS)
 
+@timed('llm.ollama', size=payload_size)
 def generate_ollama_response(prompt, model="qwen2.5-coder:7b", use_cloud=False):
     """Generate response using Ollama model (local or cloud)"""
     try:
         payload = {
             "model": model,
             "prompt": prompt,
-            "stream": False
+            "stream": False,
+            "keep_alive": OLLAMA_KEEP_ALIVE
         }
+        was_hot = is_model_hot(model, use_cloud, ask_server=False)
+        started = time.perf_counter()
         
         if use_cloud:
             # Use Ollama Cloud
@@ -78,26 +302,27 @@ def generate_ollama_response(prompt, model="qwen2.5-coder:7b", use_cloud=False):
                 st.error("Ollama Cloud API key not found")
                 return None
             
-            headers = {
-                "Authorization": f"Bearer {OLLAMA_CLOUD_API_KEY}",
-                "Content-Type": "application/json"
-            }
-            
-            response = requests.post(
+            response = get_ollama_session(OLLAMA_CLOUD_BASE_URL).post(
                 f"{OLLAMA_CLOUD_BASE_URL}/api/generate",
                 json=payload,
-                headers=headers
+                headers=_cloud_headers(),
+                timeout=(OLLAMA_CONNECT_TIMEOUT, OLLAMA_GENERATE_TIMEOUT)
             )
         else:
             # Use local Ollama
-            response = requests.post(
+            response = get_ollama_session(OLLAMA_BASE_URL).post(
                 f"{OLLAMA_BASE_URL}/api/generate",
                 json=payload,
-                headers={"Content-Type": "application/json"}
+                headers={"Content-Type": "application/json"},
+                timeout=(OLLAMA_CONNECT_TIMEOUT, OLLAMA_GENERATE_TIMEOUT)
             )
         
         if response.status_code == 200:
             result = response.json()
+            _record_model_use(
+                OLLAMA_CLOUD_BASE_URL if use_cloud else OLLAMA_BASE_URL,
+                model, time.perf_counter() - started, was_hot, result.get('load_duration')
+            )
             return result.get('response', '')
         else:
             st.error(f"Ollama API error: {response.status_code}")
@@ -106,33 +331,125 @@ def generate_ollama_response(prompt, model="qwen2.5-coder:7b", use_cloud=False):
         st.error(f"Error generating Ollama response: {str(e)}")
         return None
 
-def analyze_financial_data_with_ollama(df, query, model="qwen2.5-coder:7b", use_cloud=False):
-    """Analyze financial data using Ollama model"""
-    # Prepare data context
-    recent_data = df.tail(10).to_string()
-    summary_stats = df.describe().to_string()
+def _ollama_stream_chunks(prompt, model, use_cloud, stats):
+    base_url = OLLAMA_CLOUD_BASE_URL if use_cloud else OLLAMA_BASE_URL
+    headers = _cloud_headers() if use_cloud else {"Content-Type": "application/json"}
+    was_hot = is_model_hot(model, use_cloud, ask_server=False)
+    started = time.perf_counter()
+    first_chunk_latency = None
     
-    # Create prompt
-    prompt = f"""You are a financial analyst. Based on this data:
-{recent_data}
+    with get_ollama_session(base_url).post(
+        f"{base_url}/api/generate",
+        json={"model": model, "prompt": prompt, "stream": True, "keep_alive": OLLAMA_KEEP_ALIVE},
+        headers=headers,
+        stream=True,
+        timeout=(OLLAMA_CONNECT_TIMEOUT, OLLAMA_GENERATE_TIMEOUT)
+    ) as response:
+        if response.status_code != 200:
+            raise RuntimeError(f"Ollama API error: {response.status_code}")
+        
+        # Ollama streams one JSON object per line; the last one carries done=True and token counts
+        for line in response.iter_lines(chunk_size=None):
+            if not line:
+                continue
+            chunk = json.loads(line)
+            if chunk.get('error'):
+                raise RuntimeError(chunk['error'])
+            if first_chunk_latency is None:
+                first_chunk_latency = time.perf_counter() - started
+            yield chunk.get('response', '')
+            if chunk.get('done'):
+                stats.token_count = chunk.get('eval_count')
+                # Model load shows up in time-to-first-token, so that is what cold/warm compares
+                _record_model_use(base_url, model, first_chunk_latency, was_hot, chunk.get('load_duration'))
+                break
+
+def stream_ollama_response(prompt, model="qwen2.5-coder:7b", use_cloud=False):
+    """Stream a response from Ollama (local or cloud).
+
+    Returns (chunks, stats): a generator of text chunks and a StreamStats that
+    fills in time-to-first-token and tokens/sec as the generator is consumed.
+    """
+    if use_cloud and not OLLAMA_CLOUD_API_KEY:
+        raise RuntimeError("Ollama Cloud API key not found")
+    
+    stats = StreamStats()
+    chunks = instrument_stream('llm.ollama.stream', _ollama_stream_chunks(prompt, model, use_cloud, stats))
+    return timed_stream(chunks, stats), stats
+
+OLLAMA_ANALYSIS_TEMPLATE = """You are a financial analyst. Based on this data:
+{data}
 
 And these stats:
-{summary_stats}
+{stats}
+
+Answer the user: {question}"""
 
-Answer the user: {query}"""
+def build_ollama_prompt(df, query):
+    """Build the financial analysis prompt sent to Ollama"""
+    # Prepare a compact, token-budgeted data context
+    context = build_analysis_context(df)
+    
+    return OLLAMA_ANALYSIS_TEMPLATE.format(data=context['data'], stats=context['stats'], question=query)
+
+def analyze_financial_data_with_ollama(df, query, model="qwen2.5-coder:7b", use_cloud=False, stream=False, ticker=None):
+    """Analyze financial data using Ollama model.
+
+    With stream=True this returns (chunks, stats) from stream_ollama_response
+    instead of the finished text. Repeat questions about the same data are
+    answered from the response cache.
+    """
+    cache = load_response_cache()
+    cache_context = (f"ollama-cloud:{model}" if use_cloud else f"ollama:{model}", OLLAMA_ANALYSIS_TEMPLATE, data_scope(df, ticker))
+    cached = cache.lookup(*cache_context, query)
+    if cached is not None:
+        return cached_response_stream(cached) if stream else cached
+    
+    prompt = build_ollama_prompt(df, query)
+    
+    if stream:
+        chunks, stats = stream_ollama_response(prompt, model, use_cloud)
+        return cached_stream(cache, cache_context, query, chunks), stats
     
     # Generate response
     response = generate_ollama_response(prompt, model, use_cloud)
+    cache.store(*cache_context, query, response)
     return response
 
-def hybrid_analysis(df, query, use_ollama=True, use_ollama_cloud=False):
-    """Perform hybrid analysis using both Gemini and Ollama (local or cloud)"""
-    results = {}
+def ollama_backends(models, use_cloud=False, ticker=None):
+    """Analysis backends for the given Ollama model names (local or cloud)"""
+    group = "ollama-cloud" if use_cloud else "ollama-local"
+    return [
+        AnalysisBackend(
+            f"{group}:{model}",
+            lambda df, query, model=model: analyze_financial_data_with_ollama(df, query, model, use_cloud=use_cloud, ticker=ticker),
+            group
+        )
+        for model in models
+    ]
+
+def hybrid_analysis(df, query, use_ollama=True, use_ollama_cloud=False, llm=None, models=None,
+                    cloud_models=None, deadline=ANALYSIS_DEADLINE):
+    """Perform hybrid analysis using Gemini and Ollama (local and/or cloud) concurrently.
+    
+    Gemini runs when an initialized llm is passed. Ollama uses the given model
+    names, or the first available model on each server. Returns
+    {backend name: result dict} with 'response', 'error' and 'latency'.
+    """
+    backends = []
+    
+    if llm is not None:
+        # Imported here so Ollama-only use doesn't load the LangChain stack
+        from models import analyze_financial_data_with_gemini
+        backends.append(AnalysisBackend(
+            "gemini",
+            lambda df, query: analyze_financial_data_with_gemini(llm, df, query)
+        ))
+    
+    if use_ollama and check_ollama_connection():
+        backends.extend(ollama_backends(models or list_ollama_models()[:1]))
     
-    # Ollama analysis (if enabled and available)
-    if use_ollama and (check_ollama_connection() or check_ollama_cloud_connection()):
-        ollama_response = analyze_financial_data_with_ollama(df, query, use_cloud=use_ollama_cloud)
-        if ollama_response:
-            results['ollama'] = ollama_response
+    if use_ollama_cloud and check_ollama_cloud_connection():
+        backends.extend(ollama_backends(cloud_models or list_ollama_cloud_models()[:1], use_cloud=True))
     
-    return results
\ No newline at end of file
+    return run_analyses(backends, df, query, deadline)
@@ -0,0 +1,122 @@
+"""
+Online version of the trend-line price model.
+
+RecursiveTrendPredictor fits Close ~ a + b * bar_number with recursive least
+squares, so each new bar costs O(1) and the next-bar prediction is always
+available without refitting. With forgetting=1 it reproduces the batch
+LinearRegression fit used by perform_price_prediction; forgetting < 1 weights
+bar k back by forgetting**k so the trend follows recent prices.
+"""
+
+import zlib
+import numpy as np
+
+class RecursiveTrendPredictor:
+    """Recursive least squares on features [1, t] with an optional forgetting factor"""
+
+    def __init__(self, forgetting=1.0):
+        if not 0 < forgetting <= 1:
+            raise ValueError("forgetting must be in (0, 1]")
+        self.forgetting = forgetting
+        self.count = 0
+        self.theta = None
+        self.P = None
+        self._first = None
+
+    @classmethod
+    def from_series(cls, prices, forgetting=1.0):
+        """Build a predictor that has seen an existing price history.
+
+        The state after n bars is the weighted least-squares solution on
+        those bars, so it is computed in one vectorized step rather than by n
+        updates; further bars then go through update().
+        """
+        prices = np.asarray(prices, dtype=float)
+        predictor = cls(forgetting)
+        if len(prices) < 3:
+            for price in prices:
+                predictor.update(price)
+            return predictor
+
+        n = len(prices)
+        t = np.arange(n, dtype=float)
+        weights = forgetting ** t[::-1]
+        X = np.column_stack([np.ones(n), t])
+        predictor.P = np.linalg.inv(X.T @ (weights[:, None] * X))
+        predictor.theta = predictor.P @ X.T @ (weights * prices)
+        predictor.count = n
+        predictor._first = float(prices[0])
+        return predictor
+
+    def extend(self, prices):
+        """Feed several new closes in order and return the next-bar prediction"""
+        for price in np.asarray(prices, dtype=float):
+            self.update(price)
+        return self.predict_next()
+
+    def _initialize(self, y0, y1):
+        # Exact weighted least squares on the first two bars; RLS takes over from there
+        X = np.array([[1.0, 0.0], [1.0, 1.0]])
+        weights = np.array([self.forgetting, 1.0])
+        self.P = np.linalg.inv(X.T @ (weights[:, None] * X))
+        self.theta = self.P @ X.T @ (weights * np.array([y0, y1]))
+
+    def update(self, price):
+        """Add the next bar's close and return the prediction for the bar after it"""
+        price = float(price)
+        t = self.count
+        self.count += 1
+
+        if t == 0:
+            self._first = price
+        elif t == 1:
+            self._initialize(self._first, price)
+        else:
+            x = np.array([1.0, float(t)])
+            Px = self.P @ x
+            gain = Px / (self.forgetting + x @ Px)
+            self.theta = self.theta + gain * (price - x @ self.theta)
+            self.P = (self.P - np.outer(gain, Px)) / self.forgetting
+            # Keep P symmetric against rounding drift
+            self.P = (self.P + self.P.T) / 2
+
+        return self.predict_next()
+
+    def predict_next(self):
+        """Prediction for the next, not yet seen bar (None before any data)"""
+        if self.count == 0:
+            return None
+        if self.theta is None:
+            # A single point has no trend, matching LinearRegression on one sample
+            return self._first
+        return float(self.theta[0] + self.theta[1] * self.count)
+
+    @property
+    def intercept(self):
+        return None if self.theta is None else float(self.theta[0])
+
+    @property
+    def slope(self):
+        return None if self.theta is None else float(self.theta[1])
+
+
+def cached_predictor(cache, key, prices, forgetting=1.0):
+    """Return a predictor that has seen every bar of prices.
+
+    cache maps key to the predictor built on an earlier call. When prices
+    extend the bars it was fed (checked by a checksum of those bars), only the
+    new bars are added; any other change rebuilds it from the full history.
+    """
+    prices = np.ascontiguousarray(prices, dtype=float)
+    entry = cache.get(key)
+    if entry is not None:
+        predictor, checksum = entry
+        seen = predictor.count
+        if predictor.forgetting == forgetting and seen <= len(prices) and zlib.crc32(prices[:seen]) == checksum:
+            predictor.extend(prices[seen:])
+            cache[key] = (predictor, zlib.crc32(prices[seen:], checksum))
+            return predictor
+
+    predictor = RecursiveTrendPredictor.from_series(prices, forgetting)
+    cache[key] = (predictor, zlib.crc32(prices))
+    return predictor
@@ -0,0 +1,114 @@
+import numpy as np
+import pandas as pd
+import math
+import os
+from indicators import get_indicators
+
+PROMPT_TOKEN_BUDGET = int(os.getenv('PROMPT_TOKEN_BUDGET', '320'))
+RETURN_HORIZONS = [('1d', 1), ('5d', 5), ('1m', 21), ('3m', 63), ('6m', 126), ('1y', 252)]
+RECENT_BARS = 5
+TRADING_DAYS = 252
+
+def estimate_tokens(text):
+    """Rough token count for numeric/English text (about 4 characters per token)"""
+    return math.ceil(len(text) / 4)
+
+def _pct(value):
+    return f"{value:+.2%}" if np.isfinite(value) else "n/a"
+
+def _price(value):
+    # Significant figures, not fixed decimals: sub-cent prices keep their digits
+    # and five-figure prices are not rounded to thousands
+    return f"{value:.6g}" if np.isfinite(value) else "n/a"
+
+def _num(value):
+    """Volumes and other large counts, abbreviated to 4 significant figures"""
+    if not np.isfinite(value):
+        return "n/a"
+    magnitude = abs(value)
+    if magnitude >= 1e9:
+        return f"{value / 1e9:.4g}B"
+    if magnitude >= 1e6:
+        return f"{value / 1e6:.4g}M"
+    if magnitude >= 1e4:
+        return f"{value / 1e3:.4g}K"
+    return f"{value:.4g}"
+
+def _dates(df):
+    dates = df['Date'] if 'Date' in df.columns else df.index
+    return pd.DatetimeIndex(pd.to_datetime(dates))
+
+def _format_dates(dates, positions):
+    return dates[positions].strftime('%Y-%m-%d')
+
+def summarize_stats(df):
+    """Compact multi-horizon summary: returns, volatility, drawdown, indicators and volume"""
+    close = df['Close'].to_numpy(dtype=float)
+    volume = df['Volume'].to_numpy(dtype=float)
+    first_date, last_date = _format_dates(_dates(df), [0, -1])
+    n = len(close)
+    ind = get_indicators(df).iloc[-1]
+
+    returns = " ".join(
+        f"{label}={_pct(close[-1] / close[-1 - bars] - 1)}" for label, bars in RETURN_HORIZONS if bars < n
+    )
+
+    log_returns = np.diff(np.log(close))
+    vols = " ".join(
+        f"{window}d={np.std(log_returns[-window:], ddof=1) * math.sqrt(TRADING_DAYS):.1%}"
+        for window in (21, 63) if len(log_returns) > window
+    )
+
+    running_peak = np.maximum.accumulate(close)
+    drawdowns = close / running_peak - 1
+
+    lines = [
+        f"bars={n} range={first_date}..{last_date} last_close={_price(close[-1])} high={_price(df['High'].max())} low={_price(df['Low'].min())}",
+        f"returns: {returns or 'n/a'}",
+        f"volatility_annualized: {vols or 'n/a'} atr14={_pct(ind['ATR_14'] / close[-1]).lstrip('+')}",
+        f"drawdown: max={_pct(drawdowns.min())} current={_pct(drawdowns[-1])}",
+        "indicators: "
+        f"rsi14={ind['RSI']:.1f} macd_hist={ind['MACD_Hist']:+.4g} "
+        f"close_vs_ma20={_pct(close[-1] / ind['MA_20'] - 1)} "
+        f"close_vs_ma50={_pct(close[-1] / ind['MA_50'] - 1) if n >= 50 else 'n/a'} "
+        f"bollinger_pctb={(close[-1] - ind['Lower_Band']) / (ind['Upper_Band'] - ind['Lower_Band']):.2f}",
+        f"volume: last={_num(volume[-1])} avg20={_num(volume[-20:].mean())} ratio={volume[-1] / max(volume[-20:].mean(), 1):.2f}",
+    ]
+    return "\n".join(lines)
+
+def summarize_history(df, max_tokens):
+    """Recent bars in full plus an evenly downsampled close history that fits max_tokens"""
+    dates = _dates(df)
+    recent = df.tail(RECENT_BARS)
+    recent_dates = _format_dates(dates, np.arange(len(df) - len(recent), len(df)))
+
+    recent_lines = ["recent (date,open,high,low,close,volume):"] + [
+        f"{d},{_price(o)},{_price(h)},{_price(l)},{_price(c)},{_num(v)}"
+        for d, o, h, l, c, v in zip(recent_dates, recent['Open'], recent['High'], recent['Low'], recent['Close'], recent['Volume'])
+    ]
+    text = "\n".join(recent_lines)
+
+    history_len = len(df) - len(recent)
+    remaining = max_tokens - estimate_tokens(text)
+    if history_len <= 0 or remaining <= 0:
+        return text
+
+    close = df['Close'].to_numpy(dtype=float)
+    # Each "YYYY-MM-DD price" point costs about 4-5 tokens
+    points = min(history_len, max(0, (remaining - 15) // 5))
+    while points > 1:
+        step = history_len / points
+        picks = np.unique(np.floor(np.arange(points) * step).astype(int))
+        history = " ".join(f"{d} {_price(c)}" for d, c in zip(_format_dates(dates, picks), close[picks]))
+        section = f"history (date close, every ~{step:.0f} bars):\n{history}"
+        if estimate_tokens(section) <= remaining:
+            return section + "\n" + text
+        points = int(points * 0.9)
+
+    return text
+
+def build_analysis_context(df, max_tokens=PROMPT_TOKEN_BUDGET):
+    """Return {'data': ..., 'stats': ...} prompt sections packed into about max_tokens"""
+    stats = summarize_stats(df)
+    data = summarize_history(df, max_tokens - estimate_tokens(stats))
+    return {'data': data, 'stats': stats}
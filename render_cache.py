@@ -0,0 +1,107 @@
+import streamlit as st
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+from instrumentation import stage
+
+RENDER_CACHE_MAX_MB = float(os.getenv('RENDER_CACHE_MAX_MB', '64'))
+RENDER_FORMAT = os.getenv('RENDER_FORMAT', 'png').lower()
+RENDER_DPI = int(os.getenv('RENDER_DPI', '100'))
+# Draw simple line charts with plain Matplotlib instead of seaborn
+CHART_FAST_PATH = os.getenv('CHART_FAST_PATH', 'true').lower() in ('1', 'true', 'yes')
+
+def get_pyplot():
+    """matplotlib.pyplot, imported on first use"""
+    import matplotlib.pyplot as plt
+    return plt
+
+def get_seaborn():
+    """seaborn, imported on first use"""
+    import seaborn as sns
+    return sns
+
+def render_key(chart_type, fingerprint, *params):
+    """Stable cache key for a chart type, data fingerprint and drawing parameters"""
+    return hashlib.blake2b(repr((chart_type, fingerprint, params)).encode('utf-8'), digest_size=16).hexdigest()
+
+class RenderCache:
+    """Memory-bounded LRU of encoded chart images (PNG or SVG bytes).
+
+    Least recently used images are evicted once the stored bytes exceed
+    max_bytes; a single image larger than the budget is not stored.
+    """
+
+    def __init__(self, max_bytes=int(RENDER_CACHE_MAX_MB * 1024 * 1024)):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the cached image bytes, or None on a miss"""
+        with self._lock:
+            image = self._entries.get(key)
+            if image is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return image
+
+    def put(self, key, image):
+        with self._lock:
+            if len(image) > self.max_bytes:
+                return
+            if key in self._entries:
+                self.bytes -= len(self._entries.pop(key))
+            self._entries[key] = image
+            self.bytes += len(image)
+            while self.bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.bytes -= len(evicted)
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'bytes': self.bytes, 'hits': self.hits, 'misses': self.misses}
+
+def encode_figure(fig, fmt=RENDER_FORMAT, dpi=RENDER_DPI):
+    """Rasterize (or serialize) a figure to PNG/SVG bytes and close it"""
+    buffer = io.BytesIO()
+    try:
+        fig.savefig(buffer, format=fmt, dpi=dpi)
+    finally:
+        get_pyplot().close(fig)
+    return buffer.getvalue()
+
+def render_figure(cache, key, draw, fmt=RENDER_FORMAT):
+    """Return encoded image bytes for key, calling draw() -> Figure only on a cache miss"""
+    image = cache.get(key)
+    if image is None:
+        with stage('chart.render') as sample:
+            image = encode_figure(draw(), fmt)
+            sample['size'] = len(image)
+        cache.put(key, image)
+    return image
+
+def show_image(image, fmt=RENDER_FORMAT):
+    """Display encoded figure bytes in the page"""
+    if fmt == 'svg':
+        st.image(image.decode('utf-8'), use_container_width=True)
+    else:
+        st.image(image, use_container_width=True)
+
+def line_plot(ax, x, y, color, label=None):
+    """Draw a line with plain Matplotlib (fast path) or seaborn"""
+    if CHART_FAST_PATH:
+        ax.plot(x, y, color=color, label=label)
+    else:
+        get_seaborn().lineplot(x=x, y=y, ax=ax, color=color, label=label)
+
+@st.cache_resource
+def load_render_cache():
+    """Create and cache the process-wide figure render cache"""
+    return RenderCache()
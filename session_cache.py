@@ -0,0 +1,40 @@
+"""
+Per-session cache for results derived from the loaded market data.
+
+Streamlit reruns the whole script on every widget interaction. Values computed
+from the current DataFrame (predictions, forecast bands, backtest reports,
+pattern matches) are kept in st.session_state under a key for that data and
+are dropped as soon as a different ticker or date range is loaded. Within one
+dataset at most SESSION_CACHE_MAX_ENTRIES results are kept, least recently
+used first out, so sweeping a widget (e.g. the band horizon) cannot grow the
+session without bound.
+"""
+
+import os
+import streamlit as st
+
+SESSION_CACHE_KEY = '_session_results'
+SESSION_CACHE_MAX_ENTRIES = int(os.getenv('SESSION_CACHE_MAX_ENTRIES', '32'))
+
+def session_cached(name, data_key, compute, *params):
+    """Return compute() for (name, *params), reusing the stored value while data_key is unchanged"""
+    cache = st.session_state.get(SESSION_CACHE_KEY)
+    if cache is None or cache['data_key'] != data_key:
+        cache = {'data_key': data_key, 'values': {}}
+        st.session_state[SESSION_CACHE_KEY] = cache
+
+    values = cache['values']
+    key = (name,) + params
+    if key in values:
+        # Re-insert so dict order tracks recency
+        values[key] = values.pop(key)
+        return values[key]
+
+    values[key] = compute()
+    while len(values) > SESSION_CACHE_MAX_ENTRIES:
+        values.pop(next(iter(values)))
+    return values[key]
+
+def clear_session_cache():
+    """Drop every cached result for this session"""
+    st.session_state.pop(SESSION_CACHE_KEY, None)
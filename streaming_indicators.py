@@ -0,0 +1,227 @@
+"""
+Streaming versions of the chart indicators.
+
+Each indicator keeps ring-buffer state and running sums so that update()
+costs O(1) per bar regardless of history length. Values match the batch
+results from indicators.compute_indicators (and pandas rolling/ewm) to
+floating-point tolerance once the window has filled; before that they are NaN,
+exactly like pandas rolling windows.
+"""
+
+import math
+from collections import deque
+
+NAN = float('nan')
+
+class RollingMean:
+    """Simple moving average over a fixed window"""
+
+    def __init__(self, window):
+        self.window = window
+        self.buffer = deque(maxlen=window)
+        self.total = 0.0
+        self.value = NAN
+
+    def update(self, x):
+        if len(self.buffer) == self.window:
+            self.total -= self.buffer[0]
+        self.buffer.append(x)
+        self.total += x
+        self.value = self.total / self.window if len(self.buffer) == self.window else NAN
+        return self.value
+
+class RollingStd:
+    """Sample standard deviation over a fixed window using sliding Welford updates"""
+
+    def __init__(self, window):
+        self.window = window
+        self.buffer = deque(maxlen=window)
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.value = NAN
+
+    def update(self, x):
+        if len(self.buffer) == self.window:
+            # Replace the oldest value in one step: the count stays constant
+            old = self.buffer[0]
+            new_mean = self.mean + (x - old) / self.window
+            self.m2 += (x - old) * (x - new_mean + old - self.mean)
+            self.mean = new_mean
+        else:
+            count = len(self.buffer) + 1
+            delta = x - self.mean
+            self.mean += delta / count
+            self.m2 += delta * (x - self.mean)
+        self.buffer.append(x)
+
+        if len(self.buffer) == self.window and self.window > 1:
+            self.value = math.sqrt(max(self.m2, 0.0) / (self.window - 1))
+        else:
+            self.value = NAN
+        return self.value
+
+class EMA:
+    """Exponential moving average, equivalent to pandas ewm(adjust=False)"""
+
+    def __init__(self, span=None, alpha=None):
+        self.alpha = alpha if alpha is not None else 2 / (span + 1)
+        self.value = NAN
+
+    def update(self, x):
+        if math.isnan(self.value):
+            self.value = x
+        else:
+            self.value += self.alpha * (x - self.value)
+        return self.value
+
+class BollingerBands:
+    """Moving average with upper and lower bands num_std deviations away"""
+
+    def __init__(self, window=20, num_std=2):
+        self.num_std = num_std
+        self.mean = RollingMean(window)
+        self.std = RollingStd(window)
+
+    def update(self, close):
+        mid = self.mean.update(close)
+        dev = self.std.update(close)
+        return mid, mid + dev * self.num_std, mid - dev * self.num_std
+
+class RSI:
+    """Relative Strength Index.
+
+    method='sma' averages gains and losses over a rolling window like the RSI
+    chart; method='wilder' uses Wilder smoothing (ewm with alpha=1/period).
+    """
+
+    def __init__(self, period=14, method="sma"):
+        if method == "sma":
+            self.avg_gain, self.avg_loss = RollingMean(period), RollingMean(period)
+        elif method == "wilder":
+            self.avg_gain, self.avg_loss = EMA(alpha=1 / period), EMA(alpha=1 / period)
+        else:
+            raise ValueError(f"Unknown RSI method: {method}")
+        self.prev_close = None
+        self.value = NAN
+
+    def update(self, close):
+        # The first bar has no change; it counts as a zero gain and loss,
+        # matching delta.where(delta > 0, 0) on a diff() series
+        delta = 0.0 if self.prev_close is None else close - self.prev_close
+        self.prev_close = close
+
+        gain = self.avg_gain.update(max(delta, 0.0))
+        loss = self.avg_loss.update(max(-delta, 0.0))
+        if loss == 0:
+            loss = 0.0001
+        self.value = 100 - (100 / (1 + gain / loss))
+        return self.value
+
+class ATR:
+    """Average True Range with Wilder smoothing"""
+
+    def __init__(self, period=14):
+        self.smoother = EMA(alpha=1 / period)
+        self.prev_close = None
+        self.value = NAN
+
+    def update(self, high, low, close):
+        true_range = high - low
+        if self.prev_close is not None:
+            true_range = max(true_range, abs(high - self.prev_close), abs(low - self.prev_close))
+        self.prev_close = close
+        self.value = self.smoother.update(true_range)
+        return self.value
+
+class MACD:
+    """MACD line, signal line and histogram"""
+
+    def __init__(self, fast=12, slow=26, signal=9):
+        self.fast = EMA(fast)
+        self.slow = EMA(slow)
+        self.signal = EMA(signal)
+
+    def update(self, close):
+        fast = self.fast.update(close)
+        slow = self.slow.update(close)
+        line = fast - slow
+        signal = self.signal.update(line)
+        return fast, slow, line, signal, line - signal
+
+class IndicatorState:
+    """All chart indicators for one ticker, updated one bar at a time.
+
+    update() takes a mapping (or pandas row) with 'High', 'Low' and 'Close'
+    and returns a dict keyed like the columns of indicators.get_indicators.
+    """
+
+    def __init__(self, ma_windows=(20, 50), bb_window=20, bb_std=2, rsi_period=14,
+                 atr_period=14, macd=(12, 26, 9), rsi_method="sma"):
+        self.ma = {window: RollingMean(window) for window in ma_windows if window != bb_window}
+        self.bb_window = bb_window
+        self.atr_period = atr_period
+        self.macd_periods = macd
+        self.bollinger = BollingerBands(bb_window, bb_std)
+        self.rsi = RSI(rsi_period, rsi_method)
+        self.atr = ATR(atr_period)
+        self.macd = MACD(*macd)
+
+    @classmethod
+    def from_frame(cls, df, **kwargs):
+        """Build state by replaying the bars of an existing frame"""
+        state = cls(**kwargs)
+        for high, low, close in zip(df['High'].to_numpy(float), df['Low'].to_numpy(float), df['Close'].to_numpy(float)):
+            state.update({'High': high, 'Low': low, 'Close': close})
+        return state
+
+    @classmethod
+    def from_history(cls, close, last, **kwargs):
+        """Resume from a batch computation without replaying the whole history.
+
+        close holds the closes seen so far and last the final row of the
+        batch indicators (keyed like get_indicators). Rolling windows replay
+        the trailing closes; the exponential smoothers start from the batch
+        values. Only the rolling ('sma') RSI can be resumed this way.
+        """
+        state = cls(**kwargs)
+        if not isinstance(state.rsi.avg_gain, RollingMean):
+            raise ValueError("from_history needs rsi_method='sma'")
+
+        rolling = list(state.ma.values()) + [state.bollinger.mean, state.bollinger.std]
+        # One extra bar so the RSI's first (zero) change falls out of its window
+        replay = max([r.window for r in rolling] + [state.rsi.avg_gain.window]) + 1
+        for value in close[-replay:]:
+            value = float(value)
+            for r in rolling:
+                r.update(value)
+            state.rsi.update(value)
+
+        fast_span, slow_span, _ = state.macd_periods
+        state.macd.fast.value = float(last[f'EMA_{fast_span}'])
+        state.macd.slow.value = float(last[f'EMA_{slow_span}'])
+        state.macd.signal.value = float(last['MACD_Signal'])
+        state.atr.smoother.value = float(last[f'ATR_{state.atr_period}'])
+        state.atr.prev_close = float(close[-1])
+        return state
+
+    def update(self, bar):
+        high, low, close = float(bar['High']), float(bar['Low']), float(bar['Close'])
+        mid, upper, lower = self.bollinger.update(close)
+        fast, slow, line, signal, hist = self.macd.update(close)
+        fast_span, slow_span, _ = self.macd_periods
+
+        values = {f'MA_{window}': ma.update(close) for window, ma in self.ma.items()}
+        values.update({
+            f'MA_{self.bb_window}': mid,
+            f'STD_{self.bb_window}': self.bollinger.std.value,
+            'Upper_Band': upper,
+            'Lower_Band': lower,
+            'RSI': self.rsi.update(close),
+            f'ATR_{self.atr_period}': self.atr.update(high, low, close),
+            f'EMA_{fast_span}': fast,
+            f'EMA_{slow_span}': slow,
+            'MACD': line,
+            'MACD_Signal': signal,
+            'MACD_Hist': hist,
+        })
+        return values
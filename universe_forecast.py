@@ -0,0 +1,145 @@
+"""
+Universe-wide next-day forecasts.
+
+All close series are packed into one memory-mapped .npy file plus an offsets
+array, so worker processes read prices straight from the shared page cache
+instead of receiving pickled DataFrames. Tickers are sharded across a
+ProcessPoolExecutor; each worker applies the trend-line model from
+perform_price_prediction (full-history and rolling-window fits in closed form)
+and only small result rows travel back. Results are written to Parquet.
+
+Run nightly with: python universe_forecast.py tickers.txt forecasts.parquet
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+import numpy as np
+import pandas as pd
+from backtest import predict_next_from_sums
+
+ROLLING_WINDOW = 60
+
+def pack_closes(closes, directory):
+    """Write {ticker: close array} as one concatenated .npy file; return (path, tickers, offsets)"""
+    tickers = list(closes)
+    arrays = [np.asarray(closes[ticker], dtype=np.float64) for ticker in tickers]
+    offsets = np.zeros(len(arrays) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(a) for a in arrays])
+
+    path = os.path.join(directory, 'closes.npy')
+    packed = np.lib.format.open_memmap(path, mode='w+', dtype=np.float64, shape=(int(offsets[-1]),))
+    for array, start in zip(arrays, offsets[:-1]):
+        packed[start:start + len(array)] = array
+    packed.flush()
+    del packed
+    return path, tickers, offsets
+
+def forecast_series(close, window=ROLLING_WINDOW):
+    """Next-bar trend-line forecasts for one close series, as a result dict"""
+    close = close[np.isfinite(close)]
+    n = len(close)
+    if n == 0:
+        return {'Bars': 0, 'Last_Close': np.nan, 'Prediction': np.nan, 'Prediction_Rolling': np.nan}
+
+    index = np.arange(n, dtype=float)
+    prediction = predict_next_from_sums(float(n), close.sum(), index @ close)
+    recent = close[-window:]
+    prediction_rolling = predict_next_from_sums(float(len(recent)), recent.sum(), np.arange(len(recent), dtype=float) @ recent)
+    return {
+        'Bars': n,
+        'Last_Close': float(close[-1]),
+        'Prediction': float(prediction),
+        'Prediction_Rolling': float(prediction_rolling),
+    }
+
+def _forecast_shard(path, tickers, offsets, window):
+    # Runs in a worker process: the price file is mapped, not copied
+    closes = np.load(path, mmap_mode='r')
+    rows = []
+    for i, ticker in enumerate(tickers):
+        row = forecast_series(np.asarray(closes[offsets[i]:offsets[i + 1]]), window)
+        row['Ticker'] = ticker
+        rows.append(row)
+    return rows
+
+def forecast_universe(closes, output_path=None, workers=None, shard_size=None, window=ROLLING_WINDOW):
+    """Forecast every ticker in {ticker: close array} across a process pool.
+
+    Returns (forecasts DataFrame, stats dict with tickers, workers, seconds and
+    tickers_per_sec). The DataFrame is also written to output_path as Parquet
+    when given.
+    """
+    workers = workers or os.cpu_count() or 1
+    started = time.perf_counter()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path, tickers, offsets = pack_closes(closes, directory)
+        shard_size = shard_size or max(1, -(-len(tickers) // (workers * 4)))
+
+        shards = [
+            (path, tickers[i:i + shard_size], offsets[i:i + shard_size + 1], window)
+            for i in range(0, len(tickers), shard_size)
+        ]
+
+        if workers == 1:
+            results = [_forecast_shard(*shard) for shard in shards]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(_forecast_shard, *zip(*shards)))
+
+    columns = ['Ticker', 'Bars', 'Last_Close', 'Prediction', 'Prediction_Rolling']
+    forecasts = pd.DataFrame([row for rows in results for row in rows], columns=columns)
+    forecasts['Expected_Return'] = forecasts['Prediction'] / forecasts['Last_Close'] - 1
+
+    if output_path:
+        forecasts.to_parquet(output_path, index=False)
+
+    elapsed = time.perf_counter() - started
+    stats = {
+        'tickers': len(tickers),
+        'workers': workers,
+        'seconds': elapsed,
+        'tickers_per_sec': len(tickers) / elapsed if elapsed > 0 else float('inf')
+    }
+    return forecasts, stats
+
+def scaling_report(closes, worker_counts=(1, 2, 4, 8)):
+    """Throughput of forecast_universe for each worker count"""
+    rows = []
+    for workers in worker_counts:
+        _, stats = forecast_universe(closes, workers=workers)
+        rows.append(stats)
+    report = pd.DataFrame(rows)
+    report['speedup'] = report['seconds'].iloc[0] / report['seconds']
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description="Next-day forecasts for a ticker universe")
+    parser.add_argument('tickers_file', help="File with one ticker per line")
+    parser.add_argument('output', help="Parquet file to write forecasts to")
+    parser.add_argument('--days', type=int, default=365 * 2, help="History length in calendar days")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--fetch-workers', type=int, default=8)
+    args = parser.parse_args()
+
+    from batch_fetch import fetch_many
+
+    with open(args.tickers_file) as f:
+        tickers = [line.strip() for line in f if line.strip() and not line.startswith('#')]
+
+    end = date.today() + timedelta(days=1)
+    frames, errors = fetch_many(tickers, end - timedelta(days=args.days), end, max_workers=args.fetch_workers)
+    for ticker, error in sorted(errors.items()):
+        print(f"skipped {ticker}: {error}")
+
+    closes = {ticker: df['Close'].to_numpy() for ticker, df in frames.items()}
+    _, stats = forecast_universe(closes, args.output, workers=args.workers)
+    print(f"{stats['tickers']} tickers in {stats['seconds']:.2f}s "
+          f"({stats['tickers_per_sec']:.0f} tickers/sec, {stats['workers']} workers) -> {args.output}")
+
+if __name__ == "__main__":
+    main()
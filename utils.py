@@ -1,10 +1,12 @@
 import streamlit as st
-import yfinance as yf
 import pandas as pd
+from market_cache import get_market_cache
+from instrumentation import timed
 
-def validate_and_clean_data(df):
+def clean_market_data(df):
+    """Return (cleaned df, None) or (None, error message) without touching the page; safe in worker threads"""
     if df is None or df.empty:
-        return None
+        return None, None
     
     df = df.copy()
     
@@ -14,8 +16,7 @@ def validate_and_clean_data(df):
     required_columns = ['Open', 'High', 'Low', 'Close', 'Volume']
     for col in required_columns:
         if col not in df.columns:
-            st.error(f"Missing required column: {col}")
-            return None
+            return None, f"Missing required column: {col}"
     
     if 'Date' not in df.columns and df.index.name == 'Date':
         df = df.reset_index()
@@ -28,14 +29,21 @@ def validate_and_clean_data(df):
     df = df[df['Close'] > 0]
     df = df[df['Volume'] >= 0]
     
+    return df, None
+
+def validate_and_clean_data(df):
+    df, error = clean_market_data(df)
+    if error:
+        st.error(error)
     return df
 
+@timed('fetch_market_data')
 def fetch_market_data(ticker, start_date, end_date):
     try:
         ticker = ticker.strip().upper()
         
         with st.spinner("Fetching data..."):
-            df_raw = yf.download(ticker, start=start_date, end=end_date, progress=False)
+            df_raw = get_market_cache().get(ticker, start_date, end_date)
             
             if df_raw.empty:
                 st.error(f"❌ No data found for ticker '{ticker}'. Please check the ticker symbol.")
@@ -0,0 +1,119 @@
+import numpy as np
+import json
+import os
+
+def normalize_rows(vectors):
+    """Return vectors as a float32 matrix with L2-normalized rows"""
+    vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+def top_k_indices(scores, k):
+    """Indices of the k largest scores, best first, without a full sort"""
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.array([], dtype=np.int64)
+    if k < len(scores):
+        candidates = np.argpartition(scores, -k)[-k:]
+    else:
+        candidates = np.arange(len(scores))
+    return candidates[np.argsort(scores[candidates])[::-1]]
+
+def spherical_kmeans(vectors, n_clusters, n_iter=10, seed=0):
+    """Cluster normalized vectors by cosine similarity and return the centroids"""
+    rng = np.random.default_rng(seed)
+    n_clusters = min(n_clusters, len(vectors))
+    centroids = vectors[rng.choice(len(vectors), n_clusters, replace=False)].copy()
+
+    for _ in range(n_iter):
+        assignments = np.argmax(vectors @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, vectors)
+        empty = ~sums.any(axis=1)
+        # Reseed empty clusters from random points so every list stays usable
+        sums[empty] = vectors[rng.choice(len(vectors), int(empty.sum()))]
+        centroids = normalize_rows(sums)
+
+    return centroids
+
+class VectorIndex:
+    """Cosine-similarity index over L2-normalized float32 embeddings.
+
+    Search is a single matrix-vector product plus an argpartition top-k. An
+    optional IVF-style coarse quantizer (train_ivf) restricts each query to the
+    vectors in its nprobe closest clusters, for large corpora.
+    """
+
+    def __init__(self, vectors=None, texts=None):
+        self.vectors = normalize_rows(vectors) if vectors is not None else np.empty((0, 0), dtype=np.float32)
+        self.texts = list(texts) if texts is not None else []
+        self.centroids = None
+        self.assignments = None
+
+    def __len__(self):
+        return len(self.vectors)
+
+    def add(self, vectors, texts):
+        """Append embeddings and their texts to the index"""
+        vectors = normalize_rows(vectors)
+        self.vectors = vectors if len(self.vectors) == 0 else np.vstack([self.vectors, vectors])
+        self.texts.extend(texts)
+        if self.centroids is not None:
+            self.assignments = np.concatenate([self.assignments, np.argmax(vectors @ self.centroids.T, axis=1)])
+
+    def train_ivf(self, n_lists=None, n_iter=10):
+        """Build the coarse quantizer; n_lists defaults to about sqrt(N)"""
+        if len(self.vectors) == 0:
+            return
+        n_lists = n_lists or max(1, int(np.sqrt(len(self.vectors))))
+        self.centroids = spherical_kmeans(np.asarray(self.vectors), n_lists, n_iter)
+        self.assignments = np.argmax(self.vectors @ self.centroids.T, axis=1)
+
+    def search(self, query_vector, top_k=5, nprobe=None):
+        """Return [(text, similarity)] for the top_k closest entries.
+
+        nprobe only applies once train_ivf has run; by default all lists are
+        searched, which gives exact results.
+        """
+        if len(self.vectors) == 0:
+            return []
+
+        query = normalize_rows(query_vector)[0]
+
+        if self.centroids is not None and nprobe and nprobe < len(self.centroids):
+            lists = top_k_indices(self.centroids @ query, nprobe)
+            candidates = np.flatnonzero(np.isin(self.assignments, lists))
+            scores = self.vectors[candidates] @ query
+            ranked = candidates[top_k_indices(scores, top_k)]
+            scores = self.vectors[ranked] @ query
+        else:
+            scores = self.vectors @ query
+            ranked = top_k_indices(scores, top_k)
+            scores = scores[ranked]
+
+        return [(self.texts[i], float(score)) for i, score in zip(ranked, scores)]
+
+    def save(self, directory):
+        """Write the index as .npy files plus a JSON list of texts"""
+        os.makedirs(directory, exist_ok=True)
+        np.save(os.path.join(directory, 'vectors.npy'), np.asarray(self.vectors))
+        with open(os.path.join(directory, 'texts.json'), 'w') as f:
+            json.dump(self.texts, f)
+        if self.centroids is not None:
+            np.save(os.path.join(directory, 'centroids.npy'), self.centroids)
+            np.save(os.path.join(directory, 'assignments.npy'), self.assignments)
+
+    @classmethod
+    def load(cls, directory, mmap=True):
+        """Load a saved index; vectors are memory-mapped read-only by default"""
+        index = cls()
+        index.vectors = np.load(os.path.join(directory, 'vectors.npy'), mmap_mode='r' if mmap else None)
+        with open(os.path.join(directory, 'texts.json')) as f:
+            index.texts = json.load(f)
+
+        centroids_path = os.path.join(directory, 'centroids.npy')
+        if os.path.exists(centroids_path):
+            index.centroids = np.load(centroids_path)
+            index.assignments = np.load(os.path.join(directory, 'assignments.npy'))
+        return index
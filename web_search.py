@@ -1,14 +1,31 @@
 import streamlit as st
-import http.client
-import json
 import requests
 import os
+import time
+from types import SimpleNamespace
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 from dotenv import load_dotenv
-from exa_py import Exa
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+from news_cache import NewsCache, deduplicate_articles
+from instrumentation import timed, payload_size
 
 # Load environment variables
 load_dotenv()
 
+SERPER_URL = os.getenv('SERPER_URL', 'https://google.serper.dev/search')
+SEARCHAPI_URL = os.getenv('SEARCHAPI_URL', 'https://www.searchapi.io/api/v1/search')
+OPENROUTER_URL = os.getenv('OPENROUTER_URL', 'https://openrouter.ai/api/v1/chat/completions')
+EXA_BASE_URL = os.getenv('EXA_BASE_URL', 'https://api.exa.ai')
+
+# Search modes: 'sequential' tries providers in order, 'first' races them all,
+# 'hedged' starts the next provider only after SEARCH_HEDGE_DELAY seconds
+# without a result, and 'merge' collects every result within the deadline
+SEARCH_MODE = os.getenv('SEARCH_MODE', 'hedged')
+SEARCH_PROVIDER_TIMEOUT = float(os.getenv('SEARCH_PROVIDER_TIMEOUT', '10'))
+SEARCH_HEDGE_DELAY = float(os.getenv('SEARCH_HEDGE_DELAY', '1.5'))
+SEARCH_DEADLINE = float(os.getenv('SEARCH_DEADLINE', '15'))
+
+@timed('search.serper', size=payload_size)
 def search_serper(query):
     """Search using Serper API"""
     try:
@@ -17,36 +34,31 @@ def search_serper(query):
             st.warning("Serper API key not found")
             return None
             
-        conn = http.client.HTTPSConnection("google.serper.dev")
-        payload = json.dumps({
-            "q": query
-        })
         headers = {
             'X-API-KEY': api_key,
             'Content-Type': 'application/json'
         }
-        conn.request("POST", "/search", payload, headers)
-        res = conn.getresponse()
-        data = res.read()
-        return json.loads(data.decode("utf-8"))
+        response = requests.post(SERPER_URL, json={"q": query}, headers=headers, timeout=SEARCH_PROVIDER_TIMEOUT)
+        return response.json()
     except Exception as e:
         st.error(f"Serper search error: {str(e)}")
         return None
 
+@timed('search.searchapi', size=payload_size)
 def search_searchapi(query):
     """Search using SearchAPI"""
     try:
-        url = "https://www.searchapi.io/api/v1/search"
         params = {
             "engine": "google",
             "q": query
         }
-        response = requests.get(url, params=params)
+        response = requests.get(SEARCHAPI_URL, params=params, timeout=SEARCH_PROVIDER_TIMEOUT)
         return response.json()
     except Exception as e:
         st.error(f"SearchAPI error: {str(e)}")
         return None
 
+@timed('search.exa', size=payload_size)
 def search_exa(query):
     """Search using Exa API"""
     try:
@@ -55,17 +67,26 @@ def search_exa(query):
             st.warning("Exa API key not found")
             return None
         
-        exa = Exa(api_key)
-        result = exa.search_and_contents(
-            query,
-            type="auto",
-            text=True,
-        )
-        return result
+        # Called over HTTP rather than through exa_py, whose client sets no request
+        # timeout: a hung Exa call would otherwise hold its fan-out slot until the deadline
+        headers = {
+            'x-api-key': api_key,
+            'Content-Type': 'application/json'
+        }
+        payload = {"query": query, "type": "auto", "contents": {"text": True}}
+        response = requests.post(f"{EXA_BASE_URL}/search", json=payload, headers=headers, timeout=SEARCH_PROVIDER_TIMEOUT)
+        response.raise_for_status()
+        
+        # Same shape as the SDK's search_and_contents result: .results items with title, url and text
+        return SimpleNamespace(results=[
+            SimpleNamespace(title=item.get('title') or 'N/A', url=item.get('url') or 'N/A', text=item.get('text') or '')
+            for item in response.json().get('results', [])
+        ])
     except Exception as e:
         st.error(f"Exa search error: {str(e)}")
         return None
 
+@timed('search.openrouter', size=payload_size)
 def search_openrouter(query):
     """Search using OpenRouter API"""
     try:
@@ -76,7 +97,6 @@ def search_openrouter(query):
             st.warning("OpenRouter API key not found")
             return None
         
-        url = "https://openrouter.ai/api/v1/chat/completions"
         headers = {
             "Authorization": f"Bearer {api_key}",
             "Content-Type": "application/json"
@@ -89,7 +109,7 @@ def search_openrouter(query):
             ]
         }
         
-        response = requests.post(url, headers=headers, json=payload)
+        response = requests.post(OPENROUTER_URL, headers=headers, json=payload, timeout=SEARCH_PROVIDER_TIMEOUT)
         if response.status_code == 200:
             return response.json()
         else:
@@ -99,28 +119,99 @@ def search_openrouter(query):
         st.error(f"OpenRouter search error: {str(e)}")
         return None
 
-def search_financial_news(company_name):
+SEARCH_PROVIDERS = [
+    ('exa', search_exa),
+    ('serper', search_serper),
+    ('openrouter', search_openrouter),
+    ('searchapi', search_searchapi),
+]
+
+def _search_sequential(query, providers):
+    result = None
+    for _, provider in providers:
+        result = provider(query)
+        if result:
+            return result
+    return result
+
+def fan_out_search(query, providers=None, hedge_delay=0.0, deadline=SEARCH_DEADLINE, collect_all=False):
+    """Run search providers concurrently and return [(name, result)] for good results.
+
+    Providers start in priority order, each hedge_delay seconds after the
+    previous one unless a good result has already arrived. Without collect_all
+    the first good result wins; with it, every good result that arrives before
+    the deadline is returned. Providers still running are abandoned; their own
+    request timeouts bound how long they linger in the background.
+    """
+    providers = list(providers or SEARCH_PROVIDERS)
+    ctx = get_script_run_ctx()
+    executor = ThreadPoolExecutor(
+        max_workers=len(providers),
+        initializer=lambda: add_script_run_ctx(ctx=ctx) if ctx else None
+    )
+
+    started = time.monotonic()
+    futures = {}
+    results = []
+    next_provider = 0
+
+    try:
+        while True:
+            for future in [future for future in futures if future.done()]:
+                name = futures.pop(future)
+                try:
+                    result = future.result()
+                except Exception:
+                    result = None
+                if result:
+                    results.append((name, result))
+
+            if results and not collect_all:
+                break
+
+            now = time.monotonic() - started
+            pending = list(futures)
+            # Launch every provider whose hedge slot has come up, or the next
+            # one straight away if everything launched so far has failed
+            while next_provider < len(providers) and (now >= next_provider * hedge_delay or not pending):
+                name, provider = providers[next_provider]
+                future = executor.submit(provider, query)
+                futures[future] = name
+                pending.append(future)
+                next_provider += 1
+
+            if not pending:
+                break
+
+            remaining = deadline - now
+            if remaining <= 0:
+                break
+
+            timeout = remaining
+            if next_provider < len(providers):
+                timeout = min(timeout, next_provider * hedge_delay - now)
+
+            wait(pending, timeout=max(timeout, 0), return_when=FIRST_COMPLETED)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    return results
+
+def search_financial_news(company_name, mode=SEARCH_MODE):
     """Search for financial news about a company"""
     query = f"{company_name} financial news"
     
-    # Try Exa first (most reliable for financial content)
-    result = search_exa(query)
-    if result:
-        return result
+    if mode == "sequential":
+        # Exa first (most reliable for financial content), then Serper, OpenRouter and SearchAPI
+        return _search_sequential(query, SEARCH_PROVIDERS)
     
-    # Fallback to Serper
-    result = search_serper(query)
-    if result:
-        return result
+    if mode == "merge":
+        results = fan_out_search(query, collect_all=True)
+        return {'merged': [result for _, result in results]} if results else None
     
-    # Fallback to OpenRouter
-    result = search_openrouter(query)
-    if result:
-        return result
-    
-    # Final fallback to SearchAPI
-    result = search_searchapi(query)
-    return result
+    hedge_delay = SEARCH_HEDGE_DELAY if mode == "hedged" else 0.0
+    results = fan_out_search(query, hedge_delay=hedge_delay)
+    return results[0][1] if results else None
 
 def extract_key_info(search_results):
     """Extract key information from search results"""
@@ -130,7 +221,10 @@ def extract_key_info(search_results):
     key_info = []
     
     # Handle different API response formats
-    if hasattr(search_results, 'results'):  # Exa format
+    if isinstance(search_results, dict) and 'merged' in search_results:  # Results from several providers
+        for result in search_results['merged']:
+            key_info.extend(extract_key_info(result))
+    elif hasattr(search_results, 'results'):  # Exa format
         for item in search_results.results:
             if hasattr(item, 'text'):
                 key_info.append({
@@ -152,4 +246,27 @@ def extract_key_info(search_results):
             'snippet': search_results.get('answerBox', {}).get('snippet', 'N/A')
         })
     
-    return key_info
\ No newline at end of file
+    return key_info
+
+@st.cache_resource
+def load_news_cache():
+    """Open and cache the persistent news cache"""
+    return NewsCache()
+
+@timed('search.news')
+def get_financial_news(company_name, mode=SEARCH_MODE):
+    """Return deduplicated news articles for a company, served from the cache while fresh"""
+    cache = load_news_cache()
+    query = f"{company_name} financial news"
+    
+    articles = cache.get(query)
+    if articles is not None:
+        return articles
+    
+    search_results = search_financial_news(company_name, mode)
+    articles = deduplicate_articles(extract_key_info(search_results))
+    
+    # Only successful searches are cached so a provider outage is retried next rerun
+    if articles:
+        cache.set(query, articles)
+    return articles